@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the JSON codecs of pyhpecfm.codec on the response bodies recorded in the test
+cassettes.
+
+The baseline decodes the body to str before parsing it, as requests.Response.json() does,
+while the codecs parse the body bytes directly.
+
+    python benchmarks/bench_codec.py
+    python benchmarks/bench_codec.py --cassette test_get_switches_single_param --number 200
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pyhpecfm import codec  # noqa: E402
+
+CASSETTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'test_pyhpecfm',
+                         'fixtures', 'cassettes')
+
+
+def recorded_bodies(cassette):
+    """Return the JSON response bodies of a cassette as bytes."""
+    with open(os.path.join(CASSETTES, cassette)) as source:
+        interactions = yaml.safe_load(source)['interactions']
+    bodies = []
+    for interaction in interactions:
+        body = interaction['response']['body']['string']
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        try:
+            json.loads(body.decode('utf-8'))
+        except ValueError:
+            continue
+        bodies.append(body)
+    return bodies
+
+
+def bench(decode, bodies, number):
+    timer = timeit.Timer(lambda: [decode(body) for body in bodies])
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cassette', default='test_get_switches_single_param',
+                        help='cassette whose response bodies are decoded')
+    parser.add_argument('--number', type=int, default=100,
+                        help='decodes of every body per measurement')
+    args = parser.parse_args()
+
+    bodies = recorded_bodies(args.cassette)
+    size = sum(len(body) for body in bodies)
+    print('{}: {} bodies, {:.1f} KiB'.format(args.cassette, len(bodies), size / 1024.0))
+
+    baseline = bench(lambda body: json.loads(body.decode('utf-8')), bodies, args.number)
+    print('{:<24} {:>10} {:>10} {:>8}'.format('decoder', 'ms/pass', 'MiB/s', 'speedup'))
+    print('{:<24} {:>10.3f} {:>10.1f} {:>8.2f}'.format(
+        'str + json.loads', baseline * 1000, size / baseline / 2 ** 20, 1.0))
+    for name in reversed(codec.available_codecs()):
+        elapsed = bench(codec.get_codec(name).loads, bodies, args.number)
+        print('{:<24} {:>10.3f} {:>10.1f} {:>8.2f}'.format(
+            name + ' bytes', elapsed * 1000, size / elapsed / 2 ** 20, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
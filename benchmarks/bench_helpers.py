@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the pyhpecfm helpers against the local mock CFM of benchmarks/mockcfm.py.
+
+Every bench_* function below is one benchmark, run like a pytest-benchmark test: it receives
+a connected CFMClient and the mock server, and is called for a number of rounds after a
+warm-up round. For each benchmark the throughput, the p50 and p99 latency of a round and the
+peak memory allocated by a round (measured with tracemalloc in a separate round, so tracing
+does not slow down the timed ones) are reported. Results can be saved as JSON and compared
+with a saved baseline, failing when a benchmark got slower than the tolerance allows.
+
+    python benchmarks/bench_helpers.py --switches 64 --rounds 20
+    python benchmarks/bench_helpers.py --save baseline.json
+    python benchmarks/bench_helpers.py --compare baseline.json --tolerance 0.25
+    python benchmarks/bench_helpers.py -k ports --latency 0.002 --unavailable-rate 0.01
+"""
+import argparse
+import gc
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from mockcfm import USERNAMES, MockCFMServer  # noqa: E402
+from pyhpecfm import audit, client, fabric, system  # noqa: E402
+from pyhpecfm.inventory import Inventory  # noqa: E402
+from pyhpecfm.retry import RetryPolicy  # noqa: E402
+
+
+def bench_get_versions(cfm, mock):
+    system.get_versions(cfm)
+
+
+def bench_get_fabrics(cfm, mock):
+    fabric.get_fabrics(cfm)
+
+
+def bench_add_fabrics(cfm, mock):
+    fabric.add_fabrics(cfm, '10.0.0.1', 'bench', 'Benchmark fabric')
+
+
+def bench_get_fabric_ip_networks(cfm, mock):
+    fabric.get_fabric_ip_networks(cfm)
+
+
+def bench_add_ip_fabric(cfm, mock):
+    fabric_uuid = next(mock.fabric.fabrics())['uuid']
+    switch_uuid = next(mock.fabric.switches())['uuid']
+    fabric.add_ip_fabric(cfm, fabric_uuid, 'bench', 'Benchmark IP network', 'isl', '10.99.0.0',
+                         16, 4000, switch_uuid, '10.99.0.1')
+
+
+def bench_delete_fabric_ip_networks(cfm, mock):
+    fabric.delete_fabric_ip_networks(cfm, fabric.get_fabric_ip_networks(cfm)[0]['uuid'])
+
+
+def bench_perform_fit(cfm, mock):
+    fabric.perform_fit(cfm, next(mock.fabric.fabrics())['uuid'], 'bench', 'Benchmark fit')
+
+
+def bench_get_switches(cfm, mock):
+    fabric.get_switches(cfm)
+
+
+def bench_get_switches_with_ports(cfm, mock):
+    fabric.get_switches(cfm, params={'ports': True})
+
+
+def bench_iter_switches_with_ports(cfm, mock):
+    for _ in fabric.iter_switches(cfm, params={'ports': True}):
+        pass
+
+
+def bench_get_switches_for_fabrics(cfm, mock):
+    fabric.get_switches_for_fabrics(cfm, [record['uuid'] for record in mock.fabric.fabrics()])
+
+
+def bench_create_switch(cfm, mock):
+    fabric.create_switch(cfm, {'host': '10.0.0.2', 'name': 'bench', 'description': ''})
+
+
+def bench_get_ports(cfm, mock):
+    fabric.get_ports(cfm)
+
+
+def bench_iter_ports(cfm, mock):
+    for _ in fabric.iter_ports(cfm):
+        pass
+
+
+def bench_get_ports_for_switches(cfm, mock):
+    fabric.get_ports_for_switches(cfm, [switch['uuid'] for switch in mock.fabric.switches()])
+
+
+def bench_get_lags(cfm, mock):
+    fabric.get_lags(cfm)
+
+
+def bench_get_vlan_groups(cfm, mock):
+    fabric.get_vlan_groups(cfm)
+
+
+def bench_update_ports(cfm, mock):
+    ports = itertools.islice(mock.fabric.ports(), 100)
+    fabric.update_ports(cfm, [port['uuid'] for port in ports], 'native_vlan', 10)
+
+
+def bench_bulk_update_ports(cfm, mock):
+    fabric.bulk_update_ports(cfm, [([port['uuid']], 'native_vlan', 10 + index % 4)
+                                   for index, port in enumerate(mock.fabric.ports())])
+
+
+def bench_get_audit_logs(cfm, mock):
+    system.get_audit_logs(cfm)
+
+
+def bench_iter_audit_logs(cfm, mock):
+    for _ in system.iter_audit_logs(cfm):
+        pass
+
+
+def bench_read_audit_logs(cfm, mock):
+    for _ in audit.read_audit_logs(cfm, page_size=100):
+        pass
+
+
+def bench_get_backups(cfm, mock):
+    system.get_backups(cfm)
+
+
+def bench_create_backup(cfm, mock):
+    system.create_backup(cfm)
+
+
+def bench_get_auth_sources(cfm, mock):
+    system.get_auth_sources(cfm, params={'type': 'local'})
+
+
+def bench_get_users(cfm, mock):
+    system.get_users(cfm)
+
+
+def bench_add_local_user(cfm, mock):
+    system.add_local_user(cfm, 'bench', 'Viewer', 'bench-password')
+
+
+def bench_delete_local_user(cfm, mock):
+    system.delete_local_user(cfm, 'bench')
+
+
+def bench_add_local_users(cfm, mock):
+    system.add_local_users(cfm, [(username, 'Viewer', 'bench-password')
+                                 for username in USERNAMES[1:]])
+
+
+def bench_delete_local_users(cfm, mock):
+    system.delete_local_users(cfm, USERNAMES[1:])
+
+
+def bench_inventory_load(cfm, mock):
+    Inventory.load(cfm)
+
+
+def percentile(values, fraction):
+    """
+    :param values: sorted list of numbers
+    :param fraction: float between 0 and 1
+    :return: the value at the given fraction of the list, nearest rank
+    """
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_benchmark(func, cfm, mock, rounds):
+    """
+    :return: dict with rounds, ops_per_second, p50, p99 and peak_bytes of one benchmark
+    :rtype: dict
+    """
+    func(cfm, mock)
+    timings = []
+    gc.collect()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(cfm, mock)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(cfm, mock)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'rounds': rounds, 'ops_per_second': rounds / sum(timings),
+            'p50': percentile(timings, 0.5), 'p99': percentile(timings, 0.99),
+            'peak_bytes': peak}
+
+
+def compare(results, baseline, tolerance):
+    """
+    :return: list of str describing the benchmarks whose p50 grew by more than tolerance
+    :rtype: list
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before and result['p50'] > before['p50'] * (1 + tolerance):
+            regressions.append('{}: p50 {:.2f}ms -> {:.2f}ms'.format(
+                name, before['p50'] * 1000, result['p50'] * 1000))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fabrics', type=int, default=4)
+    parser.add_argument('--switches', type=int, default=16)
+    parser.add_argument('--ports-per-switch', type=int, default=48)
+    parser.add_argument('--audits', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added by the mock CFM to every answer')
+    parser.add_argument('--unauthorized-rate', type=float, default=0.0)
+    parser.add_argument('--unavailable-rate', type=float, default=0.0)
+    parser.add_argument('-k', dest='keyword', default='',
+                        help='only run the benchmarks whose name contains this keyword')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative p50 increase over the compared results')
+    args = parser.parse_args()
+    # Injected faults are expected, keep the retry warnings of the client out of the report.
+    logging.basicConfig(level=logging.ERROR)
+
+    benchmarks = [(name[len('bench_'):], func) for name, func in sorted(globals().items())
+                  if name.startswith('bench_') and args.keyword in name]
+    results = {}
+    with MockCFMServer(args.switches, args.ports_per_switch, args.audits, args.latency,
+                       args.unauthorized_rate, args.unavailable_rate,
+                       fabrics=args.fabrics) as mock:
+        cfm = client.CFMClient(mock.host, 'admin', 'plexxi',
+                               retry_policy=RetryPolicy(max_attempts=5, backoff_base=0.01))
+        cfm.connect()
+        print('{fabrics} fabrics, {switches} switches, {ports} ports, {lags} LAGs, '
+              '{audits} audit entries'.format(**mock.fabric.counts()))
+        print('{:<28} {:>10} {:>10} {:>10} {:>10}'.format('benchmark', 'ops/s', 'p50 ms',
+                                                          'p99 ms', 'peak MiB'))
+        for name, func in benchmarks:
+            result = results[name] = run_benchmark(func, cfm, mock, args.rounds)
+            print('{:<28} {:>10.1f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+                name, result['ops_per_second'], result['p50'] * 1000, result['p99'] * 1000,
+                result['peak_bytes'] / 2.0 ** 20))
+        cfm.disconnect()
+        if mock.faults['unauthorized'] or mock.faults['unavailable']:
+            print('Injected {unauthorized} 401 and {unavailable} 503 answers'.format(
+                **mock.faults))
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as source:
+            regressions = compare(results, json.load(source), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
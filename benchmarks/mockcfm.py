@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Local mock of an HPE Composable Fabric Manager serving a synthetic fabric over HTTPS.
+
+The fabric is generated by the SyntheticFabric of the test suite with a configurable number of
+switches, ports per switch and audit entries. v1/audits is paged like on a real CFM, newest
+first with page_size, before and after parameters and next_page/prev_page links. The server
+can add latency to every answer and answer a share of the requests with 401 (revoking the
+token, as when it expires on a real CFM) or 503 with Retry-After: 0. Response bodies are
+encoded once and reused, so the server costs little next to the client being measured.
+
+It is built on the LocalCFMServer of the test suite and uses its self-signed certificate.
+
+    python benchmarks/mockcfm.py --switches 64 --ports-per-switch 48 --port 8443
+"""
+import argparse
+import collections
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                'test_pyhpecfm'))
+
+from localcfm import LocalCFMServer, cfm_body  # noqa: E402
+from synthetic import SyntheticFabric, iter_body  # noqa: E402
+
+# Page size of v1/audits when the request does not set one, as on a real CFM.
+AUDIT_PAGE_SIZE = 1000
+
+# Local users known to the mock: the one of the single user benchmarks and a batch.
+USERNAMES = ('bench',) + tuple('bench-{}'.format(index) for index in range(10))
+
+
+class MockCFMServer(LocalCFMServer):
+    """
+    Threaded HTTPS mock CFM serving a synthetic fabric with injectable latency and faults.
+
+    >>> with MockCFMServer(switches=64, latency=0.005, unavailable_rate=0.01) as mock:
+    ...     cfm = client.CFMClient(mock.host, 'admin', 'plexxi')
+    """
+
+    def __init__(self, switches=16, ports_per_switch=48, audit_entries=1000, latency=0.0,
+                 unauthorized_rate=0.0, unavailable_rate=0.0, seed=0, lags_per_switch=2,
+                 vlan_groups=8, fabrics=1):
+        """
+        :param switches: int number of switches
+        :param ports_per_switch: int number of ports of every switch
+        :param audit_entries: int number of audit log entries
+        :param latency: float seconds added to every answer
+        :param unauthorized_rate: float share of authenticated requests answered 401, which
+        also revokes the token used
+        :param unavailable_rate: float share of authenticated requests answered 503
+        :param seed: int seed of the synthetic records and of the fault injection
+        :param lags_per_switch: int number of LAGs of every switch
+        :param vlan_groups: int number of VLAN groups
+        :param fabrics: int number of fabrics the switches are spread over
+        """
+        super(MockCFMServer, self).__init__()
+        self.requests = collections.deque(maxlen=1024)
+        self.latency = latency
+        self.unauthorized_rate = unauthorized_rate
+        self.unavailable_rate = unavailable_rate
+        self.faults = {'unauthorized': 0, 'unavailable': 0}
+        self.fabric = SyntheticFabric(fabrics=fabrics, switches=switches,
+                                      ports_per_switch=ports_per_switch,
+                                      lags_per_switch=lags_per_switch, vlan_groups=vlan_groups,
+                                      audit_entries=audit_entries, seed=seed)
+        self._random = random.Random(seed)
+        self._tokens = itertools.count(1)
+        self._valid_tokens = set()
+        self._fault_lock = threading.Lock()
+        self._bodies = {}
+        self.routes.update({
+            ('GET', 'versions'): self._cached(lambda request: [{'name': 'cfm',
+                                                                'version': '5.1.0'}]),
+            ('GET', 'v1/fabrics'): self._cached(lambda request: self.fabric.fabrics()),
+            ('GET', 'v1/fabric_ip_networks'): self._cached(self._fabric_ip_networks),
+            ('GET', 'v1/switches'): self._cached(self._switches, ('ports', 'fabric')),
+            ('GET', 'v1/ports'): self._cached(self._ports, ('switches',)),
+            ('GET', 'v1/lags'): self._cached(lambda request: self.fabric.lags()),
+            ('GET', 'v1/vlan_groups'): self._cached(lambda request: self.fabric.vlan_groups()),
+            ('GET', 'v1/audits'): self._audits,
+            ('GET', 'v1/backups'): self._cached(lambda request: []),
+            ('GET', 'v1/auth/sources'): [{'uuid': 'local-source', 'type': 'local'}],
+            ('GET', 'v1/users'): self._cached(self._users, ('username',)),
+        })
+
+    def _cached(self, build, query=()):
+        """
+        Route answering with a body encoded once per value of the query parameters.
+
+        build returns the records of the answer, as a list or a generator which is encoded
+        record by record.
+        """
+        def route(request):
+            key = (request.path,) + tuple(request.query.get(name) for name in query)
+            body = self._bodies.get(key)
+            if body is None:
+                records = build(request)
+                if isinstance(records, list):
+                    body = cfm_body(records)
+                else:
+                    count = self.fabric.counts()[request.path[len('v1/'):]]
+                    body = b''.join(iter_body(records, count))
+                self._bodies[key] = body
+            return 200, None, body
+        return route
+
+    def _fabric_ip_networks(self, request):
+        return [{'uuid': str(uuid.UUID(int=index + 1)), 'fabric_uuid': fabric['uuid'],
+                 'name': 'ip-network-{}'.format(index + 1), 'description': '', 'mode': 'isl',
+                 'vlan': 4000, 'subnet': {'address': '10.{}.0.0'.format(index % 256),
+                                          'prefix_length': 16},
+                 'switch_addresses': []}
+                for index, fabric in enumerate(self.fabric.fabrics())]
+
+    def _switches(self, request):
+        switches = self.fabric.switches(ports=request.query.get('ports', '').lower() == 'true')
+        fabric_uuid = request.query.get('fabric')
+        if fabric_uuid:
+            return [switch for switch in switches if switch['fabric_uuid'] == fabric_uuid]
+        return switches
+
+    def _audits(self, request):
+        """Route answering with one page of audit entries, encoded once per page."""
+        size = int(request.query.get('page_size') or AUDIT_PAGE_SIZE)
+        before = request.query.get('before')
+        after = request.query.get('after')
+        key = (request.path, size, before, after)
+        body = self._bodies.get(key)
+        if body is None:
+            count = self.fabric.audit_count
+            cursor = self.fabric.audit_index(before or after) if before or after else count
+            if cursor is None:
+                indexes = []
+            elif after:
+                indexes = range(min(cursor + size, count - 1), cursor, -1)
+            else:
+                indexes = range(cursor - 1, max(cursor - size, 0) - 1, -1)
+            records = [self.fabric.audit(index) for index in indexes]
+            page = {}
+            if records:
+                link = '/api/v1/audits?page_size={}&{}={}'
+                page = {'next_page': link.format(size, 'before', records[-1]['uuid']),
+                        'prev_page': link.format(size, 'after', records[0]['uuid'])}
+            body = self._bodies[key] = b''.join(iter_body(records, len(records), page))
+        return 200, None, body
+
+    def _users(self, request):
+        username = request.query.get('username')
+        return [{'uuid': 'user-{}'.format(name), 'username': name} for name in USERNAMES
+                if username is None or name == username]
+
+    def _ports(self, request):
+        switch_uuid = request.query.get('switches')
+        if switch_uuid:
+            return list(self.fabric.ports(switch_uuid))
+        return self.fabric.ports()
+
+    def respond(self, request):
+        """Answer a request after the injected latency, faults and token checks."""
+        if self.latency:
+            time.sleep(self.latency)
+        if (request.method, request.path) == ('POST', 'v1/auth/token'):
+            token = 'mock-token-{}'.format(next(self._tokens))
+            with self._fault_lock:
+                self._valid_tokens.add(token)
+            return 200, None, cfm_body(token)
+
+        token = request.headers.get('Authorization', '')[len('Bearer '):]
+        with self._fault_lock:
+            draw = self._random.random()
+            if token not in self._valid_tokens or draw < self.unauthorized_rate:
+                self._valid_tokens.discard(token)
+                self.faults['unauthorized'] += 1
+                return 401, None, cfm_body('Unauthorized')
+            if draw < self.unauthorized_rate + self.unavailable_rate:
+                self.faults['unavailable'] += 1
+                return 503, {'Retry-After': '0'}, cfm_body('Service Unavailable')
+
+        if request.method != 'GET' and (request.method, request.path) not in self.routes:
+            # Writes are accepted without changing the synthetic fabric.
+            return 200, None, cfm_body(str(uuid.uuid4()))
+        return super(MockCFMServer, self).respond(request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic CFM fabric over HTTPS.')
+    parser.add_argument('--fabrics', type=int, default=1)
+    parser.add_argument('--switches', type=int, default=16)
+    parser.add_argument('--ports-per-switch', type=int, default=48)
+    parser.add_argument('--audits', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--unauthorized-rate', type=float, default=0.0)
+    parser.add_argument('--unavailable-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8443)
+    args = parser.parse_args()
+
+    mock = MockCFMServer(args.switches, args.ports_per_switch, args.audits, args.latency,
+                         args.unauthorized_rate, args.unavailable_rate, fabrics=args.fabrics)
+    mock.start(port=args.port)
+    counts = mock.fabric.counts()
+    print('Serving {} switches and {} ports on https://{}/api/ (Ctrl-C to stop)'.format(
+        counts['switches'], counts['ports'], mock.host))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
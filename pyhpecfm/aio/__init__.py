@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio variants of the pyhpecfm client and helper modules.
+
+The modules in this package mirror pyhpecfm.client, pyhpecfm.fabric and pyhpecfm.system
+one-to-one, with every API call exposed as a coroutine. They require the optional aiohttp
+dependency, which can be installed with ``pip install pyhpecfm[async]``.
+"""
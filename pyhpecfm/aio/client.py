@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+"""
+This module holds the asyncio client object for authenticating with an HPE Composable Fabric
+Manager. AsyncCFMClient exposes the same connect/get/post/put/patch/delete surface as
+pyhpecfm.client.CFMClient, with every call implemented as a coroutine on top of aiohttp.
+
+>>> import asyncio
+>>> from pyhpecfm.aio import client, fabric
+>>> async def main():
+...     async with client.AsyncCFMClient('hpecfm.local', 'admin', 'plexxi') as cfm:
+...         return await fabric.get_switches(cfm)
+>>> asyncio.get_event_loop().run_until_complete(main())
+"""
+import asyncio
+import datetime
+import json as jsonlib
+import logging
+import time
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from pyhpecfm import hooks as request_hooks
+from pyhpecfm import tracing
+from pyhpecfm.client import CFMApiError
+from pyhpecfm.codec import get_codec
+from pyhpecfm.retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCFMResponse(object):
+    """
+    Fully read response of an AsyncCFMClient API call.
+
+    The body is read before the underlying aiohttp response is released, so the object can be
+    used like a requests.Response by the helper functions: ``response.json().get('result')``.
+    """
+
+    def __init__(self, method, url, status_code, reason, headers, content, codec=None,
+                 elapsed=None, bytes_sent=None):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self._codec = codec
+        # Time until the headers were received, as for requests.Response.elapsed.
+        self.elapsed = elapsed
+        self.bytes_sent = bytes_sent
+
+    def __bool__(self):
+        return self.ok
+
+    __nonzero__ = __bool__
+
+    @property
+    def ok(self):
+        """bool True if the status code is lower than 400."""
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        """str body of the response decoded as UTF-8."""
+        return self.content.decode('utf-8')
+
+    def json(self, **kwargs):
+        """
+        Decode the JSON body of the response.
+
+        The body bytes are decoded with the codec of the client, or with json.loads when
+        keyword arguments are given.
+
+        :param kwargs: optional arguments passed through to json.loads
+        :return: decoded JSON document
+        """
+        if self._codec is None or kwargs:
+            return jsonlib.loads(self.text, **kwargs)
+        return self._codec.loads(self.content)
+
+
+def _encode_params(params):
+    """
+    Convert query parameters to the form accepted by aiohttp.
+
+    requests renders values with str(), silently drops None values and repeats the key for list
+    values. aiohttp refuses booleans, so the same rules are applied here to keep URLs identical
+    between the synchronous and asynchronous clients.
+
+    :param params: dict of query parameters
+    :return: list of (key, value) tuples or None
+    """
+    if not params:
+        return None
+    encoded = []
+    for key, value in params.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for item in values:
+            if item is not None:
+                encoded.append((key, str(item)))
+    return encoded
+
+
+class AsyncCFMClient(object):
+    """Asyncio client class for the CFM REST API bindings."""
+
+    def __init__(self, host, username, password, verify_ssl=False, timeout=30,
+                 retry_policy=None, token_lifetime=1800, token_refresh_margin=60, codec=None,
+                 hooks=None):
+        """
+        Initialize API instance.
+
+        :param host: str FQDN or IPv4 Address of the target CFM host
+        :param username: str valid username with sufficient permissions on the CFM host
+        :param password: str valid password for username var
+        :param verify_ssl: bool verify SSL certificate. Default value is False
+        :param timeout: int timeout in seconds for API calls
+        :param retry_policy: pyhpecfm.retry.RetryPolicy deciding which failed calls are retried
+        and when. Defaults to a policy with its own retry budget for this client
+        :param token_lifetime: int seconds an unused token stays valid on the CFM host, the
+        token_lifetime of the CFM user (30 minutes by default). None disables proactive refresh
+        :param token_refresh_margin: int seconds before the expiry of the token at which it is
+        refreshed ahead of the next call
+        :param codec: JSON codec of request and response bodies, see pyhpecfm.codec. Defaults
+        to the fastest one installed
+        :param hooks: list of callables invoked with a pyhpecfm.hooks.RequestEvent after every
+        attempt of an API call
+        """
+        if aiohttp is None:
+            raise CFMApiError('AsyncCFMClient requires the aiohttp package')
+        self._host = host
+        self._username = username
+        self._password = password
+        self._verify_ssl = verify_ssl
+        self._timeout = timeout
+        self._session = None
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._codec = get_codec(codec)
+        self._auth_token = None
+        self._auth_lock = None
+        self._token_lifetime = token_lifetime
+        self._token_refresh_margin = token_refresh_margin
+        self._token_expires = None
+        self._hooks = tuple(hooks or ())
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect()
+
+    async def connect(self, login=True):
+        """
+        Connect to CFM API and retrieve token.
+
+        The aiohttp session and its connections are kept when reconnecting, and calls in
+        flight keep using the previous token until the new one is in place.
+
+        :param login: bool login and retrieve authentication token
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(headers={'Accept': 'application/json'})
+
+        if login:
+            async with self._get_auth_lock():
+                await self._login()
+        else:
+            self._auth_token = None
+
+    async def disconnect(self):
+        """Disconnect from CFM API session and delete token."""
+        self._auth_token = None
+        self._token_expires = None
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    def _get_auth_lock(self):
+        """Return the lock serializing logins, created in the running event loop."""
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        return self._auth_lock
+
+    async def _login(self):
+        """Retrieve a new authentication token. Must be awaited with the auth lock held."""
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Auth-Username': '{}'.format(self._username),
+            'X-Auth-Password': '{}'.format(self._password),
+        }
+        response = await self._call_api('POST', 'v1/auth/token', headers=headers)
+        token = response.json().get('result')
+        if not token:
+            raise CFMApiError('Error retrieving authentication token')
+        self._auth_token = token
+        self._token_used(token)
+
+    async def _refresh_token(self, stale_token):
+        """
+        Replace an expired or rejected token, logging in once for all the tasks sharing it.
+
+        :param stale_token: str token which was found expired or was rejected with a 401
+        :return: str current authentication token
+        :rtype: str
+        """
+        async with self._get_auth_lock():
+            if self._auth_token is None or self._auth_token == stale_token:
+                logger.info('Refreshing API token for %s@%s', self._username, self._host)
+                with tracing.span('cfm.refresh_token'):
+                    await self._login()
+            return self._auth_token
+
+    def _token_used(self, token):
+        """Push back the expiry of a token the CFM host just accepted."""
+        if self._token_lifetime and token == self._auth_token:
+            self._token_expires = time.monotonic() + self._token_lifetime
+
+    def _token_expiring(self):
+        """bool True if the token is about to expire and should be refreshed before use."""
+        expires = self._token_expires
+        return (expires is not None and
+                time.monotonic() >= expires - self._token_refresh_margin)
+
+    def add_hook(self, hook):
+        """
+        Call hook with a pyhpecfm.hooks.RequestEvent after every attempt of an API call.
+
+        :param hook: callable taking a RequestEvent
+        """
+        self._hooks += (hook,)
+
+    def remove_hook(self, hook):
+        """
+        Stop calling a hook added with add_hook or passed to the constructor.
+
+        :param hook: callable taking a RequestEvent
+        """
+        self._hooks = tuple(item for item in self._hooks if item != hook)
+
+    async def delete(self, path, params=None):
+        """
+        Helper coroutine for HTTP DELETE commands
+
+        :param params:
+        :param path: str the requested path
+        :return: AsyncCFMResponse API call response
+        :rtype: AsyncCFMResponse
+        """
+        return await self._call_api(method='DELETE', path=path, params=params)
+
+    async def get(self, path, params=None):
+        """
+        Helper coroutine for HTTP GET commands
+
+        :param params:
+        :param path: str the requested path
+        :return: AsyncCFMResponse API call response
+        :rtype: AsyncCFMResponse
+        """
+        return await self._call_api(method='GET', path=path, params=params)
+
+    async def patch(self, path, data):
+        """
+        Helper coroutine for HTTP PATCH commands
+
+        :param path: str the requested path
+        :param data: dict the data to send
+        :return: AsyncCFMResponse API call response
+        :rtype: AsyncCFMResponse
+        """
+        return await self._call_api(method='PATCH', path=path, json=data)
+
+    async def post(self, path, params=None, data=None):
+        """
+        Helper coroutine for HTTP POST commands
+
+        :param data:
+        :param params:
+        :param path: str the requested path
+        :return: AsyncCFMResponse API call response
+        :rtype: AsyncCFMResponse
+        """
+        return await self._call_api(method='POST', path=path, params=params, json=data)
+
+    async def put(self, path, data):
+        """
+        Helper coroutine for HTTP PUT commands
+
+        :param path: str the requested path
+        :param data: dict the data to send
+        :return: AsyncCFMResponse API call response
+        :rtype: AsyncCFMResponse
+        """
+        return await self._call_api(method='PUT', path=path, json=data)
+
+    async def _call_api(self, method, path, params=None, headers=None, json=None,
+                        timeout=None):
+        """Execute a CFM REST API request.
+
+        Arguments:
+            method (str): HTTP request type
+            path (str): The request path of the REST API.
+            params (dict): (Optional) query parameters.
+            headers (dict): (Optional) HTTP Headers to send with the request.
+            json (dict): (Optional) json to send in the body of the request.
+            timeout (int): Optional timeout override.
+
+        Failed calls are retried as decided by the retry policy of the client, and a 401 logs
+        in again before retrying. A token close to expiry is refreshed before the call. Every
+        attempt is reported to the request hooks of the client.
+
+        Returns:
+            AsyncCFMResponse (class): fully read response object
+        """
+        request_headers = headers if headers else {'Content-Type': 'application/json;charset=UTF-8'}
+
+        token = None
+        if path != 'v1/auth/token':
+            token = self._auth_token
+            if token and self._token_expiring():
+                token = await self._refresh_token(token)
+            if not token:
+                # If this is not a login request, then there is a problem with the auth token.
+                logger.error('%s %s aborted: failed to obtain auth token', method, path)
+                return
+            # Set Auth Token in Header
+            request_headers.update(
+                {
+                    'Authorization': 'Bearer {}'.format(token),
+                    'X-Auth-Refresh-Token': 'true'
+                }
+            )
+
+        self._retry_policy.record_request()
+        attempts = 0
+        while True:
+            attempts += 1
+            started, begin = time.time(), time.monotonic()
+            try:
+                with tracing.span('cfm.request', {'http.method': method, 'cfm.path': path,
+                                                  'cfm.attempt': attempts}) as span:
+                    if self._session:
+                        response = await self._process_request(
+                            self._session, method, path, params, request_headers, json,
+                            timeout, verify=self._verify_ssl)
+                    else:
+                        async with aiohttp.ClientSession(
+                                headers={'Accept': 'application/json'}) as session:
+                            response = await self._process_request(
+                                session, method, path, params, request_headers, json, timeout,
+                                verify=self._verify_ssl)
+                    span.set_attribute('http.status_code', response.status_code)
+                if token is not None:
+                    self._token_used(token)
+                self._record(method, path, attempts, started, begin, response)
+                return response
+            except aiohttp.ClientResponseError as exception:
+                error_code = int(exception.status)
+                failure, kind = exception, request_hooks.FAILURE_STATUS
+                if (error_code == 401 and token is not None and
+                        attempts < self._retry_policy.max_attempts):
+                    logger.info('%s %s: API token no longer valid', method, path)
+                    self._record(method, path, attempts, started, begin, None, kind,
+                                 request_hooks.RETRY_REAUTH, status=error_code)
+                    token = await self._refresh_token(token)
+                    request_headers.update({'Authorization': 'Bearer {}'.format(token)})
+                    continue
+                delay = None
+                if error_code in self._retry_policy.retry_statuses:
+                    retry_after = (exception.headers.get('Retry-After') if exception.headers
+                                   else None)
+                    delay = self._retry_policy.next_delay(method, attempts, retry_after)
+            except asyncio.TimeoutError as exception:
+                failure, kind, error_code = exception, request_hooks.FAILURE_TIMEOUT, None
+                delay = None
+                if self._retry_policy.retry_timeouts:
+                    delay = self._retry_policy.next_delay(method, attempts)
+            except aiohttp.ClientConnectionError as exception:
+                failure, kind, error_code = exception, request_hooks.FAILURE_CONNECTION, None
+                delay = None
+                if self._retry_policy.retry_connection_errors:
+                    delay = self._retry_policy.next_delay(method, attempts)
+
+            if delay is None:
+                self._record(method, path, attempts, started, begin, None, kind,
+                             status=error_code)
+                logger.error('%s %s failed after %d attempt(s): %s', method, path, attempts,
+                             failure)
+                raise failure
+            self._record(method, path, attempts, started, begin, None, kind, kind, delay,
+                         status=error_code)
+            logger.warning('%s %s failed (%s), retrying in %.2fs', method, path, failure, delay)
+            with tracing.span('cfm.retry_sleep', {'cfm.retry_delay': delay}):
+                await asyncio.sleep(delay)
+
+    def _record(self, method, path, attempt, started, begin, response, failure=None,
+                retry_reason=None, retry_delay=None, status=None):
+        """
+        Log an attempt of an API call and report it to the request hooks.
+
+        :param begin: float time.monotonic() timestamp at which the request was sent
+        :param response: AsyncCFMResponse answering the attempt, None if it failed
+        :param status: int HTTP status of a failed attempt
+        """
+        latency = time.monotonic() - begin
+        if response is not None:
+            status = response.status_code
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s %s attempt %d: %s in %.3fs', method, path, attempt,
+                         status if status is not None else failure, latency)
+        hooks = self._hooks
+        if not hooks:
+            return
+        event = request_hooks.RequestEvent(method, path, attempt, status, started,
+                                           latency=latency, failure=failure,
+                                           retry_reason=retry_reason, retry_delay=retry_delay)
+        if response is not None:
+            if response.elapsed is not None:
+                event.ttfb = response.elapsed.total_seconds()
+            event.bytes_sent = response.bytes_sent
+            event.bytes_received = len(response.content)
+        request_hooks.call_hooks(hooks, event)
+
+    async def _process_request(self, session, method, path, params, headers, json, timeout=None,
+                               verify=False):
+        """Execute a REST API request using the supplied session.
+
+        Arguments:
+            session (aiohttp.ClientSession): The session to use to issue the HTTP request.
+            method (str): HTTP request type
+            path (str): The request path of the CFM REST API.
+            params (dict): Optional query parameters.
+            headers (dict): Optional HTTP Headers to send with the request.
+            json (dict): Optional json to send in the body of the request.
+            timeout (int): Optional timeout override.
+            verify (bool): Optional verification of the server certificate.
+
+        Raises (Exception):
+            For any exception encountered.
+
+        Returns:
+            AsyncCFMResponse: The fully read response
+        """
+        url = 'https://{}/api/{}'.format(self._host, path)
+        data = self._codec.dumps(json) if json is not None else None
+        request = {
+            'method': method,
+            'url': url,
+            'timeout': aiohttp.ClientTimeout(total=timeout or self._timeout),
+            'headers': headers,
+            'params': _encode_params(params),
+            'data': data,
+            'ssl': None if verify else False,
+        }
+
+        begin = time.monotonic()
+        async with session.request(**request) as response:
+            elapsed = datetime.timedelta(seconds=time.monotonic() - begin)
+            content = await response.read()
+            if response.status >= 400:
+                logger.debug('%s %s failed with status %s', method, path, response.status)
+                response.raise_for_status()
+            return AsyncCFMResponse(method, str(response.url), response.status, response.reason,
+                                    response.headers, content, self._codec, elapsed,
+                                    len(data) if data else 0)
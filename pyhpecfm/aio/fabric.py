@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains coroutines for working with fabric objects
+of the HPE Composabale Fabric Manager instance. Each coroutine mirrors the function of the
+same name in pyhpecfm.fabric and expects an AsyncCFMClient.
+
+For detailed documentation on the HPE Composable Fabric Manager API, please see the API
+documentation located in your local CFM instance
+"""
+from pyhpecfm.tracing import traced
+
+
+####################
+# Fabric functions #
+####################
+
+
+@traced
+async def get_fabrics(cfmclient, fabric_uuid=None):
+    """
+    Get a list of Fabrics currently defined in Composable Fabric.
+    :param cfmclient: object of type AsyncCFMClient
+    :param fabric_uuid: UUID of fabric
+    :return: list of Dictionary objects where each dictionary represents a fabric
+    :rtype: list
+    """
+    path = 'v1/fabrics'
+    if fabric_uuid:
+        path += '/{}'.format(fabric_uuid)
+    return (await cfmclient.get(path)).json().get('result')
+
+
+@traced
+async def add_fabrics(cfmclient, switch_ip, name, description):
+    """
+    Coroutine to add a new fabric for management under a specific CFM instance
+    :param cfmclient: object of type AsyncCFMClient
+    :param switch_ip: IP address of one switch in the fabric
+    :param name: Name of the new fabric
+    :param description: description of the fabric
+    :return:
+    """
+    path = 'v1/fabrics'
+    data = {
+        'host': '{}'.format(switch_ip),
+        'name': '{}'.format(name),
+        'description': '{}'.format(description)
+    }
+    return (await cfmclient.post(path, data=data)).json().get('result')
+
+
+@traced
+async def get_fabric_ip_networks(cfmclient, fabric_uuid=None):
+    """
+    Get a list of IP networks from the Composable Fabric.
+    :param cfmclient: object of type AsyncCFMClient
+    :param fabric_uuid: UUID of fabric
+    :return: list of IP address dict objects
+    :rtype: list
+    """
+    path = 'v1/fabric_ip_networks'
+    if fabric_uuid:
+        path += '/{}'.format(fabric_uuid)
+    return (await cfmclient.get(path)).json().get('result')
+
+
+@traced
+async def add_ip_fabric(cfmclient, fabric_uuid, name, description, mode, subnet, prefix_length,
+                        vlan, switch_uuid, switch_address):
+    """
+    Coroutine to add new IP fabrics on specified CFM instance. See
+    pyhpecfm.fabric.add_ip_fabric for a description of the arguments.
+    :param cfmclient: object of type AsyncCFMClient
+    :return: dict containing response of request
+    """
+    path = 'v1/fabric_ip_networks'
+    data = {
+        "fabric_uuid": '{}'.format(fabric_uuid),
+        "subnet": {
+            "prefix_length": int("{}".format(prefix_length)),
+            "address": "{}".format(subnet)
+        },
+        "description": "{}".format(description),
+        "vlan": int("{}".format(vlan)),
+        "name": "{}".format(name),
+        "switch_addresses": [
+            {
+                "switch_uuid": "{}".format(switch_uuid),
+                "ip_address": {
+                    "prefix_length": int("{}".format(prefix_length)),
+                    "address": "{}".format(switch_address)
+                }
+            }
+        ],
+        "mode": "{}".format(mode)
+    }
+    return (await cfmclient.post(path, data=data)).json().get('result')
+
+
+@traced
+async def delete_fabric_ip_networks(cfmclient, fabric_uuid):
+    """
+    Delete a specific IP networks from the Composable Fabric.
+    :param cfmclient: object of type AsyncCFMClient
+    :param fabric_uuid: UUID of fabric
+    :return:
+    :rtype: list
+    """
+    path = 'v1/fabric_ip_networks/{}'.format(fabric_uuid)
+    return (await cfmclient.delete(path)).json().get('result')
+
+#####################
+# Fitting functions #
+#####################
+
+
+@traced
+async def perform_fit(cfmclient, fabric_uuid, name, description):
+    """
+    Request a full fit across managed Composable Fabrics.
+    :param cfmclient: object of type AsyncCFMClient
+    :param fabric_uuid: Valid Fabric UUID of an existing fabric
+    :param name: Simple name of the fit
+    :param description: Longer Description of the fitting request
+    :return:
+    """
+    data = {
+        'fabric_uuid': '{}'.format(fabric_uuid),
+        'name': '{}'.format(name),
+        'description': '{}'.format(description)
+    }
+    path = 'v1/fits'
+    return await cfmclient.post(path, data=data)
+
+
+####################
+# Switch functions #
+####################
+
+
+@traced
+async def get_switches(cfmclient, params=None):
+    """
+    Get a list of Composable Fabric switches
+    :param cfmclient: object of type AsyncCFMClient
+    :param params: dict of query parameters used to filter request from API
+    :return: list of dicts
+    """
+    return (await cfmclient.get('v1/switches', params)).json().get('result')
+
+
+@traced
+async def create_switch(cfmclient, data, fabric_type=None):
+    """
+    Create a Composable Fabric switch.
+    """
+    params = {'type': fabric_type} if fabric_type else None
+    return (await cfmclient.post('v1/switches', params, data)).json().get('result')
+
+
+####################
+# Lag functions    #
+####################
+
+
+@traced
+async def get_lags(cfmclient, params=None):
+    """
+    Get a list of link aggregated objects
+    :param cfmclient: object of type AsyncCFMClient
+    :param params: dict of query parameters used to filter request from API
+    :return: list of dicts
+    """
+    return (await cfmclient.get('v1/lags', params)).json().get('result')
+
+
+##################
+# Port functions #
+##################
+
+
+@traced
+async def get_ports(cfmclient, switch_uuid=None):
+    """
+    Get Composable Fabric switch ports.
+    :param cfmclient: object of type AsyncCFMClient
+    :param switch_uuid: switch_uuid: UUID of switch from which to fetch port data
+    :return: list of Dictionary objects where each dictionary represents a port on a
+    Composable Fabric Module
+    :rtype: list
+    """
+    path = 'v1/ports'
+    if switch_uuid:
+        path += '?switches={}&type=access'.format(switch_uuid)
+    return (await cfmclient.get(path)).json().get('result')
+
+
+@traced
+async def update_ports(cfmclient, port_uuids, field, value):
+    """
+    Update attributes of composable fabric switch ports
+    :param cfmclient: object of type AsyncCFMClient
+    :param port_uuids: list of str representing Composable Fabric port UUIDs
+    :param field: str specific field which is desired to be modified (case-sensitive)
+    :param value: str specific field which sets the new desired value for the field
+    :return: dict which contains count, result, and time of the update
+    :rtype: dict
+    """
+    if port_uuids:
+        data = [{
+            'uuids': port_uuids,
+            'patch': [
+                {
+                    'path': '/{}'.format(field),
+                    'value': value,
+                    'op': 'replace'
+                }
+            ]
+        }]
+        return await cfmclient.patch('v1/ports', data)
+
+
+##################
+# VLAN functions #
+##################
+
+
+@traced
+async def get_vlan_groups(cfmclient, params=None):
+    """
+    Get Composable Fabric vlan groups.
+    :param params:
+    :param cfmclient: object of type AsyncCFMClient
+    :return: list of VLAN Group dictionary objects in the Composable Fabric
+    :rtype: list
+    """
+    return (await cfmclient.get('v1/vlan_groups', params)).json().get('result')
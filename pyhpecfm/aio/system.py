@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains coroutines related to working with the system characteristics of the
+desired HPE Composable Fabric Manager instance. Each coroutine mirrors the function of the
+same name in pyhpecfm.system and expects an AsyncCFMClient.
+"""
+from pyhpecfm.tracing import traced
+
+
+@traced
+async def get_versions(cfmclient):
+    """
+    Query the versions API to return the version number of the system represented by the
+    AsyncCFMClient object
+
+    :param cfmclient: object of type AsyncCFMClient
+    :return: list of dicts
+    """
+    path = 'versions'
+    response = await cfmclient.get(path)
+    return response.json().get('result') if response else None
+
+
+@traced
+async def get_audit_logs(cfmclient):
+    """
+    Get :List of audit log records currently defined in Composable Fabric.
+    :param cfmclient: object of type AsyncCFMClient
+    :return: list of Dictionary objects where each dictionary represents a single entry in the
+    audit log of the HPE Composable Fabric Manager
+    :rtype: list
+    """
+    path = 'v1/audits'
+    response = await cfmclient.get(path)
+    return response.json().get('result') if response else None
+
+
+@traced
+async def get_backups(cfmclient, uuid=None):
+    """
+    Get a list of current backups located on the Composable Fabric Manager
+    represented by the cfmclient object.
+    :param cfmclient: object of type AsyncCFMClient
+    :param uuid: str that represents the unique identifier for a specific backup
+    :return: single dictionary if UUID. List of dictionaries where each dictionary represents a
+    single backup.
+    """
+    path = 'v1/backups'
+    if uuid:
+        path += '/{}'.format(uuid)
+    response = await cfmclient.get(path)
+    return response.json().get('result') if response else None
+
+
+@traced
+async def create_backup(cfmclient):
+    """
+    Initiate a new backup on the Composable Fabric Manager represented by the
+    AsyncCFMClient object
+    :param cfmclient: object of type AsyncCFMClient
+    :return: HTTP response
+    """
+    path = 'v1/backups'
+    response = await cfmclient.post(path)
+    return response.json().get('result') if response else None
+
+
+@traced
+async def get_auth_sources(cfmclient, params=None):
+    """
+    Query current auth sources from a Composable Fabric Manager represented
+    by the AsyncCFMClient object
+    :param cfmclient: object of type AsyncCFMClient
+    :return: list of dict where each dict represents a CFM auth source
+    """
+    path = 'v1/auth/sources'
+    response = await cfmclient.get(path, params)
+    return response.json().get('result')
+
+
+@traced
+async def get_users(cfmclient, params=None):
+    """
+    Query current local users from a Composable Fabric Manager represented
+    by the AsyncCFMClient object
+    :param cfmclient: object of type AsyncCFMClient
+    :return: list of dict where each dict represents a CFM user
+    """
+    path = 'v1/users'
+    response = await cfmclient.get(path, params)
+    return response.json().get('result')
+
+
+@traced
+async def add_local_user(cfmclient, username, role, password, params=None):
+    """
+    Add a single new local user to a Composable Fabric Manager
+    represented by the AsyncCFMClient Object
+    :param cfmclient: object of type AsyncCFMClient
+    :param username:
+    :param role:
+    :param password:
+    :return:
+    """
+    local_uuid = (await get_auth_sources(cfmclient, params={'type': 'local'}))[0]['uuid']
+    data = {
+        "username": username,
+        "role": role,
+        "auth_source_uuid": local_uuid,
+        "password": password
+    }
+    return await cfmclient.post('v1/users', params, data)
+
+
+@traced
+async def delete_local_user(cfmclient, username):
+    """
+    Delete a single local user from a Composable Fabric Manager
+    represented by the AsyncCFMClient Object
+    :param cfmclient: object of type AsyncCFMClient
+    :param username:
+    :return:
+    """
+    user_uuid = await get_users(cfmclient, params={"username": username})
+    if len(user_uuid) > 0:
+        user_uuid = user_uuid[0]['uuid']
+    else:
+        return "Username not present"
+    path = 'v1/users/{}'.format(user_uuid)
+    return (await cfmclient.delete(path)).json().get('result')
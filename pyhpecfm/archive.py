@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+This module saves the state of an HPE Composable Fabric Manager to a single archive file and
+opens it again without a live CFM.
+
+An archive holds named collections of records (fabrics, switches, ports, LAGs, VLAN groups,
+users and backups metadata by default), each record stored as compact JSON. The file is
+versioned and indexed: a fixed preamble points to a small JSON index giving, for every
+collection, the number of records and the position of a table of record offsets. Opening an
+archive memory-maps it and reads only the index; records are decoded when they are accessed,
+so opening a multi-gigabyte archive costs the same as opening a small one.
+
+>>> from pyhpecfm import archive, client
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+>>> cfm.connect()
+>>> archive.save_snapshot(cfm, '/tmp/cfm.snapshot')
+>>> with archive.open_archive('/tmp/cfm.snapshot') as snapshot:
+...     print(len(snapshot['ports']), snapshot['ports'][0]['uuid'])
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+from pyhpecfm import fabric
+from pyhpecfm import system
+from pyhpecfm.client import CFMApiError
+
+MAGIC = b'CFMARC01'
+FORMAT_VERSION = 1
+
+# MAGIC, then the offset and length of the JSON index, little endian.
+_PREAMBLE = struct.Struct('<8sQQ')
+
+
+def snapshot_collections(cfmclient):
+    """
+    Return the collections saved by save_snapshot, read lazily from a CFM.
+
+    Switches and ports are streamed, the other collections are small.
+
+    :param cfmclient: object of type CFMClient
+    :return: dict mapping collection names to callables returning an iterable of dicts
+    :rtype: dict
+    """
+    return {
+        'fabrics': lambda: fabric.get_fabrics(cfmclient),
+        'switches': lambda: fabric.iter_switches(cfmclient),
+        'ports': lambda: fabric.iter_ports(cfmclient),
+        'lags': lambda: fabric.get_lags(cfmclient),
+        'vlan_groups': lambda: fabric.get_vlan_groups(cfmclient),
+        'users': lambda: system.get_users(cfmclient),
+        'backups': lambda: system.get_backups(cfmclient),
+    }
+
+
+def save_snapshot(cfmclient, path, collections=None, metadata=None):
+    """
+    Save the state of a CFM to an archive file.
+
+    :param cfmclient: object of type CFMClient
+    :param path: str path of the archive, replaced atomically once complete
+    :param collections: list of str names of the collections to save, all of
+    snapshot_collections() by default
+    :param metadata: dict of JSON-serializable values saved with the archive, e.g. the host
+    """
+    readers = snapshot_collections(cfmclient)
+    names = collections or list(readers)
+    write_archive(path, ((name, readers[name]()) for name in names), metadata)
+
+
+def write_archive(path, collections, metadata=None):
+    """
+    Write collections of records to an archive file.
+
+    Records are written as they are produced, so streamed collections are never held in
+    memory; only 8 bytes per record are kept for the offset tables.
+
+    :param path: str path of the archive, replaced atomically once complete
+    :param collections: dict or iterable of (name, iterable of dicts) pairs
+    :param metadata: dict of JSON-serializable values saved with the archive
+    """
+    if isinstance(collections, dict):
+        collections = collections.items()
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(dir=directory, prefix='.archive-')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(_PREAMBLE.pack(MAGIC, 0, 0))
+            position = _PREAMBLE.size
+            index = {}
+            for name, records in collections:
+                offsets = array('Q', [position])
+                for record in records or ():
+                    data = json.dumps(record, separators=(',', ':')).encode('utf-8')
+                    output.write(data)
+                    position += len(data)
+                    offsets.append(position)
+                padding = -position % 8
+                output.write(b'\0' * padding)
+                position += padding
+                if sys.byteorder == 'big':
+                    offsets.byteswap()
+                output.write(offsets.tobytes())
+                index[name] = {'count': len(offsets) - 1, 'offsets': position}
+                position += len(offsets) * offsets.itemsize
+
+            header = json.dumps({'version': FORMAT_VERSION, 'created': time.time(),
+                                 'metadata': metadata or {},
+                                 'collections': index}).encode('utf-8')
+            output.write(header)
+            output.seek(0)
+            output.write(_PREAMBLE.pack(MAGIC, position, len(header)))
+        os.replace(temporary, path)
+    except Exception:
+        os.unlink(temporary)
+        raise
+
+
+class ArchiveCollection(object):
+    """
+    Read-only sequence of the records of one collection of an archive.
+
+    Records are decoded from the mapped file on every access and not cached; keep a reference
+    to a decoded record to reuse it.
+    """
+
+    def __init__(self, name, mapping, offsets):
+        """
+        :param name: str name of the collection
+        :param mapping: mmap.mmap of the archive
+        :param offsets: sequence of int with the start of every record and the end of the last
+        """
+        self.name = name
+        self._mapping = mapping
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __repr__(self):
+        return '<ArchiveCollection {} records={}>'.format(self.name, len(self))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('{} record index out of range'.format(self.name))
+        return json.loads(self.raw(index).decode('utf-8'))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def raw(self, index):
+        """
+        :param index: int position of the record
+        :return: bytes JSON encoding of the record
+        :rtype: bytes
+        """
+        return self._mapping[self._offsets[index]:self._offsets[index + 1]]
+
+
+class Archive(object):
+    """
+    Archive file opened with open_archive().
+
+    Collections are accessed by name, e.g. archive['ports']. The archive should be closed, or
+    used as a context manager, when no longer needed.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: str path of the archive file
+        """
+        with open(path, 'rb') as source:
+            self._mapping = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            magic, index_offset, index_length = _PREAMBLE.unpack(
+                self._mapping[:_PREAMBLE.size])
+            if magic != MAGIC:
+                raise CFMApiError('{} is not a pyhpecfm archive'.format(path))
+            header = json.loads(
+                self._mapping[index_offset:index_offset + index_length].decode('utf-8'))
+            if header.get('version') != FORMAT_VERSION:
+                raise CFMApiError('Unsupported archive version {}'.format(header.get('version')))
+        except Exception:
+            self._mapping.close()
+            raise
+        self.created = header['created']
+        self.metadata = header['metadata']
+        self._index = header['collections']
+        self._collections = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, name):
+        collection = self._collections.get(name)
+        if collection is None:
+            entry = self._index[name]
+            begin = entry['offsets']
+            end = begin + (entry['count'] + 1) * 8
+            if sys.byteorder == 'big':
+                offsets = array('Q', self._mapping[begin:end])
+                offsets.byteswap()
+            else:
+                offsets = memoryview(self._mapping)[begin:end].cast('Q')
+                self._views.append(offsets)
+            collection = self._collections[name] = ArchiveCollection(name, self._mapping,
+                                                                     offsets)
+        return collection
+
+    def __repr__(self):
+        return '<Archive {}>'.format(', '.join('{}={}'.format(name, entry['count'])
+                                               for name, entry in self._index.items()))
+
+    @property
+    def collections(self):
+        """list of str names of the collections in the archive."""
+        return list(self._index)
+
+    def counts(self):
+        """
+        :return: dict mapping each collection name to its number of records
+        :rtype: dict
+        """
+        return {name: entry['count'] for name, entry in self._index.items()}
+
+    def close(self):
+        """Release the memory-mapped archive."""
+        if self._mapping is None:
+            return
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._collections = {}
+        self._mapping.close()
+        self._mapping = None
+
+
+def open_archive(path):
+    """
+    Open an archive file written by save_snapshot or write_archive.
+
+    :param path: str path of the archive file
+    :return: Archive
+    :rtype: Archive
+    """
+    return Archive(path)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains functions for reading the audit log of an HPE Composable Fabric Manager
+instance page by page.
+
+CFM pages v1/audits with UUID cursors: every answer carries a ``page`` object whose
+``next_page`` link (``before=<uuid>``) points at older records and whose ``prev_page`` link
+(``after=<uuid>``) points at newer ones. read_audit_logs follows those links lazily, filters
+records to a time window on their log_date and keeps an AuditLogCursor so that a periodic
+collector can resume with only the records added since its last run. AuditLogTailer builds a
+long-running "tail" on top of it with a high-water mark persisted to a local state file.
+"""
+import collections
+import datetime
+import json
+import os
+import tempfile
+import threading
+
+from urllib.parse import urlsplit, parse_qsl
+
+AUDITS_PATH = 'v1/audits'
+
+
+def to_log_date(value):
+    """
+    Convert a time to the CFM log_date unit, milliseconds since the epoch.
+
+    :param value: int/float milliseconds since the epoch, datetime.datetime or None. Naive
+    datetimes are taken as UTC
+    :return: int milliseconds since the epoch or None
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+class AuditLogCursor(object):
+    """
+    Position of the newest audit record consumed by read_audit_logs.
+
+    The cursor is updated as records are yielded and can be persisted with to_dict() and
+    restored with from_dict() between runs.
+    """
+
+    def __init__(self, after=None, log_date=None):
+        """
+        :param after: str UUID of the newest record consumed, None to start from scratch
+        :param log_date: int log_date of that record in milliseconds since the epoch
+        """
+        self.after = after
+        self.log_date = log_date
+
+    def __repr__(self):
+        return 'AuditLogCursor(after={!r}, log_date={!r})'.format(self.after, self.log_date)
+
+    def advance(self, record):
+        """Move the cursor to record if it is newer than the current position."""
+        log_date = record.get('log_date')
+        if self.log_date is None or (log_date is not None and log_date >= self.log_date):
+            self.after = record.get('uuid')
+            self.log_date = log_date
+
+    def to_dict(self):
+        """
+        :return: dict JSON serializable representation of the cursor
+        """
+        return {'after': self.after, 'log_date': self.log_date}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :param data: dict produced by to_dict, or None for an empty cursor
+        :return: AuditLogCursor
+        """
+        data = data or {}
+        return cls(after=data.get('after'), log_date=data.get('log_date'))
+
+
+def _link_params(link):
+    """Turn a page link such as '/api/v1/audits?page_size=1000&before=<uuid>' into params."""
+    return dict(parse_qsl(urlsplit(link).query)) if link else None
+
+
+def get_audit_log_page(cfmclient, params=None):
+    """
+    Get one page of audit log records.
+    :param cfmclient: object of type CFMClient
+    :param params: dict of query parameters, e.g. {'page_size': 1000, 'before': '<uuid>'}
+    :return: tuple of (list of record dicts, dict page links with next_page and prev_page)
+    :rtype: tuple
+    """
+    response = cfmclient.get(AUDITS_PATH, params)
+    if not response:
+        return [], {}
+    body = response.json()
+    return body.get('result') or [], body.get('page') or {}
+
+
+def read_audit_logs(cfmclient, since=None, until=None, limit=None, cursor=None,
+                    page_size=1000):
+    """
+    Lazily read audit log records within a time window, one page at a time.
+
+    Without a cursor, or with an empty one, the log is walked from the newest record towards
+    older pages and the walk stops at the first page entirely older than since. With a cursor
+    holding a position, only records newer than that position are read, following the
+    prev_page links, and every page is walked oldest first so that the cursor never moves past
+    a record that was not yielded, even when limit is reached or the consumer stops early. In
+    both cases the cursor is moved to the newest record yielded.
+
+    :param cfmclient: object of type CFMClient
+    :param since: earliest log_date to return (inclusive), as milliseconds since the epoch or
+    datetime
+    :param until: latest log_date to return (exclusive), as milliseconds since the epoch or
+    datetime
+    :param limit: int maximum number of records to yield
+    :param cursor: AuditLogCursor to resume from and update
+    :param page_size: int number of records requested per page
+    :return: generator of audit record dicts
+    >>> from pyhpecfm import client, audit
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> cursor = audit.AuditLogCursor()
+    >>> records = list(audit.read_audit_logs(cfm, limit=500, cursor=cursor))
+    >>> new_records = list(audit.read_audit_logs(cfm, cursor=cursor))
+    """
+    since = to_log_date(since)
+    until = to_log_date(until)
+    forward = cursor is not None and cursor.after is not None
+    link = 'prev_page' if forward else 'next_page'
+    params = {'page_size': page_size}
+    if forward:
+        params['after'] = cursor.after
+
+    count = 0
+    while params:
+        records, page = get_audit_log_page(cfmclient, params)
+        if not records:
+            return
+        older_than_window = True
+        for record in (reversed(records) if forward else records):
+            log_date = record.get('log_date')
+            if since is not None and log_date is not None and log_date < since:
+                continue
+            older_than_window = False
+            if until is not None and log_date is not None and log_date >= until:
+                continue
+            if cursor is not None:
+                cursor.advance(record)
+            yield record
+            count += 1
+            if limit is not None and count >= limit:
+                return
+        if older_than_window and not forward:
+            return
+        next_params = _link_params(page.get(link))
+        params = next_params if next_params != params else None
+
+
+class AuditLogTailer(object):
+    """
+    Follow the audit log of a CFM instance and emit only records not seen before.
+
+    Each poll reads the records newer than a persisted high-water mark (an AuditLogCursor),
+    drops records already emitted, keyed by UUID and log_date, and passes the new ones to a
+    callback and/or a queue. The cursor and the keys of the most recently emitted records are
+    saved to a small JSON state file after every poll that emitted something, so the cost of
+    a poll grows with the event rate rather than with the length of the audit history, and a
+    restarted tailer carries on where it stopped.
+
+    >>> import queue
+    >>> from pyhpecfm import client, audit
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> events = queue.Queue()
+    >>> tailer = audit.AuditLogTailer(cfm, '/var/lib/collector/audit.state', queue=events)
+    >>> tailer.run(interval=30)
+    """
+
+    def __init__(self, cfmclient, state_file, callback=None, queue=None, start_at_end=True,
+                 page_size=1000, history=1000):
+        """
+        :param cfmclient: object of type CFMClient
+        :param state_file: str path of the JSON file holding the high-water mark
+        :param callback: callable invoked with each new record
+        :param queue: object with a put() method, e.g. queue.Queue, receiving each new record
+        :param start_at_end: bool when there is no saved state, only mark the newest record
+        instead of emitting the whole history on the first poll
+        :param page_size: int number of records requested per page
+        :param history: int number of emitted record keys remembered for de-duplication
+        """
+        self._cfmclient = cfmclient
+        self._state_file = state_file
+        self._callback = callback
+        self._queue = queue
+        self._start_at_end = start_at_end
+        self._page_size = page_size
+        self._seen = collections.deque(maxlen=history)
+        self._seen_keys = set()
+        self._cursor = None
+        self._load_state()
+
+    @property
+    def cursor(self):
+        """AuditLogCursor high-water mark, None before the first poll without saved state."""
+        return self._cursor
+
+    def poll(self):
+        """
+        Read the audit log once and emit the new records, oldest first.
+
+        :return: list of the records emitted
+        :rtype: list
+        """
+        if self._cursor is None:
+            self._cursor = AuditLogCursor()
+            if self._start_at_end:
+                list(read_audit_logs(self._cfmclient, limit=1, cursor=self._cursor,
+                                     page_size=1))
+                self._save_state()
+                return []
+
+        records = list(read_audit_logs(self._cfmclient, cursor=self._cursor,
+                                       page_size=self._page_size))
+        records.sort(key=lambda record: record.get('log_date') or 0)
+        emitted = []
+        for record in records:
+            key = (record.get('uuid'), record.get('log_date'))
+            if key in self._seen_keys:
+                continue
+            self._remember(key)
+            if self._callback is not None:
+                self._callback(record)
+            if self._queue is not None:
+                self._queue.put(record)
+            emitted.append(record)
+        if emitted:
+            self._save_state()
+        return emitted
+
+    def run(self, interval=10, stop_event=None):
+        """
+        Poll until stop_event is set.
+
+        :param interval: float seconds between polls
+        :param stop_event: threading.Event ending the loop when set, None to poll forever
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.poll()
+            stop_event.wait(interval)
+
+    def _remember(self, key):
+        if len(self._seen) == self._seen.maxlen:
+            self._seen_keys.discard(self._seen[0])
+        self._seen.append(key)
+        self._seen_keys.add(key)
+
+    def _load_state(self):
+        try:
+            with open(self._state_file) as state_file:
+                state = json.load(state_file)
+        except (IOError, OSError, ValueError):
+            return
+        self._cursor = AuditLogCursor.from_dict(state.get('cursor'))
+        for uuid, log_date in state.get('seen', []):
+            self._remember((uuid, log_date))
+
+    def _save_state(self):
+        state = {'cursor': self._cursor.to_dict(), 'seen': list(self._seen)}
+        directory = os.path.dirname(os.path.abspath(self._state_file))
+        handle, temporary = tempfile.mkstemp(dir=directory, prefix='.audit-state-')
+        try:
+            with os.fdopen(handle, 'w') as state_file:
+                json.dump(state, state_file)
+            os.replace(temporary, self._state_file)
+        except Exception:
+            os.unlink(temporary)
+            raise
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides an opt-in response cache for the read-only GET calls made through
+CFMClient.
+
+Entries are keyed on the request path plus its normalized query parameters, expire after a
+per-endpoint TTL and are evicted least recently used first once either the entry count or the
+byte budget is exceeded. Any POST, PUT, PATCH or DELETE made through the client invalidates
+the entries of the same resource family, e.g. a PATCH to v1/ports drops every cached v1/ports
+response.
+
+Expired entries are kept until evicted. When the CFM returned an ETag or Last-Modified
+validator with them, the client revalidates them with a conditional GET and a 304 Not Modified
+answer renews the entry without downloading or decoding the body again. Responses served from
+the cache share their decoded JSON body, so results must be treated as read-only.
+
+>>> from pyhpecfm import client, cache
+>>> response_cache = cache.ResponseCache(ttl=30, ttls={'v1/switches': 10, 'v1/audits': 0})
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi', cache=response_cache)
+"""
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+
+
+def resource_family(path):
+    """
+    Return the resource family of a CFM API path.
+
+    The family is the API version and collection name, so 'v1/users/<uuid>' and
+    'v1/users?username=admin' both belong to 'v1/users'. Unversioned paths such as 'versions'
+    are their own family.
+
+    :param path: str the requested path
+    :return: str resource family
+    """
+    segments = path.split('?', 1)[0].strip('/').split('/')
+    if len(segments) > 1 and segments[0][:1] == 'v' and segments[0][1:].isdigit():
+        return '/'.join(segments[:2])
+    return segments[0]
+
+
+def _memoize_json(response):
+    """Make response.json() decode the body once and return the same object afterwards."""
+    decode = response.json
+    decoded = []
+
+    def json(**kwargs):
+        if kwargs:
+            return decode(**kwargs)
+        if not decoded:
+            decoded.append(decode())
+        return decoded[0]
+
+    response.json = json
+
+
+class _CacheEntry(object):
+    """Cached response with its size, expiry time, resource family and validators."""
+
+    __slots__ = ('response', 'size', 'expires', 'family', 'etag', 'last_modified')
+
+    def __init__(self, response, size, expires, family):
+        self.response = response
+        self.size = size
+        self.expires = expires
+        self.family = family
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+
+
+class ResponseCache(object):
+    """Thread-safe TTL and LRU cache of GET responses."""
+
+    def __init__(self, ttl=30, ttls=None, max_entries=256, max_bytes=64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        :param ttl: float default time to live of an entry in seconds
+        :param ttls: dict mapping a path prefix (e.g. 'v1/switches') to its own TTL in seconds.
+        The longest matching prefix wins and a TTL of 0 disables caching for that prefix
+        :param max_entries: int maximum number of cached responses
+        :param max_bytes: int maximum total size of the cached response bodies
+        """
+        self._ttl = ttl
+        self._ttls = sorted((ttls or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0,
+                       'revalidations': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(path, params=None):
+        """
+        Build the cache key of a request.
+
+        Query parameters embedded in the path and passed in params are merged, rendered with
+        str() as requests does, and sorted, so equivalent requests share one entry.
+
+        :param path: str the requested path
+        :param params: dict of query parameters
+        :return: tuple cache key
+        """
+        base, _, query = path.partition('?')
+        items = parse_qsl(query, keep_blank_values=True)
+        for name, value in (params or {}).items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            items.extend((str(name), str(item)) for item in values if item is not None)
+        return base.strip('/'), tuple(sorted(items))
+
+    def ttl_for(self, path):
+        """
+        Return the TTL configured for a path.
+
+        :param path: str the requested path
+        :return: float TTL in seconds
+        """
+        path = path.strip('/')
+        for prefix, ttl in self._ttls:
+            prefix = prefix.strip('/')
+            if path == prefix or path.startswith(prefix + '/'):
+                return ttl
+        return self._ttl
+
+    def get(self, key):
+        """
+        Return the fresh cached response for a key, or None on a miss.
+
+        :param key: tuple cache key built by ResponseCache.key
+        :return: requests.Response or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires <= time.monotonic():
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry.response
+
+    def put(self, key, response):
+        """
+        Store a response, evicting least recently used entries to stay within budget.
+
+        :param key: tuple cache key built by ResponseCache.key
+        :param response: requests.Response with its body already read
+        """
+        ttl = self.ttl_for(key[0])
+        size = len(response.content or b'')
+        if ttl <= 0 or size > self._max_bytes:
+            return
+        entry = _CacheEntry(response, size, time.monotonic() + ttl, resource_family(key[0]))
+        _memoize_json(response)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._entries and (len(self._entries) > self._max_entries or
+                                     self._bytes > self._max_bytes):
+                self._discard(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def conditional_headers(self, key):
+        """
+        Return the conditional request headers for the entry of a key.
+
+        :param key: tuple cache key built by ResponseCache.key
+        :return: dict with If-None-Match and/or If-Modified-Since, empty when the key has no
+        cached entry or the entry has no validators
+        :rtype: dict
+        """
+        headers = {}
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.etag:
+                    headers['If-None-Match'] = entry.etag
+                if entry.last_modified:
+                    headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def revalidate(self, key):
+        """
+        Renew the entry of a key after the CFM answered 304 Not Modified.
+
+        :param key: tuple cache key built by ResponseCache.key
+        :return: requests.Response the cached response, or None if it was evicted meanwhile
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.expires = time.monotonic() + self.ttl_for(key[0])
+            self._entries.move_to_end(key)
+            self._stats['revalidations'] += 1
+            return entry.response
+
+    def invalidate(self, path):
+        """
+        Drop every entry of the resource family of path.
+
+        :param path: str path of a modifying request
+        :return: int number of entries dropped
+        """
+        family = resource_family(path)
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.family == family]
+            for key in keys:
+                self._discard(key)
+            self._stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: dict with hits, misses, evictions, invalidations, revalidations, entries and
+        bytes
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        return stats
+
+    def _discard(self, key):
+        """Remove an entry while holding the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
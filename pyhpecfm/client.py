@@ -3,9 +3,19 @@
 This module provides helper functions and holds the main client object
 for authenticating with an HPE Composable Fabric Manager.
 """
+import logging
+import threading
 import time
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from pyhpecfm import hooks as request_hooks
+from pyhpecfm import throttle
+from pyhpecfm import tracing
+from pyhpecfm.codec import get_codec
+from pyhpecfm.fanout import Batch
+from pyhpecfm.retry import RetryPolicy
 
 # The following lines remove warnings for self-signed certificates
 # noinspection PyUnresolvedReferences
@@ -15,16 +25,87 @@ from requests.packages.urllib3.exceptions import \
 # noinspection PyUnresolvedReferences
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)  # pylint: disable=no-member
 
+logger = logging.getLogger(__name__)
+
 
 class CFMApiError(Exception):
     """Composable Fabric Manager API exception."""
     pass
 
 
+class PoolingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter which keeps count of the connections opened and reused by its pools.
+
+    urllib3 tracks the number of connections and requests for each connection pool. The totals
+    of pools discarded by the pool manager are retired into the adapter so the counters cover
+    the whole lifetime of the adapter.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._stats_lock = threading.Lock()
+        self._retired_connections = 0
+        self._retired_requests = 0
+        super(PoolingHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PoolingHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def retire(pool):
+            with self._stats_lock:
+                self._retired_connections += pool.num_connections
+                self._retired_requests += pool.num_requests
+            if dispose:
+                dispose(pool)
+
+        pools.dispose_func = retire
+
+    def stats(self):
+        """
+        Count the connections opened and reused by this adapter.
+
+        :return: dict with connections_opened, connections_reused and requests counters
+        :rtype: dict
+        """
+        pools = self.poolmanager.pools
+        with self._stats_lock:
+            connections = self._retired_connections
+            requests_sent = self._retired_requests
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+        return {
+            'connections_opened': connections,
+            'connections_reused': max(requests_sent - connections, 0),
+            'requests': requests_sent,
+        }
+
+
+def _decode_with(response, codec):
+    """Make response.json() decode the raw body bytes with a pyhpecfm.codec codec."""
+    decode = response.json
+
+    def json(**kwargs):
+        if kwargs:
+            return decode(**kwargs)
+        return codec.loads(response.content)
+
+    response.json = json
+
+
 class CFMClient(object):
     """Client class for the CFM REST API bindings."""
 
-    def __init__(self, host, username, password, verify_ssl=False, timeout=30):
+    def __init__(self, host, username, password, verify_ssl=False, timeout=30,
+                 pool_connections=10, pool_maxsize=10, cache=None, retry_policy=None,
+                 rate_limit=None, burst=None, max_in_flight=None, token_lifetime=1800,
+                 token_refresh_margin=60, token_store=None, codec=None, hooks=None):
         """
         Initialize API instance.
 
@@ -33,15 +114,52 @@ class CFMClient(object):
         :param password: str valid password for username var
         :param verify_ssl: bool verify SSL certificate. Default value is False
         :param timeout: int timeout in seconds for API calls
+        :param pool_connections: int number of per-host connection pools to cache
+        :param pool_maxsize: int maximum number of keep-alive connections kept per pool. Should
+        be at least the number of threads sharing the client
+        :param cache: pyhpecfm.cache.ResponseCache optional cache for GET responses. Disabled
+        by default
+        :param retry_policy: pyhpecfm.retry.RetryPolicy deciding which failed calls are retried
+        and when. Defaults to a policy with its own retry budget for this client
+        :param rate_limit: float maximum sustained requests per second to the CFM host
+        :param burst: float number of requests allowed above rate_limit in a burst
+        :param max_in_flight: int maximum number of concurrent requests to the CFM host
+        The rate_limit, burst and max_in_flight limits are shared by every client of the host,
+        see pyhpecfm.throttle. When none is given, the limits already set for the host apply
+        :param token_lifetime: int seconds an unused token stays valid on the CFM host, the
+        token_lifetime of the CFM user (30 minutes by default). None disables proactive refresh
+        :param token_refresh_margin: int seconds before the expiry of the token at which it is
+        refreshed ahead of the next call
+        :param token_store: pyhpecfm.tokenstore.FileTokenStore optional store sharing tokens
+        with other clients and processes logging in to the same host as the same user
+        :param codec: JSON codec of request and response bodies, see pyhpecfm.codec. Defaults
+        to the fastest one installed
+        :param hooks: list of callables invoked with a pyhpecfm.hooks.RequestEvent after every
+        attempt of an API call
         """
+        if rate_limit or max_in_flight:
+            throttle.configure_host(host, rate=rate_limit, burst=burst,
+                                    max_in_flight=max_in_flight)
         self._host = host
         self._username = username
         self._password = password
         self._verify_ssl = verify_ssl
         self._timeout = timeout
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
         self._session = None
+        self._session_lock = threading.Lock()
+        self._closed_stats = {'connections_opened': 0, 'connections_reused': 0, 'requests': 0}
+        self._cache = cache
+        self._retry_policy = retry_policy or RetryPolicy()
         self._auth_token = None
-        self._max_connection_retries = 3
+        self._auth_lock = threading.Lock()
+        self._token_lifetime = token_lifetime
+        self._token_refresh_margin = token_refresh_margin
+        self._token_expires = None
+        self._token_store = token_store
+        self._codec = get_codec(codec)
+        self._hooks = tuple(hooks or ())
 
     def __del__(self):
         """
@@ -54,34 +172,207 @@ class CFMClient(object):
         """
         Connect to CFM API and retrieve token.
 
+        The HTTP session and its connection pool are kept when reconnecting, so a new token
+        does not cost new TLS handshakes, and calls in flight keep using the previous token
+        until the new one is in place. With a token store, a valid token saved by another
+        client or process is reused instead of logging in.
+
         :param login: bool login and retrieve authentication token
         """
-        self._session = None
-        self._auth_token = None
-
-        self._session = requests.session()
-        self._session.headers.update({'Accept': 'application/json'})
-        self._session.headers.update({'Content-Type': 'application/json'})
+        self._get_session()
 
         if login:
-            self._session.headers.update({'X-Auth-Username': '{}'.format(self._username)})
-            self._session.headers.update({'X-Auth-Password': '{}'.format(self._password)})
-
-            response = self._call_api('POST', 'v1/auth/token').json()
-            self._auth_token = response.get('result')
-            if self._auth_token:
-                self._session = requests.session()
-                self._session.headers.update({'Accept': 'application/json'})
-                self._session.headers.update(
-                    {'Authorization': 'Bearer {}'.format(self._auth_token)})
-                self._session.headers.update({'X-Auth-Refresh-Token': 'true'})
-            else:
-                raise CFMApiError('Error retrieving authentication token')
+            with self._auth_lock:
+                self._login()
+        else:
+            self._auth_token = None
 
     def disconnect(self):
-        """Disconnect from CFM API session and delete token."""
+        """Disconnect from CFM API session, delete token and close pooled connections."""
         self._auth_token = None
-        self._session = None
+        self._token_expires = None
+        with self._session_lock:
+            session, self._session = self._session, None
+            if session is not None:
+                for key, value in session.get_adapter('https://').stats().items():
+                    self._closed_stats[key] += value
+        if session is not None:
+            session.close()
+
+    def _login(self, stale_token=None):
+        """
+        Obtain an authentication token. Must be called with _auth_lock held.
+
+        With a token store, the saved token is reused unless it is stale_token or about to
+        expire. Otherwise the new token is saved while the store is still locked, so that
+        other processes waiting for the lock reuse it instead of logging in too.
+
+        :param stale_token: str token which must not be reused
+        """
+        store = self._token_store
+        if store is None:
+            self._set_token(self._request_token())
+            return
+
+        with store.lock(self._host, self._username):
+            entry = store.load(self._host, self._username)
+            if entry is not None and entry[0] != stale_token and (
+                    entry[1] is None or entry[1] - time.time() > self._token_refresh_margin):
+                self._set_token(*entry)
+                return
+            if stale_token is not None:
+                store.invalidate(self._host, self._username, stale_token)
+            token = self._request_token()
+            expires = time.time() + self._token_lifetime if self._token_lifetime else None
+            self._set_token(token, expires)
+            store.save(self._host, self._username, token, expires)
+
+    def _request_token(self):
+        """
+        Log in to the CFM host.
+
+        :return: str new authentication token
+        :rtype: str
+        """
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Auth-Username': '{}'.format(self._username),
+            'X-Auth-Password': '{}'.format(self._password),
+        }
+        response = self._call_api('POST', 'v1/auth/token', headers=headers).json()
+        token = response.get('result')
+        if not token:
+            raise CFMApiError('Error retrieving authentication token')
+        return token
+
+    def _set_token(self, token, expires=None):
+        """
+        Start using a token.
+
+        :param token: str authentication token
+        :param expires: float time.time() timestamp at which the token expires, or None to
+        count token_lifetime from now
+        """
+        self._auth_token = token
+        if expires is not None:
+            self._token_expires = time.monotonic() + expires - time.time()
+        else:
+            self._token_expires = None
+            self._token_used(token)
+
+    def _refresh_token(self, stale_token):
+        """
+        Replace an expired or rejected token, logging in once for all the threads sharing it.
+
+        Callers which find that another thread already replaced stale_token reuse the new
+        token instead of logging in again.
+
+        :param stale_token: str token which was found expired or was rejected with a 401
+        :return: str current authentication token
+        :rtype: str
+        """
+        with self._auth_lock:
+            if self._auth_token is None or self._auth_token == stale_token:
+                logger.info('Refreshing API token for %s@%s', self._username, self._host)
+                with tracing.span('cfm.refresh_token'):
+                    self._login(stale_token)
+            return self._auth_token
+
+    def _token_used(self, token):
+        """Push back the expiry of a token the CFM host just accepted."""
+        if self._token_lifetime and token == self._auth_token:
+            self._token_expires = time.monotonic() + self._token_lifetime
+
+    def _token_expiring(self):
+        """bool True if the token is about to expire and should be refreshed before use."""
+        expires = self._token_expires
+        return (expires is not None and
+                time.monotonic() >= expires - self._token_refresh_margin)
+
+    @property
+    def host(self):
+        """str FQDN or IPv4 Address of the CFM host."""
+        return self._host
+
+    @property
+    def cache(self):
+        """pyhpecfm.cache.ResponseCache used for GET responses, or None."""
+        return self._cache
+
+    @property
+    def governor(self):
+        """pyhpecfm.throttle.HostGovernor limiting the requests sent to the CFM host."""
+        return throttle.get_governor(self._host)
+
+    @property
+    def pool_maxsize(self):
+        """int maximum number of keep-alive connections kept to the CFM host."""
+        return self._pool_maxsize
+
+    def batch(self, max_workers=None):
+        """
+        Run independent helper calls concurrently over the connection pool of the client.
+
+        :param max_workers: int maximum number of concurrent calls. Defaults to, and is capped
+        at, pool_maxsize
+        :return: pyhpecfm.fanout.Batch to use as a context manager
+        :rtype: Batch
+        >>> with cfm.batch() as batch:
+        ...     versions = batch.add(system.get_versions)
+        ...     fabrics = batch.add(fabric.get_fabrics)
+        >>> batch.results()
+        """
+        return Batch(self, max_workers)
+
+    def add_hook(self, hook):
+        """
+        Call hook with a pyhpecfm.hooks.RequestEvent after every attempt of an API call.
+
+        :param hook: callable taking a RequestEvent
+        """
+        self._hooks += (hook,)
+
+    def remove_hook(self, hook):
+        """
+        Stop calling a hook added with add_hook or passed to the constructor.
+
+        :param hook: callable taking a RequestEvent
+        """
+        self._hooks = tuple(item for item in self._hooks if item != hook)
+
+    def connection_stats(self):
+        """
+        Count the HTTPS connections opened and reused over the lifetime of the client.
+
+        A request which did not need a new connection (and so a new TLS handshake) counts as
+        reused.
+
+        :return: dict with connections_opened, connections_reused and requests counters
+        :rtype: dict
+        """
+        with self._session_lock:
+            stats = dict(self._closed_stats)
+            session = self._session
+            if session is not None:
+                for key, value in session.get_adapter('https://').stats().items():
+                    stats[key] += value
+        return stats
+
+    def _get_session(self):
+        """
+        Return the pooled session of the client, creating it on first use.
+
+        :return: requests.Session shared by every API call of this client
+        :rtype: requests.Session
+        """
+        with self._session_lock:
+            if self._session is None:
+                session = requests.session()
+                session.mount('https://', PoolingHTTPAdapter(
+                    pool_connections=self._pool_connections, pool_maxsize=self._pool_maxsize))
+                session.headers.update({'Accept': 'application/json'})
+                self._session = session
+            return self._session
 
     def delete(self, path, params=None):
         """
@@ -92,18 +383,33 @@ class CFMClient(object):
         :return: requests.Response API call response
         :rtype: requests.Response
         """
-        return self._call_api(method='DELETE', path=path, params=params)
+        try:
+            return self._call_api(method='DELETE', path=path, params=params)
+        finally:
+            self._invalidate(path)
 
-    def get(self, path, params=None):
+    def get(self, path, params=None, stream=False):
         """
         Helper function for HTTP GET commands
 
+        When the client has a response cache, a fresh cached response is returned without
+        calling the CFM. Otherwise the request is sent, conditionally if the cache holds an
+        expired copy with validators, and a successful response is stored for later calls.
+        Streamed responses bypass the cache.
+
         :param params:
         :param path: str the requested path
+        :param stream: bool return before the body is downloaded, see pyhpecfm.streaming
         :return: requests.Response API call response
         :rtype: requests.Response
         """
-        return self._call_api(method='GET', path=path, params=params)
+        if self._cache is None or stream:
+            return self._call_api(method='GET', path=path, params=params, stream=stream)
+
+        response = self._cache.get(self._cache.key(path, params))
+        if response is None:
+            response = self._call_api(method='GET', path=path, params=params)
+        return response
 
     def patch(self, path, data):
         """
@@ -114,7 +420,10 @@ class CFMClient(object):
         :return: requests.Response API call response
         :rtype: requests.Response
         """
-        return self._call_api(method='PATCH', path=path, json=data)
+        try:
+            return self._call_api(method='PATCH', path=path, json=data)
+        finally:
+            self._invalidate(path)
 
     def post(self, path, params=None, data=None):
         """
@@ -126,7 +435,10 @@ class CFMClient(object):
         :return: requests.Response API call response
         :rtype: requests.Response
         """
-        return self._call_api(method='POST', path=path, params=params, json=data)
+        try:
+            return self._call_api(method='POST', path=path, params=params, json=data)
+        finally:
+            self._invalidate(path)
 
     def put(self, path, data):
         """
@@ -137,7 +449,15 @@ class CFMClient(object):
         :return: requests.Response API call response
         :rtype: requests.Response
         """
-        return self._call_api(method='PUT', path=path, json=data)
+        try:
+            return self._call_api(method='PUT', path=path, json=data)
+        finally:
+            self._invalidate(path)
+
+    def _invalidate(self, path):
+        """Drop cached responses of the resource family modified by a request to path."""
+        if self._cache is not None:
+            self._cache.invalidate(path)
 
     def _call_api(self, method, path, params=None, headers=None, json=None,
                   timeout=None, stream=False):
@@ -151,76 +471,146 @@ class CFMClient(object):
             json (dict): (Optional) json to send in the body of the request.
             timeout (int): Optional timeout override.
 
+        GET requests are revalidated against the response cache of the client, if any: the
+        ETag and Last-Modified validators of a cached copy are sent as If-None-Match and
+        If-Modified-Since, and a 304 Not Modified answer returns the cached response.
+        Failed calls are retried as decided by the retry policy of the client, and a 401 logs
+        in again before retrying. A token close to expiry is refreshed before the call. Every
+        attempt waits for a slot from the governor of the host and is reported to the request
+        hooks of the client.
+
         Returns:
             requests.Response (class): JSON representation of the response object from requests
         """
         request_headers = headers if headers else {'Content-Type': 'application/json;charset=UTF-8'}
 
-        if self._auth_token:
+        cache_key = None
+        if method == 'GET' and self._cache is not None and not stream:
+            cache_key = self._cache.key(path, params)
+            request_headers.update(self._cache.conditional_headers(cache_key))
+
+        token = None
+        if path != 'v1/auth/token':
+            token = self._auth_token
+            if token and self._token_expiring():
+                token = self._refresh_token(token)
+            if not token:
+                # If this is not a login request, then there is a problem with the auth token.
+                logger.error('%s %s aborted: failed to obtain auth token', method, path)
+                return
             # Set Auth Token in Header
             request_headers.update(
                     {
-                        'Authorization': 'Bearer {}'.format(self._auth_token),
+                        'Authorization': 'Bearer {}'.format(token),
                         'X-Auth-Refresh-Token': 'true'
                     }
             )
-        elif path != 'v1/auth/token':
-            # If this is not a login request, then there is a problem with the auth token.
-            print('{} {} Aborted: Failed to obtain auth token.'.format(method, path))
-            return
 
+        self._retry_policy.record_request()
         attempts = 0
-        while attempts < self._max_connection_retries:
+        while True:
+            attempts += 1
+            started, begin = time.time(), time.monotonic()
             try:
-                attempts += 1
-                if self._session:
-                    return self._process_request(
-                        self._session, method, path, params, request_headers, json, timeout,
-                        verify=self._verify_ssl, stream=stream)
-                else:
-                    with requests.session() as session:
-                        session.headers.update({'Accept': 'application/json'})
-                        return self._process_request(
-                            session, method, path, params, request_headers, json, timeout,
-                            verify=self._verify_ssl, stream=stream)
-            except requests.exceptions.ConnectionError as exception:
-                print('Request failed with error %s', exception)
-                if attempts >= self._max_connection_retries:
-                    raise exception
-                else:
-                    print('Retrying Connect API request')
+                with tracing.span('cfm.request', {'http.method': method, 'cfm.path': path,
+                                                  'cfm.attempt': attempts}) as span:
+                    with self.governor.slot():
+                        started, begin = time.time(), time.monotonic()
+                        response = self._process_request(
+                            self._get_session(), method, path, params, request_headers, json,
+                            timeout, verify=self._verify_ssl, stream=stream)
+                    span.set_attribute('http.status_code', response.status_code)
+                if token is not None:
+                    self._token_used(token)
+                if cache_key is None or response.status_code != 304:
+                    self._record(method, path, attempts, started, begin, response, stream)
+                    if cache_key is not None:
+                        self._cache.put(cache_key, response)
+                    return response
+                cached = self._cache.revalidate(cache_key)
+                self._record(method, path, attempts, started, begin, response, stream,
+                             cached=cached is not None)
+                if cached is not None:
+                    return cached
+                # The cached copy was evicted while the request was in flight.
+                request_headers.pop('If-None-Match', None)
+                request_headers.pop('If-Modified-Since', None)
+                attempts -= 1
+                continue
             except requests.exceptions.HTTPError as exception:
-                error_code = int(exception.response.status_code)
-                if error_code == 401:
-                    print('API token no longer valid')
-                    self.connect()
-                    request_headers.update({'Authorization': 'Bearer {}'.format(self._auth_token)})
-                    print('Retrying request %s:%s', method, path)
-                elif error_code == 503:
-                    print('Service Unavailable on  %s :%s ', method, path)
-                    if attempts < self._max_connection_retries:
-                        time.sleep(10)
-                    else:
-                        print('Raise exception retried %s times', attempts)
-                        raise exception
-                else:
-                    print('Exception in API call: %s', exception)
-                    raise exception
+                failure, kind = exception, request_hooks.FAILURE_STATUS
+                response = exception.response
+                error_code = int(response.status_code)
+                if (error_code == 401 and token is not None and
+                        attempts < self._retry_policy.max_attempts):
+                    logger.info('%s %s: API token no longer valid', method, path)
+                    self._record(method, path, attempts, started, begin, response, stream,
+                                 kind, request_hooks.RETRY_REAUTH)
+                    token = self._refresh_token(token)
+                    request_headers.update({'Authorization': 'Bearer {}'.format(token)})
+                    continue
+                delay = None
+                if error_code in self._retry_policy.retry_statuses:
+                    delay = self._retry_policy.next_delay(
+                        method, attempts, response.headers.get('Retry-After'))
+            except requests.exceptions.ConnectionError as exception:
+                failure, kind = exception, request_hooks.FAILURE_CONNECTION
+                response = delay = None
+                if self._retry_policy.retry_connection_errors:
+                    delay = self._retry_policy.next_delay(method, attempts)
             except requests.exceptions.ReadTimeout as exception:
-                print('ReadTimeout in API call attempt ( %s ) : %s', attempts, exception)
-                if method in ['GET', 'get'] and attempts < self._max_connection_retries:
-                    #  Sleep for 2 seconds before re-trying
-                    #  Using native sleep method as opposed to eventlet.sleep as we are
-                    #  dealing with requests module.
-                    time.sleep(2)
-                else:
-                    print('Retry count ( %s )', attempts)
-                    raise exception
-                print('Retrying request %s : %s', method, path)
+                failure, kind = exception, request_hooks.FAILURE_TIMEOUT
+                response = delay = None
+                if self._retry_policy.retry_timeouts:
+                    delay = self._retry_policy.next_delay(method, attempts)
             except Exception as exception:
-                print('Exception in API call: %s', exception)
+                self._record(method, path, attempts, started, begin, None, stream,
+                             request_hooks.FAILURE_ERROR)
+                logger.error('%s %s failed: %s', method, path, exception)
                 raise exception
 
+            if delay is None:
+                self._record(method, path, attempts, started, begin, response, stream, kind)
+                logger.error('%s %s failed after %d attempt(s): %s', method, path, attempts,
+                             failure)
+                raise failure
+            self._record(method, path, attempts, started, begin, response, stream, kind, kind,
+                         delay)
+            logger.warning('%s %s failed (%s), retrying in %.2fs', method, path, failure, delay)
+            with tracing.span('cfm.retry_sleep', {'cfm.retry_delay': delay}):
+                time.sleep(delay)
+
+    def _record(self, method, path, attempt, started, begin, response, stream, failure=None,
+                retry_reason=None, retry_delay=None, cached=False):
+        """
+        Log an attempt of an API call and report it to the request hooks.
+
+        :param begin: float time.monotonic() timestamp at which the request was sent
+        :param response: requests.Response answering the attempt, None if there was no answer
+        :param stream: bool True if the body of the response is streamed and not read yet
+        """
+        latency = time.monotonic() - begin
+        status = response.status_code if response is not None else None
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s %s attempt %d: %s in %.3fs', method, path, attempt,
+                         status if status is not None else failure, latency)
+        hooks = self._hooks
+        if not hooks:
+            return
+        event = request_hooks.RequestEvent(method, path, attempt, status, started,
+                                           latency=latency, failure=failure,
+                                           retry_reason=retry_reason, retry_delay=retry_delay,
+                                           cached=cached)
+        if response is not None:
+            event.ttfb = response.elapsed.total_seconds()
+            body = response.request.body if response.request is not None else None
+            event.bytes_sent = len(body) if body else 0
+            if not stream:
+                event.bytes_received = len(response.content or b'')
+            elif response.headers.get('Content-Length'):
+                event.bytes_received = int(response.headers['Content-Length'])
+        request_hooks.call_hooks(hooks, event)
+
     def _process_request(self, session, method, path, params, headers, json, timeout=None,
                          verify=False, cert=None, stream=False):
         """Execute a REST API request using the supplied session.
@@ -249,7 +639,7 @@ class CFMClient(object):
             'timeout': timeout or self._timeout,
             'headers': headers,
             'params': params,
-            'json': json,
+            'data': self._codec.dumps(json) if json is not None else None,
             'verify': verify,
             'cert': cert,
             'stream': stream,
@@ -258,15 +648,16 @@ class CFMClient(object):
         try:
             response = session.request(**request)
         except requests.exceptions.SSLError as exception:
-            print('%s %s failed due to SSL handshake error; ensure %s contains a '
-                  'certificate which can be used to validate HTTPS connections to %s',
-                  method, path, verify, self._host)
+            logger.error('%s %s failed due to SSL handshake error; ensure %s contains a '
+                         'certificate which can be used to validate HTTPS connections to %s',
+                         method, path, verify, self._host)
             raise exception
 
+        _decode_with(response, self._codec)
+
         try:
             response.raise_for_status()
             return response
         except Exception as exception:
-            print('%s %s failed with status %s',
-                  method, path, response.status_code)
+            logger.debug('%s %s failed with status %s', method, path, response.status_code)
             raise exception
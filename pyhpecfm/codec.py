@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+This module holds the JSON codecs used by CFMClient and AsyncCFMClient to encode request
+bodies and decode response bodies.
+
+Codecs work on bytes: request bodies are sent as encoded, and response bodies are decoded
+straight from the bytes received, without first building a str of the whole body as
+requests.Response.json() does. The 'auto' codec, used by default, picks the fastest library
+installed: orjson, then ujson, then the standard library json module.
+
+>>> from pyhpecfm import client
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi', codec='orjson')
+"""
+import json
+import sys
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class StdlibCodec(object):
+    """Codec based on the standard library json module."""
+
+    name = 'stdlib'
+
+    @staticmethod
+    def dumps(obj):
+        """
+        :param obj: JSON-serializable object
+        :return: bytes UTF-8 JSON encoding of obj
+        :rtype: bytes
+        """
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        """
+        :param data: bytes or str JSON document
+        :return: decoded object
+        """
+        if isinstance(data, bytes) and sys.version_info < (3, 6):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    """Codec based on orjson, which encodes to and decodes from bytes natively."""
+
+    name = 'orjson'
+
+    @staticmethod
+    def dumps(obj):
+        return orjson.dumps(obj)
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(object):
+    """Codec based on ujson."""
+
+    name = 'ujson'
+
+    @staticmethod
+    def dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        return ujson.loads(data)
+
+
+_CODECS = {'stdlib': (StdlibCodec, json), 'orjson': (OrjsonCodec, orjson),
+           'ujson': (UjsonCodec, ujson)}
+
+
+def available_codecs():
+    """
+    :return: list of str names of the codecs whose library is installed, fastest first
+    :rtype: list
+    """
+    return [name for name in ('orjson', 'ujson', 'stdlib') if _CODECS[name][1] is not None]
+
+
+def get_codec(codec=None):
+    """
+    Resolve a codec.
+
+    :param codec: str 'auto', 'orjson', 'ujson' or 'stdlib', an object with dumps(obj) returning
+    bytes and loads(bytes), or None for 'auto'
+    :return: codec object
+    :raises CFMApiError: if the codec is unknown or its library is not installed
+    """
+    # pyhpecfm.client imports this module, so its exception is only imported when needed.
+    from pyhpecfm.client import CFMApiError
+
+    if codec is None or codec == 'auto':
+        codec = available_codecs()[0]
+    if not isinstance(codec, str):
+        return codec
+    if codec not in _CODECS:
+        raise CFMApiError('Unknown JSON codec {}'.format(codec))
+    codec_class, module = _CODECS[codec]
+    if module is None:
+        raise CFMApiError('The {0} JSON codec requires the {0} package'.format(codec))
+    return codec_class()
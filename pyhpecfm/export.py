@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+This module converts port, switch and LAG results of the HPE Composable Fabric Manager into
+compact columnar tables for analytics.
+
+Each attribute becomes a column backed by a typed array from the standard library array
+module: booleans, integers and floats are stored as machine values and strings are dictionary
+encoded, so a column of switch UUIDs repeated on every port holds one int32 code per row and
+each distinct UUID once. Lists and dicts (e.g. speed or vlan_group_uuids) are dictionary
+encoded as JSON text. Tables are built while the result is streamed, so the list of dicts is
+never held in memory.
+
+Tables are written to a small binary file (a JSON header followed by the raw column buffers)
+which read_table() memory-maps back without parsing the data. When NumPy or pyarrow is
+installed, Table.to_numpy() and Table.to_arrow() convert a table for further analysis.
+
+>>> from pyhpecfm import client, export
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+>>> cfm.connect()
+>>> ports = export.export_ports(cfm)
+>>> export.write_table(ports, '/tmp/ports.cfmcol')
+>>> with export.read_table('/tmp/ports.cfmcol') as ports:
+...     print(ports['switch_uuid'][0], ports['native_vlan'].to_list()[:10])
+"""
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+
+from pyhpecfm import fabric
+from pyhpecfm.client import CFMApiError
+
+MAGIC = b'CFMCOL01'
+FORMAT_VERSION = 1
+
+INT_NULL = -2 ** 63
+
+_TYPECODES = {'bool': 'b', 'int': 'q', 'float': 'd', 'str': 'i', 'json': 'i'}
+_NULLS = {'bool': -1, 'int': INT_NULL, 'float': float('nan'), 'str': -1, 'json': -1}
+_NUMPY_TYPES = {'bool': 'i1', 'int': '<i8', 'float': '<f8', 'str': '<i4', 'json': '<i4'}
+
+
+def _kind_of(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int' if INT_NULL < value < 2 ** 63 else 'json'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    return 'json'
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class Column(object):
+    """
+    Typed column of a Table.
+
+    values holds one machine value per row: 0/1 for bool (-1 when null), int64 for int
+    (INT_NULL when null), float64 for float (NaN when null), and an int32 code into dictionary
+    for str and json (-1 when null). Indexing a column decodes a single value.
+    """
+
+    def __init__(self, name, kind, values, dictionary=None):
+        """
+        :param name: str attribute name
+        :param kind: str one of 'bool', 'int', 'float', 'str' or 'json'
+        :param values: array.array or memoryview of the column values or codes
+        :param dictionary: list of str distinct values of a str or json column
+        """
+        self.name = name
+        self.kind = kind
+        self.values = values
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return '<Column {} {} rows={}>'.format(self.name, self.kind, len(self))
+
+    def __getitem__(self, index):
+        value = self.values[index]
+        kind = self.kind
+        if kind == 'str':
+            return self.dictionary[value] if value >= 0 else None
+        if kind == 'json':
+            return json.loads(self.dictionary[value]) if value >= 0 else None
+        if kind == 'bool':
+            return bool(value) if value >= 0 else None
+        if kind == 'int':
+            return value if value != INT_NULL else None
+        return value if not math.isnan(value) else None
+
+    def to_list(self):
+        """
+        :return: list of the decoded values of the column
+        :rtype: list
+        """
+        return [self[index] for index in range(len(self))]
+
+
+class _ColumnBuilder(object):
+    """Accumulate the values of a column, widening its kind as new values require."""
+
+    def __init__(self, name, nulls=0):
+        self.name = name
+        self.kind = None
+        self.nulls = nulls
+        self.values = None
+        self.dictionary = None
+        self.codes = None
+
+    def append(self, value):
+        kind = _kind_of(value)
+        if kind is None:
+            if self.kind is None:
+                self.nulls += 1
+            else:
+                self.values.append(_NULLS[self.kind])
+            return
+        if self.kind is None:
+            self._start(kind)
+        elif kind != self.kind and self.kind != 'json' and (self.kind, kind) != ('float', 'int'):
+            # A json column holds values of any kind, so it is never widened further.
+            self._widen(kind)
+
+        if self.kind == 'str':
+            self.values.append(self._code(value))
+        elif self.kind == 'json':
+            self.values.append(self._code(json.dumps(value, sort_keys=True)))
+        elif self.kind == 'bool':
+            self.values.append(1 if value else 0)
+        elif self.kind == 'float':
+            self.values.append(float(value))
+        else:
+            self.values.append(value)
+
+    def _start(self, kind):
+        self.kind = kind
+        self.values = array(_TYPECODES[kind], [_NULLS[kind]]) * self.nulls
+        if kind in ('str', 'json'):
+            self.dictionary, self.codes = [], {}
+
+    def _code(self, text):
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.dictionary)
+            self.dictionary.append(text)
+        return code
+
+    def _widen(self, kind):
+        if self.kind == 'int' and kind == 'float':
+            self.values = array('d', [float('nan') if value == INT_NULL else float(value)
+                                      for value in self.values])
+            self.kind = 'float'
+            return
+        # Any other mix of kinds is stored as JSON text, which keeps every value's type.
+        if self.kind == 'str':
+            self.dictionary = [json.dumps(text) for text in self.dictionary]
+            self.codes = {text: code for code, text in enumerate(self.dictionary)}
+            self.kind = 'json'
+            return
+        old = Column(self.name, self.kind, self.values, self.dictionary)
+        self.kind = 'json'
+        self.dictionary, self.codes = [], {}
+        self.values = array('i', [-1 if value is None else
+                                  self._code(json.dumps(value, sort_keys=True))
+                                  for value in old.to_list()])
+
+    def build(self):
+        if self.kind is None:
+            self._start('str')
+        return Column(self.name, self.kind, self.values, self.dictionary)
+
+
+class Table(object):
+    """
+    Columnar table of CFM objects.
+
+    Columns are accessed by attribute name, e.g. table['switch_uuid']. A table read with
+    read_table() is backed by a memory-mapped file and should be closed, or used as a context
+    manager, when no longer needed.
+    """
+
+    def __init__(self, columns, num_rows, mapping=None):
+        """
+        :param columns: list of Column of equal length
+        :param num_rows: int number of rows
+        :param mapping: mmap.mmap backing the columns, closed with the table
+        """
+        self.columns = OrderedDict((column.name, column) for column in columns)
+        self.num_rows = num_rows
+        self._mapping = mapping
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __repr__(self):
+        return '<Table rows={} columns={}>'.format(self.num_rows, list(self.columns))
+
+    def close(self):
+        """Release the memory-mapped file backing the table, if any."""
+        if self._mapping is None:
+            return
+        for column in self.columns.values():
+            if isinstance(column.values, memoryview):
+                column.values.release()
+        self._mapping.close()
+        self._mapping = None
+
+    def rows(self):
+        """
+        Decode the table back into dicts, one row at a time.
+
+        :return: generator of dicts, null values included as None
+        """
+        columns = list(self.columns.values())
+        for index in range(self.num_rows):
+            yield {column.name: column[index] for column in columns}
+
+    def to_numpy(self):
+        """
+        Convert the table to a NumPy structured array.
+
+        str and json columns hold their int32 codes; decode them with the dictionary of the
+        column, e.g. table['name'].dictionary. Requires the numpy package.
+
+        :return: numpy.ndarray with one field per column
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise CFMApiError('Table.to_numpy requires the numpy package')
+        dtype = [(name, _NUMPY_TYPES[column.kind]) for name, column in self.columns.items()]
+        result = numpy.empty(self.num_rows, dtype=dtype)
+        for name, column in self.columns.items():
+            result[name] = numpy.frombuffer(column.values, dtype=_NUMPY_TYPES[column.kind])
+        return result
+
+    def to_arrow(self):
+        """
+        Convert the table to a pyarrow.Table, with str columns as dictionary arrays and nulls
+        preserved. json columns are kept as dictionary encoded JSON text. Requires the pyarrow
+        package.
+
+        :return: pyarrow.Table
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise CFMApiError('Table.to_arrow requires the pyarrow package')
+        arrays = []
+        for column in self.columns.values():
+            if column.kind in ('str', 'json'):
+                indices = pyarrow.array([code if code >= 0 else None for code in column.values],
+                                        type=pyarrow.int32())
+                arrays.append(pyarrow.DictionaryArray.from_arrays(
+                    indices, pyarrow.array(column.dictionary, type=pyarrow.string())))
+            else:
+                arrays.append(pyarrow.array(column.to_list()))
+        return pyarrow.Table.from_arrays(arrays, names=list(self.columns))
+
+
+def build_table(records, columns=None):
+    """
+    Build a table from an iterable of CFM object dicts.
+
+    :param records: iterable of dicts, e.g. the generator returned by fabric.iter_ports
+    :param columns: list of str attribute names to keep. Defaults to every attribute found,
+    in the order they are first seen
+    :return: Table
+    :rtype: Table
+    """
+    builders = OrderedDict((name, _ColumnBuilder(name)) for name in columns or ())
+    rows = 0
+    for record in records:
+        if columns is None:
+            for name in record:
+                if name not in builders:
+                    builders[name] = _ColumnBuilder(name, nulls=rows)
+        for name, builder in builders.items():
+            builder.append(record.get(name))
+        rows += 1
+    return Table([builder.build() for builder in builders.values()], rows)
+
+
+def export_ports(cfmclient, switch_uuid=None, columns=None):
+    """
+    Export Composable Fabric switch ports to a columnar table.
+    :param cfmclient: object of type CFMClient
+    :param switch_uuid: str UUID of switch from which to fetch port data
+    :param columns: list of str attribute names to keep, all by default
+    :return: Table with one row per port
+    :rtype: Table
+    """
+    return build_table(fabric.iter_ports(cfmclient, switch_uuid), columns)
+
+
+def export_switches(cfmclient, params=None, columns=None):
+    """
+    Export Composable Fabric switches to a columnar table.
+    :param cfmclient: object of type CFMClient
+    :param params: dict of query parameters used to filter request from API
+    :param columns: list of str attribute names to keep, all by default
+    :return: Table with one row per switch
+    :rtype: Table
+    """
+    return build_table(fabric.iter_switches(cfmclient, params), columns)
+
+
+def export_lags(cfmclient, params=None, columns=None):
+    """
+    Export link aggregation groups to a columnar table.
+    :param cfmclient: object of type CFMClient
+    :param params: dict of query parameters used to filter request from API
+    :param columns: list of str attribute names to keep, all by default
+    :return: Table with one row per LAG
+    :rtype: Table
+    """
+    return build_table(fabric.get_lags(cfmclient, params), columns)
+
+
+def _column_bytes(column):
+    values = column.values
+    if sys.byteorder == 'big':
+        values = array(values.format if isinstance(values, memoryview) else values.typecode,
+                       values)
+        values.byteswap()
+    return bytes(values)
+
+
+def write_table(table, path):
+    """
+    Write a table to a binary file.
+
+    The file holds MAGIC, the little endian uint32 length of a JSON header describing the
+    columns, the header, then the column buffers in little endian order, each aligned on 8
+    bytes so they can be mapped in place.
+
+    :param table: Table to write
+    :param path: str path of the file
+    """
+    buffers = [_column_bytes(column) for column in table.columns.values()]
+    descriptions = []
+    offset = 0
+    for column, buffer in zip(table.columns.values(), buffers):
+        offset = _align(offset)
+        descriptions.append({'name': column.name, 'kind': column.kind,
+                             'typecode': _TYPECODES[column.kind], 'offset': offset,
+                             'length': len(buffer), 'dictionary': column.dictionary})
+        offset += len(buffer)
+    header = json.dumps({'version': FORMAT_VERSION, 'rows': table.num_rows,
+                         'columns': descriptions}).encode('utf-8')
+    start = _align(len(MAGIC) + 4 + len(header))
+
+    with open(path, 'wb') as output:
+        output.write(MAGIC)
+        output.write(struct.pack('<I', len(header)))
+        output.write(header)
+        position = len(MAGIC) + 4 + len(header)
+        for description, buffer in zip(descriptions, buffers):
+            target = start + description['offset']
+            output.write(b'\0' * (target - position))
+            output.write(buffer)
+            position = target + len(buffer)
+
+
+def read_table(path):
+    """
+    Memory-map a table written by write_table.
+
+    Column values are views into the mapped file and are only paged in when accessed. On big
+    endian machines they are copied and byte swapped instead.
+
+    :param path: str path of the file
+    :return: Table backed by the file, to be closed when no longer needed
+    :rtype: Table
+    """
+    with open(path, 'rb') as source:
+        mapping = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if mapping[:len(MAGIC)] != MAGIC:
+            raise CFMApiError('{} is not a pyhpecfm column file'.format(path))
+        header_length = struct.unpack('<I', mapping[len(MAGIC):len(MAGIC) + 4])[0]
+        header_start = len(MAGIC) + 4
+        header = json.loads(mapping[header_start:header_start + header_length].decode('utf-8'))
+        if header.get('version') != FORMAT_VERSION:
+            raise CFMApiError('Unsupported column file version {}'.format(header.get('version')))
+        start = _align(header_start + header_length)
+
+        columns = []
+        for description in header['columns']:
+            begin = start + description['offset']
+            view = memoryview(mapping)[begin:begin + description['length']]
+            values = view.cast(description['typecode'])
+            if sys.byteorder == 'big':
+                values = array(description['typecode'], values)
+                values.byteswap()
+                view.release()
+            columns.append(Column(description['name'], description['kind'], values,
+                                  description['dictionary']))
+    except Exception:
+        mapping.close()
+        raise
+    return Table(columns, header['rows'], mapping)
@@ -6,6 +6,12 @@ of the HPE Composabale Fabric Manager instance.
 For detailed documentation on the HPE Composable Fabric Manager API, please see the API
 documentation located in your local CFM instance
 """
+import json
+from collections import OrderedDict
+
+from pyhpecfm.fanout import FanOutResult, fan_out
+from pyhpecfm.streaming import iter_result
+from pyhpecfm.tracing import traced
 
 
 ####################
@@ -13,6 +19,7 @@ documentation located in your local CFM instance
 ####################
 
 
+@traced
 def get_fabrics(cfmclient, fabric_uuid=None):
     """
     Get a list of Fabrics currently defined in Composable Fabric.
@@ -28,6 +35,7 @@ def get_fabrics(cfmclient, fabric_uuid=None):
     return cfmclient.get(path).json().get('result')
 
 
+@traced
 def add_fabrics(cfmclient, switch_ip, name, description):
     """
     Function to add a new fabric for management under a specific CFM instance
@@ -46,6 +54,7 @@ def add_fabrics(cfmclient, switch_ip, name, description):
     return cfmclient.post(path, data=data).json().get('result')
 
 
+@traced
 def get_fabric_ip_networks(cfmclient, fabric_uuid=None):
     """
     Get a list of IP networks from the Composable Fabric.
@@ -60,6 +69,7 @@ def get_fabric_ip_networks(cfmclient, fabric_uuid=None):
     return cfmclient.get(path).json().get('result')
 
 
+@traced
 def add_ip_fabric(cfmclient, fabric_uuid, name, description, mode, subnet, prefix_length, vlan, switch_uuid,
                   switch_address):
     """
@@ -101,6 +111,7 @@ def add_ip_fabric(cfmclient, fabric_uuid, name, description, mode, subnet, prefi
     return cfmclient.post(path, data=data).json().get('result')
 
 
+@traced
 def delete_fabric_ip_networks(cfmclient, fabric_uuid):
     """
     Delete a specific IP networks from the Composable Fabric.
@@ -117,6 +128,7 @@ def delete_fabric_ip_networks(cfmclient, fabric_uuid):
 #####################
 
 
+@traced
 def perform_fit(cfmclient, fabric_uuid, name, description):
     """
     Request a full fit across managed Composable Fabrics.
@@ -140,6 +152,7 @@ def perform_fit(cfmclient, fabric_uuid, name, description):
 ####################
 
 
+@traced
 def get_switches(cfmclient, params=None):
     """
     Get a list of Composable Fabric switches
@@ -156,6 +169,39 @@ def get_switches(cfmclient, params=None):
     return cfmclient.get('v1/switches', params).json().get('result')
 
 
+@traced
+def iter_switches(cfmclient, params=None):
+    """
+    Iterate over Composable Fabric switches, parsing the response incrementally.
+    Use instead of get_switches for large requests such as params={'ports': True}.
+    :param cfmclient: object of type CFMClient
+    :param params: dict of query parameters used to filter request from API
+    :return: generator of dicts decoded as the response body is read
+    """
+    return iter_result(cfmclient.get('v1/switches', params, stream=True))
+
+
+@traced
+def get_switches_for_fabrics(cfmclient, fabric_uuids, params=None, max_workers=None):
+    """
+    Get the Composable Fabric switches of several fabrics concurrently.
+    :param cfmclient: object of type CFMClient
+    :param fabric_uuids: list of str UUIDs of the fabrics to query
+    :param params: dict of additional query parameters, e.g. {'ports': True}
+    :param max_workers: int maximum number of concurrent requests
+    :return: FanOutResult where results maps each fabric UUID to its list of switch dicts and
+    errors maps each failed fabric UUID to its exception
+    :rtype: pyhpecfm.fanout.FanOutResult
+    """
+    def fetch(client, fabric_uuid):
+        fabric_params = dict(params or {})
+        fabric_params['fabric'] = fabric_uuid
+        return get_switches(client, fabric_params)
+
+    return fan_out(cfmclient, fetch, fabric_uuids, max_workers=max_workers)
+
+
+@traced
 def create_switch(cfmclient, data, fabric_type=None):
     """
     Create a Composable Fabric switch.
@@ -169,6 +215,7 @@ def create_switch(cfmclient, data, fabric_type=None):
 ####################
 
 
+@traced
 def get_lags(cfmclient, params=None):
     """
     Get a list of link aggregated objects
@@ -190,6 +237,7 @@ def get_lags(cfmclient, params=None):
 ##################
 
 
+@traced
 def get_ports(cfmclient, switch_uuid=None):
     """
     Get Composable Fabric switch ports.
@@ -205,7 +253,47 @@ def get_ports(cfmclient, switch_uuid=None):
     return cfmclient.get(path).json().get('result')
 
 
+@traced
+def iter_ports(cfmclient, switch_uuid=None):
+    """
+    Iterate over Composable Fabric switch ports, parsing the response incrementally so only
+    one port is held in memory at a time.
+    :param cfmclient: object of type CFMClient
+    :param switch_uuid: switch_uuid: UUID of switch from which to fetch port data
+    :return: generator of dicts decoded as the response body is read
+    >>> from pyhpecfm import client
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> for port in iter_ports(cfm):
+    ...     print(port['name'])
+    """
+    path = 'v1/ports'
+    if switch_uuid:
+        path += '?switches={}&type=access'.format(switch_uuid)
+    return iter_result(cfmclient.get(path, stream=True))
+
+
+@traced
+def get_ports_for_switches(cfmclient, switch_uuids, max_workers=None):
+    """
+    Get the Composable Fabric ports of several switches concurrently.
+    :param cfmclient: object of type CFMClient
+    :param switch_uuids: list of str UUIDs of the switches from which to fetch port data
+    :param max_workers: int maximum number of concurrent requests
+    :return: FanOutResult where results maps each switch UUID to its list of port dicts and
+    errors maps each failed switch UUID to its exception
+    :rtype: pyhpecfm.fanout.FanOutResult
+    >>> from pyhpecfm import client
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> switch_uuids = [switch['uuid'] for switch in get_switches(cfm)]
+    >>> get_ports_for_switches(cfm, switch_uuids, max_workers=8).results
+    """
+    return fan_out(cfmclient, get_ports, switch_uuids, max_workers=max_workers)
+
+
 # TODO Write test for this function
+@traced
 def update_ports(cfmclient, port_uuids, field, value):
     """
     Update attributes of composable fabric switch ports
@@ -230,11 +318,91 @@ def update_ports(cfmclient, port_uuids, field, value):
         return cfmclient.patch('v1/ports', data)
 
 
+def _port_patch_chunks(updates, max_payload_bytes):
+    """
+    Merge port updates per port, group ports sharing the same changes and split the groups
+    into PATCH payloads of at most max_payload_bytes once serialized.
+    :return: tuple (list of payloads, dict mapping each port UUID to its merged fields)
+    """
+    fields_by_port = OrderedDict()
+    for port_uuids, field, value in updates:
+        for port_uuid in port_uuids:
+            fields_by_port.setdefault(port_uuid, OrderedDict())[field] = value
+
+    groups = OrderedDict()
+    for port_uuid, fields in fields_by_port.items():
+        ops = tuple((field, json.dumps(value, sort_keys=True)) for field, value in fields.items())
+        groups.setdefault(ops, []).append(port_uuid)
+
+    chunks = []
+    chunk, chunk_size = [], 2
+    for ops, port_uuids in groups.items():
+        patch = [{'path': '/{}'.format(field), 'value': json.loads(value), 'op': 'replace'}
+                 for field, value in ops]
+        base_size = len(json.dumps({'uuids': [], 'patch': patch})) + 2
+        entry = None
+        for port_uuid in port_uuids:
+            uuid_size = len(json.dumps(port_uuid)) + 2
+            added_size = uuid_size if entry else base_size + uuid_size
+            if chunk and chunk_size + added_size > max_payload_bytes:
+                chunks.append(chunk)
+                chunk, chunk_size, entry = [], 2, None
+            if entry is None:
+                entry = {'uuids': [], 'patch': patch}
+                chunk.append(entry)
+                chunk_size += base_size
+            entry['uuids'].append(port_uuid)
+            chunk_size += uuid_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks, fields_by_port
+
+
+@traced
+def bulk_update_ports(cfmclient, updates, max_payload_bytes=256 * 1024, max_workers=None):
+    """
+    Apply many port attribute updates with as few PATCH requests as possible.
+
+    Updates are merged per port (a later update of the same field wins), ports receiving the
+    same changes share one patch entry, and the entries are split into requests of at most
+    max_payload_bytes which are sent concurrently.
+    :param cfmclient: object of type CFMClient
+    :param updates: iterable of (port_uuids, field, value) tuples, as taken by update_ports
+    :param max_payload_bytes: int maximum size of the JSON body of one PATCH request
+    :param max_workers: int maximum number of concurrent requests
+    :return: FanOutResult where results maps each updated port UUID to the dict of fields set
+    on it and errors maps each port UUID of a failed request to its exception
+    :rtype: pyhpecfm.fanout.FanOutResult
+    >>> from pyhpecfm import client
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> bulk_update_ports(cfm, [(['<port uuid>', '<port uuid>'], 'native_vlan', 10),
+    ...                         (['<port uuid>'], 'description', 'uplink')])
+    """
+    chunks, fields_by_port = _port_patch_chunks(updates, max_payload_bytes)
+
+    def submit(client, index):
+        return client.patch('v1/ports', chunks[index])
+
+    submitted = fan_out(cfmclient, submit, range(len(chunks)), max_workers=max_workers)
+    report = FanOutResult()
+    for index, chunk in enumerate(chunks):
+        error = submitted.errors.get(index)
+        for entry in chunk:
+            for port_uuid in entry['uuids']:
+                if error is None:
+                    report.results[port_uuid] = dict(fields_by_port[port_uuid])
+                else:
+                    report.errors[port_uuid] = error
+    return report
+
+
 ##################
 # VLAN functions #
 ##################
 
 
+@traced
 def get_vlan_groups(cfmclient, params=None):
     """
     Get Composable Fabric vlan groups.
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides a bounded thread pool executor for fanning a helper function out over
+many objects of the HPE Composable Fabric Manager, e.g. fetching the ports of every switch.
+
+It also runs independent helper calls concurrently, e.g. the requests of a dashboard, so that
+their latency is that of the slowest call rather than the sum of all of them.
+
+The worker threads share the CFMClient and therefore its pooled HTTPS session, so the number
+of workers is capped by the client's pool_maxsize.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FanOutResult(object):
+    """
+    Results of a fan-out call keyed by the object (usually UUID) each call was made for.
+
+    A failing call does not fail the batch: its exception is stored in errors instead.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+
+    def __repr__(self):
+        return '<FanOutResult results={} errors={}>'.format(len(self.results), len(self.errors))
+
+    @property
+    def ok(self):
+        """bool True when every call succeeded."""
+        return not self.errors
+
+
+def fan_out(cfmclient, func, keys, max_workers=None):
+    """
+    Call func(cfmclient, key) for every key on a bounded thread pool.
+
+    :param cfmclient: object of type CFMClient shared by every call
+    :param func: callable taking the client and a key, e.g. pyhpecfm.fabric.get_ports
+    :param keys: iterable of hashable keys, duplicates are only called once
+    :param max_workers: int maximum number of concurrent calls. Defaults to, and is capped at,
+    the connection pool size of the client
+    :return: FanOutResult with the results and errors keyed by key
+    :rtype: FanOutResult
+    >>> from pyhpecfm import client, fabric, fanout
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> fanout.fan_out(cfm, fabric.get_ports, ['<switch uuid>', '<switch uuid>'])
+    """
+    keys = list(dict.fromkeys(keys))
+    outcome = FanOutResult()
+    if not keys:
+        return outcome
+
+    pool_size = getattr(cfmclient, 'pool_maxsize', None) or len(keys)
+    workers = min(max_workers or pool_size, pool_size, len(keys))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(key, executor.submit(func, cfmclient, key)) for key in keys]
+        for key, future in futures:
+            try:
+                outcome.results[key] = future.result()
+            except Exception as exception:  # pylint: disable=broad-except
+                outcome.errors[key] = exception
+    return outcome
+
+
+class Batch(object):
+    """
+    Run independent helper calls concurrently over the connection pool of a client.
+
+    Calls are started as soon as they are added and the batch waits for all of them when the
+    with block ends. Use CFMClient.batch() rather than building one directly.
+
+    >>> from pyhpecfm import client, fabric, system
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> with cfm.batch() as batch:
+    ...     versions = batch.add(system.get_versions)
+    ...     switches = batch.add(fabric.get_switches, params={'ports': True})
+    >>> versions.result(), switches.result()
+    """
+
+    def __init__(self, cfmclient, max_workers=None):
+        """
+        :param cfmclient: object of type CFMClient shared by every call
+        :param max_workers: int maximum number of concurrent calls. Defaults to, and is capped
+        at, the connection pool size of the client
+        """
+        pool_size = getattr(cfmclient, 'pool_maxsize', None)
+        workers = max_workers or pool_size
+        if pool_size and workers:
+            workers = min(workers, pool_size)
+        self._cfmclient = cfmclient
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._futures)
+
+    def add(self, func, *args, **kwargs):
+        """
+        Start func(cfmclient, *args, **kwargs).
+
+        :param func: callable taking the client first, e.g. pyhpecfm.fabric.get_switches
+        :return: concurrent.futures.Future of the result of the call
+        :rtype: Future
+        """
+        future = self._executor.submit(func, self._cfmclient, *args, **kwargs)
+        self._futures.append(future)
+        return future
+
+    def results(self, return_exceptions=False):
+        """
+        Wait for every call.
+
+        :param return_exceptions: bool return the exception of a failed call in its place
+        rather than raising the first one
+        :return: list of the results in the order the calls were added
+        :rtype: list
+        """
+        results = []
+        for future in self._futures:
+            try:
+                results.append(future.result())
+            except Exception as exception:  # pylint: disable=broad-except
+                if not return_exceptions:
+                    raise
+                results.append(exception)
+        return results
+
+    def close(self):
+        """Wait for every call and release the worker threads."""
+        self._executor.shutdown(wait=True)
+
+
+def gather(cfmclient, calls, max_workers=None, return_exceptions=False):
+    """
+    Run independent helper calls concurrently and return their results in order.
+
+    :param cfmclient: object of type CFMClient shared by every call
+    :param calls: iterable of callables taking the client, or of (callable, arg, ...) tuples
+    :param max_workers: int maximum number of concurrent calls. Defaults to, and is capped at,
+    the connection pool size of the client
+    :param return_exceptions: bool return the exception of a failed call in its place rather
+    than raising the first one
+    :return: list of the results in the order of calls
+    :rtype: list
+    >>> from pyhpecfm import client, fabric, fanout, system
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> versions, fabrics, vlan_groups = fanout.gather(
+    ...     cfm, [system.get_versions, fabric.get_fabrics, (fabric.get_vlan_groups, None)])
+    """
+    with Batch(cfmclient, max_workers) as batch:
+        for call in calls:
+            if isinstance(call, tuple):
+                batch.add(*call)
+            else:
+                batch.add(call)
+    return batch.results(return_exceptions)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+This module holds the per-request instrumentation of CFMClient and AsyncCFMClient.
+
+After every attempt of an API call, including attempts which fail and are retried, the client
+calls its request hooks with a RequestEvent giving the method and path, the status, the
+attempt number, the bytes sent and received, the time to first byte, the total latency and
+why the call is retried, if it is. A hook raising an exception is logged and does not fail
+the call. Hooks are called on the thread, or in the task, making the call, so they should be
+quick; slow consumers should hand the events off to a queue.
+
+The clients also log every attempt to their module logger, 'pyhpecfm.client' or
+'pyhpecfm.aio.client', at DEBUG level, and retries and failures at WARNING and ERROR level.
+
+>>> from pyhpecfm import client
+>>> def hook(event):
+...     print(event.method, event.path, event.status, event.latency)
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi', hooks=[hook])
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Kinds of failure of an attempt, also used as the reason of a retry.
+FAILURE_STATUS = 'status'
+FAILURE_TIMEOUT = 'timeout'
+FAILURE_CONNECTION = 'connection'
+FAILURE_ERROR = 'error'
+
+# Reason of the retry following a 401, which logs in again first.
+RETRY_REAUTH = 'reauth'
+
+
+class RequestEvent(object):
+    """Outcome and timings of one attempt of a CFM API call."""
+
+    __slots__ = ('method', 'path', 'attempt', 'status', 'started', 'ttfb', 'latency',
+                 'bytes_sent', 'bytes_received', 'failure', 'retry_reason', 'retry_delay',
+                 'cached')
+
+    def __init__(self, method, path, attempt, status=None, started=None, ttfb=None,
+                 latency=None, bytes_sent=None, bytes_received=None, failure=None,
+                 retry_reason=None, retry_delay=None, cached=False):
+        """
+        :param method: str HTTP method, e.g. 'GET'
+        :param path: str API path, e.g. 'v1/switches'
+        :param attempt: int number of the attempt, 1 for the first one
+        :param status: int HTTP status of the answer, None if there was no answer
+        :param started: float time.time() timestamp at which the request was sent
+        :param ttfb: float seconds until the headers of the answer were received, None if
+        unknown
+        :param latency: float seconds until the attempt completed
+        :param bytes_sent: int size of the request body, None if unknown
+        :param bytes_received: int size of the response body, None if unknown, e.g. for a
+        streamed body without Content-Length
+        :param failure: str FAILURE_STATUS, FAILURE_TIMEOUT, FAILURE_CONNECTION or
+        FAILURE_ERROR if the attempt failed, None otherwise
+        :param retry_reason: str failure kind, or RETRY_REAUTH, if the call is retried after
+        this attempt, None otherwise
+        :param retry_delay: float seconds waited before the retry, if any
+        :param cached: bool True if a 304 answer was served from the response cache
+        """
+        self.method = method
+        self.path = path
+        self.attempt = attempt
+        self.status = status
+        self.started = started
+        self.ttfb = ttfb
+        self.latency = latency
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.failure = failure
+        self.retry_reason = retry_reason
+        self.retry_delay = retry_delay
+        self.cached = cached
+
+    def __repr__(self):
+        return '<RequestEvent {} {} attempt={} status={}>'.format(
+            self.method, self.path, self.attempt, self.status)
+
+
+def call_hooks(hooks, event):
+    """
+    Call every hook with an event, logging the exceptions they raise.
+
+    :param hooks: iterable of callables taking a RequestEvent
+    :param event: RequestEvent
+    """
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Request hook %r failed', hook)
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides an in-memory snapshot of the fabric inventory of an HPE Composable Fabric
+Manager with indexes for the usual lookups.
+
+The fabrics, switches, ports, LAGs and VLAN groups are loaded once and kept as slotted records
+holding the attributes needed for lookups, with interned strings, so large fabrics stay cheap
+to hold. Lookups by UUID, MAC address or name are dict lookups, and filtered queries such as
+the ports of a switch in a VLAN only visit the smaller of the matching index entries.
+
+>>> from pyhpecfm import client, inventory
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+>>> cfm.connect()
+>>> snapshot = inventory.Inventory.load(cfm)
+>>> snapshot.find_ports(switch_uuid='<switch uuid>', vlan=10)
+"""
+import sys
+
+from pyhpecfm import fabric
+
+
+def parse_vlans(value):
+    """
+    Parse the VLANs of a CFM object.
+
+    :param value: str VLAN list as returned by the CFM API, e.g. '1-3,7', an int, an iterable
+    of ints or None
+    :return: frozenset of int VLAN ids
+    :rtype: frozenset
+    """
+    if value is None or value == '':
+        return frozenset()
+    if isinstance(value, int):
+        return frozenset([value])
+    if not isinstance(value, str):
+        return frozenset(int(vlan) for vlan in value)
+    vlans = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            low, high = part.split('-', 1)
+            vlans.update(range(int(low), int(high) + 1))
+        else:
+            vlans.add(int(part))
+    return frozenset(vlans)
+
+
+def normalize_mac(mac_address):
+    """
+    :param mac_address: str MAC address in any case, separated by ':', '-' or '.' or not at all
+    :return: str upper case MAC address separated by ':'
+    :rtype: str
+    """
+    digits = ''.join(char for char in mac_address if char not in ':-.').upper()
+    return ':'.join(digits[index:index + 2] for index in range(0, len(digits), 2))
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_all(values):
+    return tuple(_intern(value) for value in values or ())
+
+
+class _Record(object):
+    """Base class of inventory records, built from the dict returned by the CFM API."""
+
+    __slots__ = ()
+    _converters = {}
+
+    def __init__(self, data):
+        for name in self.__slots__:
+            convert = self._converters.get(name, _intern)
+            setattr(self, name, convert(data.get(name)))
+
+    def __repr__(self):
+        return '<{} {} {}>'.format(type(self).__name__, self.uuid, self.name)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def to_dict(self):
+        """
+        :return: dict of the attributes of the record
+        :rtype: dict
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FabricRecord(_Record):
+    """Composable Fabric as held by an Inventory."""
+
+    __slots__ = ('uuid', 'name', 'description', 'health', 'is_stable')
+
+
+class SwitchRecord(_Record):
+    """Composable Fabric switch as held by an Inventory."""
+
+    __slots__ = ('uuid', 'name', 'fabric_uuid', 'mac_address', 'ip_address', 'serial_number',
+                 'model', 'sw_version', 'status', 'health', 'configuration_number')
+    _converters = {'mac_address': lambda value: _intern(normalize_mac(value or ''))}
+
+
+class PortRecord(_Record):
+    """
+    Composable Fabric switch port as held by an Inventory.
+
+    vlans holds the VLANs carried by the port: its native VLAN, its own VLANs and the VLANs of
+    its VLAN groups.
+    """
+
+    __slots__ = ('uuid', 'name', 'port_label', 'silkscreen', 'switch_uuid', 'type',
+                 'admin_state', 'link_state', 'is_uplink', 'native_vlan', 'vlans',
+                 'vlan_group_uuids')
+    _converters = {'vlans': parse_vlans, 'vlan_group_uuids': _intern_all}
+
+
+class LagRecord(_Record):
+    """Link aggregation group as held by an Inventory."""
+
+    __slots__ = ('uuid', 'name', 'type', 'native_vlan', 'vlans', 'vlan_group_uuids',
+                 'port_uuids')
+    _converters = {'vlans': parse_vlans, 'vlan_group_uuids': _intern_all,
+                   'port_uuids': _intern_all}
+
+    def __init__(self, data):
+        if 'port_uuids' not in data:
+            data = dict(data, port_uuids=[port_uuid
+                                          for properties in data.get('port_properties') or ()
+                                          for port_uuid in properties.get('port_uuids') or ()])
+        super(LagRecord, self).__init__(data)
+
+
+class VlanGroupRecord(_Record):
+    """VLAN group as held by an Inventory."""
+
+    __slots__ = ('uuid', 'name', 'description', 'vlans', 'lag_uuids')
+    _converters = {'vlans': parse_vlans, 'lag_uuids': _intern_all}
+
+
+def _as_record(record_class, data):
+    return data if isinstance(data, record_class) else record_class(data)
+
+
+class Inventory(object):
+    """
+    Indexed snapshot of the fabrics, switches, ports, LAGs and VLAN groups of a CFM.
+
+    Records are looked up by UUID with get() or through the fabrics, switches, ports, lags and
+    vlan_groups dicts. The snapshot is not updated after it is built, see pyhpecfm.sync for
+    keeping one up to date.
+    """
+
+    def __init__(self, fabrics=(), switches=(), ports=(), lags=(), vlan_groups=()):
+        """
+        Build the snapshot from the dicts returned by the pyhpecfm.fabric functions, or from
+        the records of another snapshot, which are shared rather than copied.
+
+        :param fabrics: iterable of fabric dicts
+        :param switches: iterable of switch dicts. Ports embedded by get_switches(params={'ports':
+        True}) are added to the ports
+        :param ports: iterable of port dicts
+        :param lags: iterable of LAG dicts
+        :param vlan_groups: iterable of VLAN group dicts
+        """
+        self.fabrics = {}
+        self.switches = {}
+        self.ports = {}
+        self.lags = {}
+        self.vlan_groups = {}
+        self._switches_by_fabric = {}
+        self._switch_by_mac = {}
+        self._ports_by_switch = {}
+        self._ports_by_vlan = {}
+        self._ports_by_name = {}
+        self._lags_by_port = {}
+        self._vlan_groups_by_lag = {}
+
+        for data in vlan_groups:
+            group = _as_record(VlanGroupRecord, data)
+            self.vlan_groups[group.uuid] = group
+            for lag_uuid in group.lag_uuids:
+                self._vlan_groups_by_lag.setdefault(lag_uuid, []).append(group)
+
+        for data in fabrics:
+            record = _as_record(FabricRecord, data)
+            self.fabrics[record.uuid] = record
+
+        vlan_sets = {}
+        for data in switches:
+            switch = _as_record(SwitchRecord, data)
+            self.switches[switch.uuid] = switch
+            self._switches_by_fabric.setdefault(switch.fabric_uuid, []).append(switch)
+            if switch.mac_address:
+                self._switch_by_mac[switch.mac_address] = switch
+            if switch is not data:
+                for port in data.get('ports') or ():
+                    self._add_port(port, vlan_sets)
+        for data in ports:
+            self._add_port(data, vlan_sets)
+
+        for data in lags:
+            lag = _as_record(LagRecord, data)
+            self.lags[lag.uuid] = lag
+            for port_uuid in lag.port_uuids:
+                self._lags_by_port.setdefault(port_uuid, []).append(lag)
+
+    def _add_port(self, data, vlan_sets):
+        port = _as_record(PortRecord, data)
+        if port.uuid in self.ports:
+            return
+        if port is not data:
+            vlans = set(port.vlans)
+            vlans.update(parse_vlans(data.get('ungrouped_vlans')))
+            if port.native_vlan is not None:
+                vlans.add(port.native_vlan)
+            for group_uuid in port.vlan_group_uuids:
+                group = self.vlan_groups.get(group_uuid)
+                if group is not None:
+                    vlans.update(group.vlans)
+            # Ports mostly carry the same few VLAN sets, so they share one frozenset per set.
+            vlans = frozenset(vlans)
+            port.vlans = vlan_sets.setdefault(vlans, vlans)
+
+        self.ports[port.uuid] = port
+        self._ports_by_switch.setdefault(port.switch_uuid, []).append(port)
+        for vlan in port.vlans:
+            self._ports_by_vlan.setdefault(vlan, []).append(port)
+        for name in {port.name, port.port_label}:
+            if name:
+                self._ports_by_name.setdefault(name, []).append(port)
+
+    @classmethod
+    def load(cls, cfmclient):
+        """
+        Load a snapshot from a CFM.
+
+        Switches are read with their ports in one streamed request, so only one switch is
+        held as a dict at a time.
+
+        :param cfmclient: object of type CFMClient
+        :return: Inventory of the CFM
+        :rtype: Inventory
+        """
+        return cls(fabrics=fabric.get_fabrics(cfmclient),
+                   switches=fabric.iter_switches(cfmclient, params={'ports': True}),
+                   lags=fabric.get_lags(cfmclient),
+                   vlan_groups=fabric.get_vlan_groups(cfmclient))
+
+    def __repr__(self):
+        return '<Inventory fabrics={} switches={} ports={} lags={} vlan_groups={}>'.format(
+            len(self.fabrics), len(self.switches), len(self.ports), len(self.lags),
+            len(self.vlan_groups))
+
+    def get(self, uuid):
+        """
+        :param uuid: str UUID of a fabric, switch, port, LAG or VLAN group
+        :return: the record with this UUID, or None
+        """
+        for records in (self.ports, self.switches, self.lags, self.vlan_groups, self.fabrics):
+            record = records.get(uuid)
+            if record is not None:
+                return record
+        return None
+
+    def switch_by_mac(self, mac_address):
+        """
+        :param mac_address: str MAC address of a switch, in any common notation
+        :return: SwitchRecord or None
+        """
+        return self._switch_by_mac.get(normalize_mac(mac_address))
+
+    def switches_in_fabric(self, fabric_uuid):
+        """
+        :param fabric_uuid: str UUID of a fabric
+        :return: list of SwitchRecord
+        :rtype: list
+        """
+        return list(self._switches_by_fabric.get(fabric_uuid, ()))
+
+    def find_ports(self, switch_uuid=None, vlan=None, name=None, fabric_uuid=None):
+        """
+        Find the ports matching every given criterion.
+
+        The smallest index entry of the criteria is scanned, so the cost is proportional to
+        the number of ports of the most selective criterion.
+
+        :param switch_uuid: str UUID of the switch of the ports
+        :param vlan: int VLAN carried by the ports
+        :param name: str name or label of the ports, e.g. '15.3'
+        :param fabric_uuid: str UUID of the fabric of the switch of the ports
+        :return: list of PortRecord
+        :rtype: list
+        """
+        candidates = []
+        if switch_uuid is not None:
+            candidates.append(self._ports_by_switch.get(switch_uuid, ()))
+        if vlan is not None:
+            candidates.append(self._ports_by_vlan.get(int(vlan), ()))
+        if name is not None:
+            candidates.append(self._ports_by_name.get(name, ()))
+        if fabric_uuid is not None and switch_uuid is None:
+            candidates.append([port for switch in self._switches_by_fabric.get(fabric_uuid, ())
+                               for port in self._ports_by_switch.get(switch.uuid, ())])
+        if not candidates:
+            return list(self.ports.values())
+
+        def matches(port):
+            if switch_uuid is not None and port.switch_uuid != switch_uuid:
+                return False
+            if vlan is not None and int(vlan) not in port.vlans:
+                return False
+            if name is not None and name not in (port.name, port.port_label):
+                return False
+            if fabric_uuid is not None:
+                switch = self.switches.get(port.switch_uuid)
+                if switch is None or switch.fabric_uuid != fabric_uuid:
+                    return False
+            return True
+
+        return [port for port in min(candidates, key=len) if matches(port)]
+
+    def lags_of_port(self, port_uuid):
+        """
+        :param port_uuid: str UUID of a port
+        :return: list of LagRecord the port is a member of
+        :rtype: list
+        """
+        return list(self._lags_by_port.get(port_uuid, ()))
+
+    def vlan_groups_of_lag(self, lag_uuid):
+        """
+        :param lag_uuid: str UUID of a LAG
+        :return: list of VlanGroupRecord applied to the LAG
+        :rtype: list
+        """
+        return list(self._vlan_groups_by_lag.get(lag_uuid, ()))
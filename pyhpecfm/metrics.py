@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+This module collects metrics of the API calls made by CFMClient and AsyncCFMClient and exposes
+them in the OpenMetrics text format read by Prometheus.
+
+ClientMetrics is a request hook (see pyhpecfm.hooks), so it sees every attempt of every call
+of the clients it instruments. It keeps per-endpoint latency histograms, with the UUIDs in the
+paths replaced by '{uuid}' so that e.g. every v1/users/<uuid> call lands in one series, and
+counters of requests, bytes, retries, 401 re-authentications, 503 answers, timeouts and
+connection errors. The number of requests in flight to each host is read from the host
+governors (see pyhpecfm.throttle) and the cache hits, misses and hit ratio from the response
+caches of the instrumented clients (see pyhpecfm.cache), since fresh cache hits are answered
+without an API call and so without a hook event. 304 answers served from the cache are
+counted per endpoint as revalidations.
+
+The metrics are pulled with render(), or served over HTTP for a Prometheus scraper with
+start_http_server(). Comparing the time to first byte with the total latency and the time
+spent queued in the governors tells whether slow runs come from the CFM or from the client.
+
+>>> from pyhpecfm import client, metrics
+>>> cfm_metrics = metrics.ClientMetrics()
+>>> cfm = cfm_metrics.instrument(client.CFMClient('hpecfm.local', 'admin', 'plexxi'))
+>>> server = metrics.start_http_server(cfm_metrics, port=9400)
+>>> print(cfm_metrics.render())
+"""
+import bisect
+import re
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from pyhpecfm import hooks
+from pyhpecfm import throttle
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_UUID = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-'
+                   r'[0-9a-fA-F]{12}$')
+
+
+def endpoint(path):
+    """
+    Return the endpoint of a CFM API path, used to label its metrics.
+
+    :param path: str the requested path, e.g. 'v1/users/<uuid>?foo=bar'
+    :return: str path without query string, with UUID and numeric segments replaced by
+    '{uuid}' and '{id}', e.g. 'v1/users/{uuid}'
+    :rtype: str
+    """
+    segments = path.split('?', 1)[0].strip('/').split('/')
+    for index, segment in enumerate(segments):
+        if _UUID.match(segment):
+            segments[index] = '{uuid}'
+        elif segment.isdigit():
+            segments[index] = '{id}'
+    return '/'.join(segments)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value)) for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+class _Histogram(object):
+    """Cumulative histogram of observations."""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, buckets, value):
+        self.counts[bisect.bisect_left(buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class ClientMetrics(object):
+    """
+    Request hook aggregating metrics of CFM API calls.
+
+    One instance can be shared by any number of clients. Call instrument() on them, or pass the
+    instance as a hook to their constructor, in which case the in-flight gauge, governor
+    queueing time and response cache counters of their host are not reported.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='cfm_client'):
+        """
+        :param buckets: iterable of float upper bounds in seconds of the latency histogram
+        buckets
+        :param prefix: str prefix of the metric names
+        """
+        self._buckets = tuple(sorted(buckets))
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._hosts = set()
+        self._latency = {}
+        self._ttfb = {}
+        self._requests = {}
+        self._bytes_sent = {}
+        self._bytes_received = {}
+        self._retries = {}
+        self._reauthentications = {}
+        self._unavailable = {}
+        self._timeouts = {}
+        self._connection_errors = {}
+        self._revalidations = {}
+        self._caches = []
+
+    def instrument(self, cfmclient):
+        """
+        Collect the metrics of the API calls of a client.
+
+        :param cfmclient: object of type CFMClient or AsyncCFMClient
+        :return: the client
+        """
+        cfmclient.add_hook(self)
+        cache = getattr(cfmclient, 'cache', None)
+        with self._lock:
+            if hasattr(cfmclient, 'governor'):
+                self._hosts.add(cfmclient.host)
+            if cache is not None and all(known is not cache for _, known in self._caches):
+                self._caches.append((cfmclient.host, cache))
+        return cfmclient
+
+    def __call__(self, event):
+        """
+        Record one attempt of an API call.
+
+        :param event: pyhpecfm.hooks.RequestEvent
+        """
+        series = (event.method, endpoint(event.path))
+        name = series[1]
+        code = str(event.status) if event.status is not None else event.failure or 'none'
+        with self._lock:
+            if event.latency is not None:
+                self._histogram(self._latency, series).observe(self._buckets, event.latency)
+            if event.ttfb is not None:
+                self._histogram(self._ttfb, series).observe(self._buckets, event.ttfb)
+            self._add(self._requests, series + (code,))
+            if event.bytes_sent:
+                self._add(self._bytes_sent, series, event.bytes_sent)
+            if event.bytes_received:
+                self._add(self._bytes_received, series, event.bytes_received)
+            if event.retry_reason is not None:
+                self._add(self._retries, (name, event.retry_reason))
+            if event.retry_reason == hooks.RETRY_REAUTH:
+                self._add(self._reauthentications, (name,))
+            if event.status == 503:
+                self._add(self._unavailable, (name,))
+            if event.failure == hooks.FAILURE_TIMEOUT:
+                self._add(self._timeouts, (name,))
+            elif event.failure == hooks.FAILURE_CONNECTION:
+                self._add(self._connection_errors, (name,))
+            if event.cached:
+                self._add(self._revalidations, (name,))
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(self._buckets)
+        return histogram
+
+    @staticmethod
+    def _add(counters, key, value=1):
+        counters[key] = counters.get(key, 0) + value
+
+    def cache_hit_ratio(self, host=None):
+        """
+        :param host: str host of the instrumented clients, None for every host
+        :return: float share of the response cache lookups answered with a fresh cached
+        response, None before the first lookup
+        """
+        with self._lock:
+            caches = [cache for cache_host, cache in self._caches
+                      if host is None or cache_host == host]
+        hits = lookups = 0
+        for cache in caches:
+            stats = cache.stats()
+            hits += stats['hits']
+            lookups += stats['hits'] + stats['misses']
+        return float(hits) / lookups if lookups else None
+
+    def render(self):
+        """
+        Render the metrics in the OpenMetrics text format.
+
+        :return: str exposition ending with '# EOF'
+        :rtype: str
+        """
+        prefix = self._prefix
+        lines = []
+
+        def family(name, kind, help_text, unit=None):
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            if unit:
+                lines.append('# UNIT {}_{} {}'.format(prefix, name, unit))
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+
+        def histogram(name, help_text, histograms):
+            family(name, 'histogram', help_text, 'seconds')
+            for key, data in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self._buckets + (float('inf'),), data.counts):
+                    cumulative += count
+                    labels = _labels(('method', 'endpoint'), key, ('le', _number(bound)))
+                    lines.append('{}_{}_bucket{} {}'.format(prefix, name, labels, cumulative))
+                labels = _labels(('method', 'endpoint'), key)
+                lines.append('{}_{}_count{} {}'.format(prefix, name, labels, data.count))
+                lines.append('{}_{}_sum{} {}'.format(prefix, name, labels, _number(data.total)))
+
+        def counter(name, help_text, counters, label_names, unit=None):
+            family(name, 'counter', help_text, unit)
+            for key, value in sorted(counters.items()):
+                lines.append('{}_{}_total{} {}'.format(prefix, name, _labels(label_names, key),
+                                                       value))
+
+        with self._lock:
+            histogram('request_duration_seconds',
+                      'Latency of API call attempts, from sending the request to reading the '
+                      'response.', self._latency)
+            histogram('time_to_first_byte_seconds',
+                      'Time until the CFM answered API call attempts with response headers.',
+                      self._ttfb)
+            counter('requests', 'API call attempts by HTTP status or failure kind.',
+                    self._requests, ('method', 'endpoint', 'code'))
+            counter('request_bytes', 'Bytes of request bodies sent.', self._bytes_sent,
+                    ('method', 'endpoint'), 'bytes')
+            counter('response_bytes', 'Bytes of response bodies received.',
+                    self._bytes_received, ('method', 'endpoint'), 'bytes')
+            counter('retries', 'API call attempts followed by a retry, by reason.',
+                    self._retries, ('endpoint', 'reason'))
+            counter('reauthentications', 'Logins following a 401 answer.',
+                    self._reauthentications, ('endpoint',))
+            counter('service_unavailable', '503 Service Unavailable answers.',
+                    self._unavailable, ('endpoint',))
+            counter('timeouts', 'API call attempts which timed out.', self._timeouts,
+                    ('endpoint',))
+            counter('connection_errors', 'API call attempts which failed to connect.',
+                    self._connection_errors, ('endpoint',))
+            counter('cache_revalidations',
+                    'GET responses served from the response cache after a 304.',
+                    self._revalidations, ('endpoint',))
+            hosts = sorted(self._hosts)
+            caches = list(self._caches)
+
+        cache_stats = {}
+        for host, cache in caches:
+            stats = cache.stats()
+            totals = cache_stats.setdefault(host, [0, 0])
+            totals[0] += stats['hits']
+            totals[1] += stats['misses']
+        family('cache_hits', 'counter', 'GET requests answered with a fresh cached response.')
+        family('cache_misses', 'counter', 'GET requests not answered from the response cache.')
+        family('cache_hit_ratio', 'gauge',
+               'Share of the response cache lookups answered with a fresh cached response.')
+        for host, (hits, misses) in sorted(cache_stats.items()):
+            labels = _labels(('host',), (host,))
+            lines.append('{}_cache_hits_total{} {}'.format(prefix, labels, hits))
+            lines.append('{}_cache_misses_total{} {}'.format(prefix, labels, misses))
+            if hits + misses:
+                lines.append('{}_cache_hit_ratio{} {}'.format(
+                    prefix, labels, _number(float(hits) / (hits + misses))))
+
+        family('in_flight_requests', 'gauge', 'Requests in flight to the CFM host.')
+        family('queued_seconds', 'counter',
+               'Time requests waited in the host governor before being sent.', 'seconds')
+        governors = [(host, throttle.get_governor(host).stats()) for host in hosts]
+        for host, stats in governors:
+            lines.append('{}_in_flight_requests{} {}'.format(
+                prefix, _labels(('host',), (host,)), stats['in_flight']))
+        for host, stats in governors:
+            lines.append('{}_queued_seconds_total{} {}'.format(
+                prefix, _labels(('host',), (host,)),
+                _number(float(stats['rate_wait_seconds'] + stats['concurrency_wait_seconds']))))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_http_server(metrics, port, address='127.0.0.1'):
+    """
+    Serve the metrics over HTTP on every path, in a daemon thread.
+
+    :param metrics: ClientMetrics to serve
+    :param port: int TCP port to listen on, 0 for any free port
+    :param address: str address to listen on
+    :return: the HTTP server, whose shutdown() method stops it
+    :rtype: HTTPServer
+    """
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = _ThreadingHTTPServer((address, port), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+This module holds the retry policy applied by CFMClient and AsyncCFMClient to failed API calls.
+
+Retries use exponential backoff with full jitter, so that workers hitting a busy CFM at the
+same moment spread their retries out instead of retrying in lockstep, and honour the
+Retry-After header sent with 503 answers. A retry budget caps the share of retries in the
+traffic of a client, so a CFM which is down is not hammered by every caller retrying.
+
+>>> from pyhpecfm import client, retry
+>>> policy = retry.RetryPolicy(max_attempts=5, backoff_base=0.5, backoff_max=20)
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi', retry_policy=policy)
+"""
+import datetime
+import random
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+
+class RetryBudget(object):
+    """
+    Token bucket limiting retries to a fraction of the requests made.
+
+    Every request deposits ratio tokens and every retry withdraws one. The bucket also refills
+    at min_retries_per_second so that a client making few requests can still retry.
+    """
+
+    def __init__(self, ratio=0.2, min_retries_per_second=1.0, capacity=10):
+        """
+        :param ratio: float retries allowed per request
+        :param min_retries_per_second: float retries always allowed per second
+        :param capacity: float maximum number of retries that can be saved up
+        """
+        self._ratio = ratio
+        self._min_retries_per_second = min_retries_per_second
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens +
+                           (now - self._updated) * self._min_retries_per_second)
+        self._updated = now
+
+    def deposit(self):
+        """Record a request."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._capacity, self._tokens + self._ratio)
+
+    def withdraw(self):
+        """
+        Spend the budget of one retry.
+
+        :return: bool False when the budget is exhausted and the retry must not happen
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header value.
+
+    :param value: str delay in seconds or HTTP date, or None
+    :return: float seconds to wait, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max((date - now).total_seconds(), 0.0)
+
+
+class RetryPolicy(object):
+    """Decide whether and when a failed CFM API call is retried."""
+
+    def __init__(self, max_attempts=3, backoff_base=1.0, backoff_max=30.0,
+                 retry_statuses=(503,), retry_methods=IDEMPOTENT_METHODS, retry_timeouts=True,
+                 retry_connection_errors=True, respect_retry_after=True, budget=None):
+        """
+        :param max_attempts: int maximum number of attempts per call, including the first one
+        :param backoff_base: float upper bound in seconds of the first backoff delay, doubled
+        for every further attempt
+        :param backoff_max: float cap in seconds of any delay, including Retry-After
+        :param retry_statuses: iterable of HTTP status codes which are retried
+        :param retry_methods: iterable of HTTP methods which may be retried. Only idempotent
+        methods by default, POST and PATCH are never retried unless listed here
+        :param retry_timeouts: bool retry calls which timed out
+        :param retry_connection_errors: bool retry calls which failed to connect
+        :param respect_retry_after: bool wait for the delay requested by a Retry-After header
+        :param budget: RetryBudget limiting the retries of the calls using this policy. A new
+        budget is created when omitted, pass False to disable it
+        """
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(method.upper() for method in retry_methods)
+        self.retry_timeouts = retry_timeouts
+        self.retry_connection_errors = retry_connection_errors
+        self.respect_retry_after = respect_retry_after
+        self.budget = RetryBudget() if budget is None else budget or None
+
+    def record_request(self):
+        """Record a new call in the retry budget."""
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Compute the delay before the next attempt.
+
+        :param attempt: int number of the attempt which just failed, starting at 1
+        :param retry_after: float delay requested by the server, if any
+        :return: float seconds to wait
+        """
+        if retry_after is not None and self.respect_retry_after:
+            return min(retry_after, self.backoff_max)
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def next_delay(self, method, attempt, retry_after=None):
+        """
+        Decide whether a failed attempt is retried.
+
+        :param method: str HTTP method of the call
+        :param attempt: int number of the attempt which just failed, starting at 1
+        :param retry_after: str value of the Retry-After header of the answer, if any
+        :return: float seconds to wait before retrying, or None if the call must not be retried
+        """
+        if attempt >= self.max_attempts or method.upper() not in self.retry_methods:
+            return None
+        if self.budget is not None and not self.budget.withdraw():
+            return None
+        return self.backoff(attempt, parse_retry_after(retry_after))
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides incremental parsing of large CFM API responses.
+
+CFM wraps every answer in an object such as ``{"count": 81, "result": [...], "time": "..."}``.
+The functions below read a streamed response chunk by chunk and yield the records of the
+``result`` array one at a time, so memory use is bounded by the size of a single record
+instead of the size of the whole body.
+"""
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _IncrementalReader(object):
+    """Decode JSON values from a stream of byte chunks, keeping only unconsumed text."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size=1):
+        """
+        Drop consumed text and append at least size characters to the buffer.
+
+        :return: bool False if the end of the stream was reached
+        """
+        if self._eof:
+            return False
+        parts = [self._buffer[self._pos:]]
+        self._pos = 0
+        read = 0
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            parts.append(text)
+            read += len(text)
+            if read >= size:
+                self._buffer = ''.join(parts)
+                return True
+        parts.append(self._utf8.decode(b'', final=True))
+        self._buffer = ''.join(parts)
+        self._eof = True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it, or '' at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, characters):
+        """Consume the next character, which must be one of characters, and return it."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expected one of {!r} at offset {} but found {!r}'.format(
+                characters, self._pos, character))
+        self._pos += 1
+        return character
+
+    def value(self):
+        """
+        Decode the next complete JSON value.
+
+        A value ending exactly at the end of the buffer is only accepted at the end of the
+        stream, because a number such as 12 may continue in the next chunk. While a value is
+        incomplete the unconsumed text is at least doubled before decoding again, which keeps
+        the cost linear in the size of the value however small the chunks are.
+        """
+        self.peek()
+        while True:
+            try:
+                result, end = self._decoder.raw_decode(self._buffer, self._pos)
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return result
+            except ValueError:
+                if self._eof:
+                    raise
+            self._fill(len(self._buffer) - self._pos)
+
+
+def iter_json_array(chunks, key='result'):
+    """
+    Yield the items of the array stored under key in a top-level JSON object.
+
+    If the value under key is not an array it is yielded as a single item. Nothing is yielded
+    when the key is absent.
+
+    :param chunks: iterable of bytes holding the UTF-8 encoded JSON document
+    :param key: str name of the top-level member holding the records
+    :return: generator of decoded records
+    """
+    reader = _IncrementalReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name != key:
+            reader.value()
+        elif reader.peek() != '[':
+            yield reader.value()
+            return
+        else:
+            reader.expect('[')
+            if reader.peek() == ']':
+                return
+            while True:
+                yield reader.value()
+                if reader.expect(',]') == ']':
+                    return
+        if reader.expect(',}') == '}':
+            return
+
+
+def iter_result(response, chunk_size=64 * 1024):
+    """
+    Yield the records of the result array of a streamed CFM response.
+
+    The response is closed once the generator is exhausted or discarded, releasing its
+    connection back to the pool.
+
+    :param response: requests.Response obtained with stream=True
+    :param chunk_size: int number of bytes read from the socket at a time
+    :return: generator of dicts
+    """
+    if response is None:
+        return
+    try:
+        for record in iter_json_array(response.iter_content(chunk_size=chunk_size)):
+            yield record
+    finally:
+        response.close()
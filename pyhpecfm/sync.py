@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+This module keeps a pyhpecfm.inventory.Inventory up to date and publishes what changed.
+
+Every refresh first probes the switches without their ports, which is cheap, and compares
+their configuration_number with the previous refresh. The expensive read of the switches with
+their ports is skipped when no switch changed and the VLAN groups are the same; the switches
+are then taken from the probe, so status and health changes are still seen, and only the
+ports of the previous refresh are reused. The new
+snapshot is then diffed against the previous one by UUID and an InventoryEvent is published
+for every record added, changed or removed, so consumers only process deltas.
+
+>>> import queue
+>>> from pyhpecfm import client, sync
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+>>> cfm.connect()
+>>> events = queue.Queue()
+>>> syncer = sync.InventorySync(cfm, queue=events)
+>>> syncer.run(interval=60)
+"""
+import threading
+
+from pyhpecfm import fabric
+from pyhpecfm.inventory import Inventory, VlanGroupRecord
+
+ADDED = 'added'
+CHANGED = 'changed'
+REMOVED = 'removed'
+
+COLLECTIONS = ('fabrics', 'switches', 'ports', 'lags', 'vlan_groups')
+
+
+class InventoryEvent(object):
+    """Change of one record between two inventory snapshots."""
+
+    __slots__ = ('kind', 'collection', 'uuid', 'old', 'new')
+
+    def __init__(self, kind, collection, uuid, old=None, new=None):
+        """
+        :param kind: str ADDED, CHANGED or REMOVED
+        :param collection: str one of COLLECTIONS, e.g. 'ports'
+        :param uuid: str UUID of the record
+        :param old: record in the previous snapshot, None when added
+        :param new: record in the new snapshot, None when removed
+        """
+        self.kind = kind
+        self.collection = collection
+        self.uuid = uuid
+        self.old = old
+        self.new = new
+
+    def __repr__(self):
+        return '<InventoryEvent {} {} {}>'.format(self.kind, self.collection, self.uuid)
+
+
+def diff_inventories(old, new):
+    """
+    Compare two inventory snapshots record by record.
+
+    :param old: Inventory previous snapshot, or None to report every record as added
+    :param new: Inventory new snapshot
+    :return: list of InventoryEvent, grouped by collection in the order of COLLECTIONS
+    :rtype: list
+    """
+    events = []
+    for collection in COLLECTIONS:
+        before = getattr(old, collection) if old is not None else {}
+        after = getattr(new, collection)
+        for uuid, record in after.items():
+            previous = before.get(uuid)
+            if previous is None:
+                events.append(InventoryEvent(ADDED, collection, uuid, new=record))
+            elif previous is not record and previous != record:
+                events.append(InventoryEvent(CHANGED, collection, uuid, previous, record))
+        for uuid, record in before.items():
+            if uuid not in after:
+                events.append(InventoryEvent(REMOVED, collection, uuid, old=record))
+    return events
+
+
+class InventorySync(object):
+    """
+    Refresh an inventory snapshot and publish the differences.
+
+    The first refresh reports every record as added.
+    """
+
+    def __init__(self, cfmclient, callback=None, queue=None, switch_params=None):
+        """
+        :param cfmclient: object of type CFMClient
+        :param callback: callable invoked with each InventoryEvent
+        :param queue: object with a put() method, e.g. queue.Queue, receiving each InventoryEvent
+        :param switch_params: dict of query parameters of the full switch read. Defaults to
+        {'ports': True, 'software': True, 'fabric': True}
+        """
+        self._cfmclient = cfmclient
+        self._callback = callback
+        self._queue = queue
+        self._switch_params = switch_params or {'ports': True, 'software': True, 'fabric': True}
+        self._snapshot = None
+        self._markers = None
+        self._stats = {'refreshes': 0, 'full_reads': 0, 'events': 0}
+
+    @property
+    def snapshot(self):
+        """Inventory of the last refresh, None before the first one."""
+        return self._snapshot
+
+    def stats(self):
+        """
+        :return: dict with the number of refreshes, of refreshes which read the switches with
+        their ports (full_reads) and of events published
+        :rtype: dict
+        """
+        return dict(self._stats)
+
+    def refresh(self, force=False):
+        """
+        Refresh the snapshot and publish the records added, changed or removed since the last
+        refresh.
+
+        :param force: bool read the switches with their ports even if no switch changed
+        :return: list of the InventoryEvent published
+        :rtype: list
+        """
+        switches = fabric.get_switches(self._cfmclient)
+        markers = {switch['uuid']: switch.get('configuration_number') for switch in switches}
+        vlan_groups = [VlanGroupRecord(data) for data in fabric.get_vlan_groups(self._cfmclient)]
+        lags = fabric.get_lags(self._cfmclient)
+        fabrics = fabric.get_fabrics(self._cfmclient)
+
+        previous = self._snapshot
+        unchanged = (not force and previous is not None and markers == self._markers and
+                     {group.uuid: group for group in vlan_groups} == previous.vlan_groups)
+        if unchanged:
+            snapshot = Inventory(fabrics=fabrics, switches=switches,
+                                 ports=previous.ports.values(), lags=lags,
+                                 vlan_groups=vlan_groups)
+        else:
+            snapshot = Inventory(fabrics=fabrics,
+                                 switches=fabric.iter_switches(self._cfmclient,
+                                                               self._switch_params),
+                                 lags=lags, vlan_groups=vlan_groups)
+            markers = {uuid: switch.configuration_number
+                       for uuid, switch in snapshot.switches.items()}
+            self._stats['full_reads'] += 1
+
+        events = diff_inventories(previous, snapshot)
+        self._snapshot = snapshot
+        self._markers = markers
+        self._stats['refreshes'] += 1
+        self._stats['events'] += len(events)
+        for event in events:
+            if self._callback is not None:
+                self._callback(event)
+            if self._queue is not None:
+                self._queue.put(event)
+        return events
+
+    def run(self, interval=60, stop_event=None):
+        """
+        Refresh until stop_event is set.
+
+        :param interval: float seconds between refreshes
+        :param stop_event: threading.Event ending the loop when set, None to refresh forever
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.refresh()
+            stop_event.wait(interval)
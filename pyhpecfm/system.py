@@ -5,8 +5,13 @@ This module contains functions related to working with the system characteristic
 desired HPE Composable Fabric Manager instance
 """
 from pyhpecfm import system
+from pyhpecfm.client import CFMApiError
+from pyhpecfm.fanout import fan_out
+from pyhpecfm.streaming import iter_result
+from pyhpecfm.tracing import traced
 
 
+@traced
 def get_versions(cfmclient):
     """
     Function takes input cfmclient type object to authenticate against CFM API and queries
@@ -21,6 +26,7 @@ def get_versions(cfmclient):
     return response.json().get('result') if response else None
 
 
+@traced
 def get_audit_logs(cfmclient):
     """
     Get :List of audit log records currently defined in Composable Fabric.
@@ -34,6 +40,20 @@ def get_audit_logs(cfmclient):
     return response.json().get('result') if response else None
 
 
+@traced
+def iter_audit_logs(cfmclient):
+    """
+    Iterate over audit log records, parsing the response incrementally so only one record is
+    held in memory at a time.
+    :param cfmclient: object of type CFMClient
+    :return: generator of dicts where each dict represents a single entry in the audit log,
+    decoded as the response body is read
+    """
+    path = 'v1/audits'
+    return iter_result(cfmclient.get(path, stream=True))
+
+
+@traced
 def get_backups(cfmclient, uuid=None):
     """
     Function to get a list of current backups located on the Composable Fabric Manager
@@ -50,6 +70,7 @@ def get_backups(cfmclient, uuid=None):
     return response.json().get('result') if response else None
 
 
+@traced
 def create_backup(cfmclient):
     """
     Function to initiate a new backup on the Composable Fabric Manager represented by the
@@ -61,6 +82,7 @@ def create_backup(cfmclient):
     response = cfmclient.post(path)
     return response.json().get('result') if response else None
 
+@traced
 def get_auth_sources(cfmclient, params=None):
     """
     Function to query current auth sources from a Composable Fabric Manager represented
@@ -72,6 +94,7 @@ def get_auth_sources(cfmclient, params=None):
     response = cfmclient.get(path, params)
     return response.json().get('result')
 
+@traced
 def get_users(cfmclient, params=None):
     """
         Function to query current local users from a Composable Fabric Manager represented
@@ -83,6 +106,7 @@ def get_users(cfmclient, params=None):
     response = cfmclient.get(path, params)
     return response.json().get('result')
 
+@traced
 def add_local_user(cfmclient, username, role, password, params=None):
     """
     Function to add a single new local user to a Composable Fabric Manager
@@ -105,6 +129,7 @@ def add_local_user(cfmclient, username, role, password, params=None):
 
 
 
+@traced
 def delete_local_user(cfmclient, username):
     """
     Function to add a single new local user to a Composable Fabric Manager
@@ -119,5 +144,59 @@ def delete_local_user(cfmclient, username):
     else:
         return ("Username not present")
     path = 'v1/users/{}'.format(user_uuid)
-    print (path)
     return cfmclient.delete(path).json().get('result')
+
+
+@traced
+def add_local_users(cfmclient, users, max_workers=None):
+    """
+    Function to add many new local users to a Composable Fabric Manager represented by the
+    CFMClient Object. The local auth source is looked up once for the whole batch and the
+    users are created concurrently.
+    :param cfmclient: Composable Fabric Manager connection object of type CFMClient
+    :param users: iterable of (username, role, password) tuples
+    :param max_workers: int maximum number of concurrent requests
+    :return: FanOutResult where results maps each created username to the result of its
+    creation and errors maps each failed username to its exception
+    :rtype: pyhpecfm.fanout.FanOutResult
+    >>> from pyhpecfm import client
+    >>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+    >>> cfm.connect()
+    >>> add_local_users(cfm, [('alice', 'Operator', 'secret1'), ('bob', 'Viewer', 'secret2')])
+    """
+    local_uuid = get_auth_sources(cfmclient, params={'type': 'local'})[0]['uuid']
+    users = {username: (role, password) for username, role, password in users}
+
+    def create(client, username):
+        role, password = users[username]
+        data = {
+            "username": username,
+            "role": role,
+            "auth_source_uuid": local_uuid,
+            "password": password
+        }
+        return client.post('v1/users', None, data).json().get('result')
+
+    return fan_out(cfmclient, create, users, max_workers=max_workers)
+
+
+@traced
+def delete_local_users(cfmclient, usernames, max_workers=None):
+    """
+    Function to delete many local users from a Composable Fabric Manager represented by the
+    CFMClient Object. The users are looked up once for the whole batch and deleted concurrently.
+    :param cfmclient: Composable Fabric Manager connection object of type CFMClient
+    :param usernames: iterable of str usernames
+    :param max_workers: int maximum number of concurrent requests
+    :return: FanOutResult where results maps each deleted username to the result of its
+    deletion and errors maps each failed or unknown username to its exception
+    :rtype: pyhpecfm.fanout.FanOutResult
+    """
+    user_uuids = {user['username']: user['uuid'] for user in get_users(cfmclient)}
+
+    def delete(client, username):
+        if username not in user_uuids:
+            raise CFMApiError('Username not present: {}'.format(username))
+        return client.delete('v1/users/{}'.format(user_uuids[username])).json().get('result')
+
+    return fan_out(cfmclient, delete, usernames, max_workers=max_workers)
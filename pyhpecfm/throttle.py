@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides a client-side rate limiter and concurrency governor for CFM hosts.
+
+Every CFMClient talking to the same host shares one HostGovernor, which combines a token
+bucket (sustained requests per second plus a burst allowance) with a cap on the number of
+requests in flight. Callers over the limit wait for their turn instead of failing, and the
+time spent waiting is recorded so the limits can be sized from real traffic. Changing the
+limits of a host updates its governor in place, so requests already in flight keep counting
+against the cap and the counters are kept.
+
+>>> from pyhpecfm import client, throttle
+>>> throttle.configure_host('hpecfm.local', rate=20, burst=40, max_in_flight=8)
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi')
+>>> cfm.governor.stats()
+"""
+import contextlib
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket handing out one token per request."""
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: float tokens added per second
+        :param burst: float maximum number of tokens saved up, defaults to rate
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate, burst=None):
+        """
+        Change the rate and burst, keeping the tokens saved up within the new burst.
+
+        :param rate: float tokens added per second
+        :param burst: float maximum number of tokens saved up, defaults to rate
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = float(rate)
+            self.burst = float(burst or max(rate, 1))
+            self._tokens = min(self._tokens, self.burst)
+
+    def acquire(self):
+        """
+        Take a token, sleeping until one is available.
+
+        Waiting callers reserve their token up front, so they are served in arrival order.
+
+        :return: float seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class HostGovernor(object):
+    """Rate limit and in-flight cap shared by the clients of one CFM host."""
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """
+        :param rate: float maximum sustained requests per second, None for no rate limit
+        :param burst: float number of requests allowed above the rate in a burst
+        :param max_in_flight: int maximum number of concurrent requests, None for no cap
+        """
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._stats = {
+            'requests': 0,
+            'in_flight': 0,
+            'waited': 0,
+            'rate_wait_seconds': 0.0,
+            'concurrency_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Context manager holding one request slot, waiting for the rate limit and the in-flight
+        cap as needed.
+        """
+        bucket = self._bucket
+        rate_wait = bucket.acquire() if bucket else 0.0
+        concurrency_wait = 0.0
+        with self._lock:
+            stats = self._stats
+            if self.max_in_flight and stats['in_flight'] >= self.max_in_flight:
+                started = time.monotonic()
+                while self.max_in_flight and stats['in_flight'] >= self.max_in_flight:
+                    self._released.wait()
+                concurrency_wait = time.monotonic() - started
+            stats['requests'] += 1
+            stats['in_flight'] += 1
+            stats['rate_wait_seconds'] += rate_wait
+            stats['concurrency_wait_seconds'] += concurrency_wait
+            if rate_wait or concurrency_wait > 0.001:
+                stats['waited'] += 1
+            stats['max_wait_seconds'] = max(stats['max_wait_seconds'],
+                                            rate_wait + concurrency_wait)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stats['in_flight'] -= 1
+                self._released.notify()
+
+    def configure(self, rate=None, burst=None, max_in_flight=None):
+        """
+        Change the limits in place. Requests in flight keep counting against the new cap and
+        the counters are kept.
+
+        :param rate: float maximum sustained requests per second, None for no rate limit
+        :param burst: float number of requests allowed above the rate in a burst
+        :param max_in_flight: int maximum number of concurrent requests, None for no cap
+        """
+        with self._lock:
+            if not rate:
+                self._bucket = None
+            elif self._bucket is None:
+                self._bucket = TokenBucket(rate, burst)
+            else:
+                self._bucket.configure(rate, burst)
+            self.max_in_flight = max_in_flight
+            self._released.notify_all()
+
+    def stats(self):
+        """
+        Return the governor counters.
+
+        :return: dict with requests, in_flight, waited (requests which had to wait),
+        rate_wait_seconds, concurrency_wait_seconds and max_wait_seconds
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def configure_host(host, rate=None, burst=None, max_in_flight=None):
+    """
+    Set the limits applied to every client of a CFM host.
+
+    The governor of the host is updated in place rather than replaced, so the requests it has
+    in flight and its counters carry over.
+
+    :param host: str FQDN or IPv4 Address of the CFM host, as given to CFMClient
+    :param rate: float maximum sustained requests per second, None for no rate limit
+    :param burst: float number of requests allowed above the rate in a burst
+    :param max_in_flight: int maximum number of concurrent requests, None for no cap
+    :return: HostGovernor now used for the host
+    :rtype: HostGovernor
+    """
+    with _governors_lock:
+        governor = _governors.get(host)
+        if governor is None:
+            governor = _governors[host] = HostGovernor(rate=rate, burst=burst,
+                                                       max_in_flight=max_in_flight)
+            return governor
+    governor.configure(rate=rate, burst=burst, max_in_flight=max_in_flight)
+    return governor
+
+
+def get_governor(host):
+    """
+    Return the governor of a CFM host, creating an unlimited one on first use.
+
+    :param host: str FQDN or IPv4 Address of the CFM host
+    :return: HostGovernor
+    :rtype: HostGovernor
+    """
+    with _governors_lock:
+        governor = _governors.get(host)
+        if governor is None:
+            governor = _governors[host] = HostGovernor()
+        return governor
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides an on-disk store for CFM authentication tokens, shared by processes.
+
+A CFMClient given a token store reuses a valid token saved by an earlier process for the same
+host and user instead of logging in again, which saves a round trip to v1/auth/token for
+short-lived scripts and multiprocessing workers. Logins are serialized with a file lock, so
+workers started together log in once and share the token.
+
+>>> from pyhpecfm import client, tokenstore
+>>> store = tokenstore.FileTokenStore()
+>>> cfm = client.CFMClient('hpecfm.local', 'admin', 'plexxi', token_store=store)
+>>> cfm.connect()
+"""
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def default_directory():
+    """
+    Return the directory used by FileTokenStore when none is given.
+
+    :return: str $XDG_CACHE_HOME/pyhpecfm/tokens, or ~/.cache/pyhpecfm/tokens
+    :rtype: str
+    """
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache, 'pyhpecfm', 'tokens')
+
+
+class FileTokenStore(object):
+    """
+    Tokens saved as one small JSON file per host and user.
+
+    Files are named after a hash of the host and user, readable by their owner only, and
+    replaced atomically. Locking uses fcntl.flock where available; elsewhere logins are only
+    serialized between the threads of a process.
+    """
+
+    def __init__(self, directory=None):
+        """
+        :param directory: str directory holding the token files, see default_directory()
+        """
+        self.directory = directory or default_directory()
+        self._thread_lock = threading.RLock()
+
+    def _path(self, host, username):
+        digest = hashlib.sha256('{}\0{}'.format(host, username).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    @contextlib.contextmanager
+    def lock(self, host, username):
+        """
+        Context manager holding the lock of the token of a host and user across processes.
+
+        :param host: str FQDN or IPv4 Address of the CFM host
+        :param username: str user owning the token
+        """
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        with self._thread_lock:
+            with open(self._path(host, username) + '.lock', 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def load(self, host, username):
+        """
+        Read the saved token of a host and user.
+
+        :param host: str FQDN or IPv4 Address of the CFM host
+        :param username: str user owning the token
+        :return: (token, expires) with expires a time.time() timestamp or None if unknown, or
+        None when no unexpired token is saved
+        :rtype: tuple
+        """
+        try:
+            with open(self._path(host, username)) as token_file:
+                entry = json.load(token_file)
+        except (IOError, OSError, ValueError):
+            return None
+        token, expires = entry.get('token'), entry.get('expires')
+        if not token or (expires is not None and expires <= time.time()):
+            return None
+        return token, expires
+
+    def save(self, host, username, token, expires=None):
+        """
+        Save the token of a host and user.
+
+        :param host: str FQDN or IPv4 Address of the CFM host
+        :param username: str user owning the token
+        :param token: str authentication token
+        :param expires: float time.time() timestamp after which the token is not used, or None
+        """
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        path = self._path(host, username)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as token_file:
+                json.dump({'host': host, 'username': username, 'token': token,
+                           'expires': expires}, token_file)
+            os.replace(temporary, path)
+        except Exception:
+            os.unlink(temporary)
+            raise
+
+    def invalidate(self, host, username, token=None):
+        """
+        Remove the saved token of a host and user.
+
+        :param host: str FQDN or IPv4 Address of the CFM host
+        :param username: str user owning the token
+        :param token: str only remove the saved token if it is this one
+        """
+        if token is not None:
+            entry = self.load(host, username)
+            if entry is not None and entry[0] != token:
+                return
+        try:
+            os.unlink(self._path(host, username))
+        except OSError:
+            pass
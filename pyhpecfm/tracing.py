@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides optional tracing of the pyhpecfm helpers and API calls.
+
+Tracing is disabled until set_tracer() is given an OpenTelemetry compatible tracer, i.e. an
+object with a start_as_current_span(name, attributes=None) method returning a context manager
+which yields a span with a set_attribute(key, value) method. Once it is
+enabled, every helper of pyhpecfm.fabric and pyhpecfm.system (and of their asyncio
+counterparts) opens a span named after it, e.g. 'fabric.get_switches', and the clients open
+child spans for every attempt of an API call ('cfm.request'), for logging in again
+('cfm.refresh_token') and for the pauses before retries ('cfm.retry_sleep').
+
+While disabled, a traced helper costs one extra function call and a global lookup.
+
+>>> from opentelemetry import trace
+>>> from pyhpecfm import tracing
+>>> tracing.set_tracer(trace.get_tracer('pyhpecfm'))
+"""
+import functools
+import inspect
+
+_tracer = None
+
+
+class _NoopSpan(object):
+    """Span standing in for a real one while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def set_tracer(tracer):
+    """
+    Enable or disable tracing.
+
+    :param tracer: OpenTelemetry compatible tracer, e.g. opentelemetry.trace.get_tracer(
+    'pyhpecfm'), or None to disable tracing
+    """
+    global _tracer  # pylint: disable=global-statement
+    _tracer = tracer
+
+
+def get_tracer():
+    """
+    :return: the tracer set with set_tracer, None while tracing is disabled
+    """
+    return _tracer
+
+
+def span(name, attributes=None):
+    """
+    Open a span as the current span.
+
+    :param name: str name of the span
+    :param attributes: dict of span attributes
+    :return: context manager yielding the span, which is a shared no-op span while tracing is
+    disabled
+    >>> with tracing.span('cfm.retry_sleep', {'cfm.retry_delay': 0.5}):
+    ...     time.sleep(0.5)
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP_SPAN
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def traced(func):
+    """
+    Decorator opening a span around each call of a helper.
+
+    The span is named after the module and the function, without the 'pyhpecfm.' prefix, e.g.
+    'fabric.get_switches'. Coroutine functions are traced until they complete. The span of a
+    streaming helper such as fabric.iter_ports ends once the response headers are received,
+    before the body is read by the consumer.
+
+    :param func: function or coroutine function
+    :return: the wrapped function
+    """
+    module = func.__module__
+    if module.startswith('pyhpecfm.'):
+        module = module[len('pyhpecfm.'):]
+    name = '{}.{}'.format(module, func.__name__)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return await func(*args, **kwargs)
+            with _tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.start_as_current_span(name):
+                return func(*args, **kwargs)
+    return wrapper
@@ -81,6 +81,7 @@ setup(
         extras_require={
             'dev': ['check-manifest'],
             'test': ['coverage'],
+            'async': ['aiohttp>=3.3'],
         },
 
         # If there are data files included in your packages that need to be
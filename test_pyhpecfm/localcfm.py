@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal local HTTPS server speaking the CFM REST conventions, used by tests which need real
+connections (connection pooling, streaming, conditional requests) rather than recorded cassettes.
+"""
+
+import json
+import os
+import ssl
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qsl
+
+CERTFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'fixtures', 'certs', 'localhost.pem')
+
+
+def cfm_body(result):
+    """Encode a result the way the CFM API wraps it."""
+    return json.dumps({'count': len(result) if isinstance(result, list) else 1,
+                       'result': result, 'time': '1.000mS'}).encode('utf-8')
+
+
+class Request(object):
+    """Request received by the local server."""
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8')) if self.body else None
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LocalCFMServer(object):
+    """
+    Threaded HTTPS server answering CFM API paths from a route table.
+
+    Routes map (method, path) to either a result, which is wrapped in a CFM response body, or a
+    callable taking a Request and returning (status, headers, body bytes).
+    """
+
+    def __init__(self, routes=None, token='local-token'):
+        self.routes = {('POST', 'v1/auth/token'): token}
+        self.routes.update(routes or {})
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def host(self):
+        """str host:port to pass to CFMClient."""
+        return '127.0.0.1:{}'.format(self._server.server_address[1])
+
+    def start(self, port=0):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately; without this, delayed ACKs add 40ms.
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                with owner._lock:
+                    owner.connections += 1
+                BaseHTTPRequestHandler.setup(self)
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                url = urlsplit(self.path)
+                path = url.path[len('/api/'):] if url.path.startswith('/api/') else url.path
+                length = int(self.headers.get('Content-Length') or 0)
+                request = Request(self.command, path, dict(parse_qsl(url.query)),
+                                  dict(self.headers.items()), self.rfile.read(length))
+                with owner._lock:
+                    owner.requests.append(request)
+                status, headers, body = owner.respond(request)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        self._server = _ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        context.load_cert_chain(CERTFILE)
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def respond(self, request):
+        """Look up the route for a request and build the (status, headers, body) answer."""
+        route = self.routes.get((request.method, request.path))
+        if route is None:
+            return 404, None, cfm_body('Not found')
+        if callable(route):
+            return route(request)
+        return 200, None, cfm_body(route)
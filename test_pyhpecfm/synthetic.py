@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic generator of synthetic CFM API records for scale testing.
+
+SyntheticFabric produces fabrics, switches, ports, LAGs, VLAN groups and audit log entries
+shaped like the answers of a real CFM, with the attribute sets asserted by the recorded
+cassette tests. Every record is computed from the seed and its own position, not from the
+records before it, so the collections are generated lazily one record at a time, any size
+costs the same memory, and the same seed always gives the same records. The records are
+consistent with each other: ports belong to switches, LAGs group ports of one switch, VLAN
+groups apply to LAGs and audit entries refer to switches. Like v1/audits, audit entries are
+generated newest first.
+
+write_fixtures() streams the collections to disk as CFM response bodies.
+
+    python test_pyhpecfm/synthetic.py --switches 500 --ports-per-switch 100 --out /tmp/cfm
+"""
+import argparse
+import hashlib
+import json
+import os
+import uuid
+
+FABRIC_ATTRIBUTES = ('health', 'segmented', 'description', 'foreign_manager_id',
+                     'foreign_fabric_state', 'name', 'is_stable', 'foreign_management_state',
+                     'foreign_manager_url', 'uuid')
+
+SWITCH_ATTRIBUTES = ('in_default_segment', 'segment', 'fabric_uuid', 'fitting_number',
+                     'ip_gateway', 'hostip_state', 'ip_address_v6', 'uuid', 'ip_mode',
+                     'ip_gateway_v6', 'health', 'mac_address', 'ip_mode_v6', 'serial_number',
+                     'status', 'description', 'ip_address', 'model', 'hw_revision',
+                     'sw_version', 'name', 'ip_mask', 'configuration_number',
+                     'operational_stage', 'ip_mask_v6')
+
+PORT_ATTRIBUTES = ('downlink_switch_uuid', 'default_state', 'fec_mode', 'holddown',
+                   'native_vlan', 'description', 'speed_group', 'ungrouped_vlans', 'link_state',
+                   'switch_uuid', 'admin_state', 'form_factor', 'port_security_enabled', 'vlans',
+                   'speed', 'switch_name', 'fec', 'read_only', 'port_label', 'uuid',
+                   'is_uplink', 'vlan_group_uuids', 'name', 'permitted_qsfp_modes',
+                   'silkscreen', 'type', 'bridge_loop_detection', 'qsfp_mode')
+
+LAG_ATTRIBUTES = ('uuid', 'name', 'description', 'type', 'native_vlan', 'vlans',
+                  'ungrouped_vlans', 'vlan_group_uuids', 'port_properties')
+
+VLAN_GROUP_ATTRIBUTES = ('lag_uuids', 'description', 'vlans', 'uuid', 'name')
+
+AUDIT_ATTRIBUTES = ('description', 'record_type', 'log_date', 'uuid', 'stream_id', 'data',
+                    'severity')
+
+COLLECTIONS = ('fabrics', 'switches', 'ports', 'lags', 'vlan_groups', 'audits')
+
+# Ports of a switch are grouped four by four on QSFP cages, the last cage holds the uplinks.
+_LANES = 4
+_SEVERITIES = ('INFORMATIONAL', 'INFORMATIONAL', 'INFORMATIONAL', 'WARNING', 'CRITICAL')
+_STATUSES = ('SYNCED', 'SYNCED', 'SYNCED', 'SYNCING', 'UNSYNCED')
+
+
+class SyntheticFabric(object):
+    """
+    Lazily generated CFM inventory of a given size.
+
+    >>> synthetic = SyntheticFabric(switches=500, ports_per_switch=100)
+    >>> for port in synthetic.ports():
+    ...     pass
+    """
+
+    def __init__(self, fabrics=1, switches=16, ports_per_switch=48, lags_per_switch=2,
+                 vlan_groups=8, audit_entries=1000, seed=0):
+        """
+        :param fabrics: int number of fabrics, the switches are spread evenly over them
+        :param switches: int total number of switches
+        :param ports_per_switch: int number of ports of every switch
+        :param lags_per_switch: int number of LAGs of every switch, each of two ports
+        :param vlan_groups: int number of VLAN groups, applied to the LAGs in turn
+        :param audit_entries: int number of audit log entries
+        :param seed: int seed of the generated values
+        """
+        self.fabric_count = max(fabrics, 1)
+        self.switch_count = switches
+        self.ports_per_switch = ports_per_switch
+        self.lags_per_switch = min(lags_per_switch, ports_per_switch // 2)
+        self.vlan_group_count = vlan_groups
+        self.audit_count = audit_entries
+        self.seed = seed
+        self._namespace = uuid.uuid5(uuid.NAMESPACE_URL, 'pyhpecfm-synthetic/{}'.format(seed))
+        self._switch_index = None
+        self._audit_index = None
+
+    def counts(self):
+        """
+        :return: dict mapping each collection name to its number of records
+        :rtype: dict
+        """
+        return {'fabrics': self.fabric_count, 'switches': self.switch_count,
+                'ports': self.switch_count * self.ports_per_switch,
+                'lags': self.switch_count * self.lags_per_switch,
+                'vlan_groups': self.vlan_group_count, 'audits': self.audit_count}
+
+    def collection(self, name):
+        """
+        :param name: str one of COLLECTIONS
+        :return: generator of the records of the collection
+        """
+        return getattr(self, name)()
+
+    def _uuid(self, kind, index):
+        return str(uuid.uuid5(self._namespace, '{}/{}'.format(kind, index)))
+
+    def _number(self, kind, index):
+        digest = hashlib.sha1('{}/{}/{}'.format(self.seed, kind, index).encode('ascii'))
+        return int.from_bytes(digest.digest()[:8], 'big')
+
+    def _fabric_of(self, switch):
+        return switch * self.fabric_count // max(self.switch_count, 1)
+
+    def _group_of(self, lag):
+        return lag % self.vlan_group_count if self.vlan_group_count else None
+
+    def fabrics(self):
+        """Generate the fabric records."""
+        for index in range(self.fabric_count):
+            yield {
+                'uuid': self._uuid('fabric', index), 'name': 'fabric-{}'.format(index + 1),
+                'description': 'Synthetic fabric {}'.format(index + 1),
+                'health': {'status': 'healthy', 'health_issues': []},
+                'is_stable': True, 'segmented': False, 'foreign_manager_id': '',
+                'foreign_manager_url': '', 'foreign_fabric_state': 'Unmanaged',
+                'foreign_management_state': 'Available'}
+
+    def switch(self, index, ports=False):
+        """
+        :param index: int position of the switch
+        :param ports: bool embed the ports of the switch, as get_switches(params={'ports':
+        True}) does
+        :return: dict switch record
+        :rtype: dict
+        """
+        number = self._number('switch', index)
+        fabric = self._fabric_of(index)
+        record = {
+            'uuid': self._uuid('switch', index), 'name': 'switch-{}'.format(index + 1),
+            'description': '', 'fabric_uuid': self._uuid('fabric', fabric),
+            'segment': self._uuid('segment', fabric), 'in_default_segment': True,
+            'fitting_number': number % 20000, 'hostip_state': 'discovered',
+            'ip_mode': 'static', 'ip_address': '10.{}.{}.{}'.format(
+                fabric % 256, index // 250 % 256, index % 250 + 1),
+            'ip_mask': '255.255.0.0', 'ip_gateway': ['10.{}.0.1'.format(fabric % 256)],
+            'ip_mode_v6': 'static', 'ip_address_v6': '::', 'ip_mask_v6': '::',
+            'ip_gateway_v6': ['::'], 'health': 'HEALTHY',
+            'mac_address': ':'.join('{:02X}'.format(number >> shift & 0xff)
+                                    for shift in range(0, 48, 8)),
+            'serial_number': 'SYN{:017d}'.format(index), 'status': _STATUSES[number % 5],
+            'model': 'HPE Composable Fabric FM 3032Q', 'hw_revision': 'CEL_SEASTONE',
+            'sw_version': '5.1.0-94', 'configuration_number': number % 100,
+            'operational_stage': 'S3P'}
+        if ports:
+            record['ports'] = list(self.ports_of(index))
+        return record
+
+    def switches(self, ports=False):
+        """
+        Generate the switch records.
+
+        :param ports: bool embed the ports of every switch
+        """
+        for index in range(self.switch_count):
+            yield self.switch(index, ports)
+
+    def switch_position(self, switch_uuid):
+        """
+        :param switch_uuid: str UUID of a generated switch
+        :return: int position of the switch, None if it is not one of the switches
+        """
+        if self._switch_index is None:
+            self._switch_index = {self._uuid('switch', index): index
+                                  for index in range(self.switch_count)}
+        return self._switch_index.get(switch_uuid)
+
+    def port(self, switch, number):
+        """
+        :param switch: int position of the switch of the port
+        :param number: int position of the port on the switch
+        :return: dict port record
+        :rtype: dict
+        """
+        value = self._number('port', switch * self.ports_per_switch + number)
+        cage, lane = number // _LANES + 1, number % _LANES + 1
+        first = number - number % _LANES
+        uplink = number >= self.ports_per_switch - _LANES
+        group_uuids = []
+        if number < 2 * self.lags_per_switch:
+            group = self._group_of(switch * self.lags_per_switch + number // 2)
+            if group is not None:
+                group_uuids.append(self._uuid('vlan_group', group))
+        up = value % 4 != 0
+        return {
+            'uuid': self._uuid('port', switch * self.ports_per_switch + number),
+            'name': '', 'description': '', 'port_label': '{}.{}'.format(cage, lane),
+            'silkscreen': str(cage), 'switch_uuid': self._uuid('switch', switch),
+            'switch_name': 'switch-{}'.format(switch + 1),
+            'type': 'internal' if uplink else 'access', 'is_uplink': uplink,
+            'downlink_switch_uuid': None, 'admin_state': 'enabled' if up else 'disabled',
+            'link_state': 'up' if up else 'down', 'default_state': not up,
+            'native_vlan': 1 + value % 10, 'vlans': '{}-{}'.format(
+                100 + value % 50, 100 + value % 50 + value % 20),
+            'ungrouped_vlans': '', 'vlan_group_uuids': group_uuids,
+            'speed': {'current': 25000, 'permitted': [25000]},
+            'speed_group': [self._uuid('port', switch * self.ports_per_switch + member)
+                            for member in range(first, min(first + _LANES,
+                                                           self.ports_per_switch))],
+            'form_factor': 'qsfp', 'qsfp_mode': 'qsfp_4x25_gbps',
+            'permitted_qsfp_modes': ['qsfp_4x25_gbps'], 'fec': 'disabled', 'fec_mode': 'CL74',
+            'holddown': ['not_applicable'], 'port_security_enabled': False, 'read_only': False,
+            'bridge_loop_detection': {'interval': 1000, 'mode': 'disabled'}}
+
+    def ports_of(self, switch):
+        """
+        Generate the port records of one switch.
+
+        :param switch: int position of the switch
+        """
+        for number in range(self.ports_per_switch):
+            yield self.port(switch, number)
+
+    def ports(self, switch_uuid=None):
+        """
+        Generate the port records.
+
+        :param switch_uuid: str UUID of a switch to only generate its ports
+        """
+        if switch_uuid is not None:
+            switch = self.switch_position(switch_uuid)
+            switches = [switch] if switch is not None else []
+        else:
+            switches = range(self.switch_count)
+        for switch in switches:
+            for port in self.ports_of(switch):
+                yield port
+
+    def lags(self):
+        """Generate the LAG records, each made of two consecutive ports of a switch."""
+        for index in range(self.switch_count * self.lags_per_switch):
+            switch, position = divmod(index, self.lags_per_switch)
+            first = switch * self.ports_per_switch + position * 2
+            group = self._group_of(index)
+            yield {
+                'uuid': self._uuid('lag', index), 'name': 'lag-{}'.format(index + 1),
+                'description': '', 'type': 'provisioned', 'native_vlan': 1,
+                'vlans': '', 'ungrouped_vlans': '',
+                'vlan_group_uuids': ([self._uuid('vlan_group', group)]
+                                     if group is not None else []),
+                'port_properties': [{
+                    'port_uuids': [self._uuid('port', first), self._uuid('port', first + 1)],
+                    'lacp': {'mode': 'active', 'intervals': {'slow': 30, 'fast': 1}},
+                    'speed': {'current': 25000}}]}
+
+    def vlan_groups(self):
+        """Generate the VLAN group records."""
+        lag_count = self.switch_count * self.lags_per_switch
+        for index in range(self.vlan_group_count):
+            yield {
+                'uuid': self._uuid('vlan_group', index), 'name': 'vlan-group-{}'.format(index + 1),
+                'description': 'Synthetic VLAN group {}'.format(index + 1),
+                'vlans': '{}-{}'.format(1000 + index * 10, 1000 + index * 10 + 9),
+                'lag_uuids': [self._uuid('lag', lag)
+                              for lag in range(index, lag_count, self.vlan_group_count)]}
+
+    def audit(self, index):
+        """
+        :param index: int age of the audit entry, 0 for the oldest
+        :return: dict audit entry about a switch changing state
+        :rtype: dict
+        """
+        value = self._number('audit', index)
+        switch = value % self.switch_count if self.switch_count else 0
+        status = _STATUSES[value % 5]
+        return {
+            'uuid': self._uuid('audit', index), 'record_type': 'EVENT',
+            'stream_id': 'fabric_events', 'log_date': 1579629760628 + index * 1000,
+            'severity': _SEVERITIES[value % 5],
+            'description': 'Switch switch-{} state changed from SYNCING to {}'.format(
+                switch + 1, status),
+            'data': {'object_type': 'Switch', 'object_name': 'switch-{}'.format(switch + 1),
+                     'event_type': 'ObjectModified',
+                     'event_object': {'uuid': self._uuid('switch', switch),
+                                      'status': status, 'previous_status': 'SYNCING'}}}
+
+    def audit_index(self, audit_uuid):
+        """
+        :param audit_uuid: str UUID of a generated audit entry
+        :return: int age of the audit entry, 0 for the oldest, None if it is not one of them
+        """
+        if self._audit_index is None:
+            self._audit_index = {self._uuid('audit', index): index
+                                 for index in range(self.audit_count)}
+        return self._audit_index.get(audit_uuid)
+
+    def audits(self):
+        """Generate the audit log entries, newest first as v1/audits returns them."""
+        for index in reversed(range(self.audit_count)):
+            yield self.audit(index)
+
+
+def iter_body(records, count, page=None):
+    """
+    Encode records as a CFM response body, piece by piece.
+
+    :param records: iterable of dicts
+    :param count: int number of records, reported in the body
+    :param page: dict of page links, e.g. {'next_page': ..., 'prev_page': ...}, added to the
+    body as v1/audits does
+    :return: generator of bytes which joined form {"count": ..., "result": [...], "time": ...}
+    """
+    yield '{{"count": {}, "result": ['.format(count).encode('utf-8')
+    separator = b''
+    for record in records:
+        yield separator + json.dumps(record, separators=(',', ':')).encode('utf-8')
+        separator = b','
+    yield b']'
+    if page is not None:
+        yield b', "page": ' + json.dumps(page).encode('utf-8')
+    yield b', "time": "1.000mS"}'
+
+
+def write_fixtures(synthetic, directory):
+    """
+    Write every collection to <directory>/<collection>.json as a CFM response body.
+
+    Records are written as they are generated, so memory use does not depend on the size of
+    the fabric. switches_ports.json holds the switches with their ports embedded.
+
+    :param synthetic: SyntheticFabric
+    :param directory: str directory, created if missing
+    :return: dict mapping file names to their number of records
+    :rtype: dict
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    counts = synthetic.counts()
+    outputs = [(name, synthetic.collection(name), counts[name]) for name in COLLECTIONS]
+    outputs.append(('switches_ports', synthetic.switches(ports=True), counts['switches']))
+    written = {}
+    for name, records, count in outputs:
+        with open(os.path.join(directory, name + '.json'), 'wb') as output:
+            for chunk in iter_body(records, count):
+                output.write(chunk)
+        written[name + '.json'] = count
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic CFM API fixtures to disk.')
+    parser.add_argument('--fabrics', type=int, default=1)
+    parser.add_argument('--switches', type=int, default=16)
+    parser.add_argument('--ports-per-switch', type=int, default=48)
+    parser.add_argument('--lags-per-switch', type=int, default=2)
+    parser.add_argument('--vlan-groups', type=int, default=8)
+    parser.add_argument('--audits', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help='directory of the fixture files')
+    args = parser.parse_args()
+
+    synthetic = SyntheticFabric(args.fabrics, args.switches, args.ports_per_switch,
+                                args.lags_per_switch, args.vlan_groups, args.audits, args.seed)
+    for name, count in sorted(write_fixtures(synthetic, args.out).items()):
+        print('{:<24} {:>10} records'.format(name, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing the asyncio client and helpers in pyhpecfm.aio.
+"""
+
+import asyncio
+import json
+from unittest import TestCase, skipIf
+from unittest import mock
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pyhpecfm import hooks
+from pyhpecfm.aio import client
+from pyhpecfm.aio import fabric
+from pyhpecfm.aio import system
+
+
+def run(coroutine):
+    """Run a coroutine to completion on a private event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def make_response(result, status=200, path='v1/test'):
+    """Build an AsyncCFMResponse holding a CFM style JSON body."""
+    body = json.dumps({'count': 1, 'result': result, 'time': '1.0mS'}).encode('utf-8')
+    return client.AsyncCFMResponse('GET', 'https://cfmtest.local/api/' + path, status, 'OK', {},
+                                   body)
+
+
+async def no_sleep(delay):
+    """Stand-in for asyncio.sleep that returns immediately."""
+
+
+def make_error(status):
+    """Build the aiohttp exception raised for an HTTP error status."""
+    return aiohttp.ClientResponseError(mock.Mock(), (), status=status, message='error')
+
+
+@skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncCFMClient(TestCase):
+    """
+    Test case for pyhpecfm.aio.client.AsyncCFMClient
+    """
+
+    def setUp(self):
+        self.cfm = client.AsyncCFMClient('cfmtest.local', 'admin', 'plexxi')
+        self.calls = []
+
+    def fake_process(self, *responses):
+        """Replace _process_request with a coroutine returning or raising each item in turn."""
+        queue = list(responses)
+
+        async def process_request(session, method, path, params, headers, json, timeout=None,
+                                  verify=False):
+            self.calls.append((method, path, params, dict(headers)))
+            item = queue.pop(0)
+            if isinstance(item, Exception):
+                raise item
+            return item
+
+        self.cfm._process_request = process_request
+
+    def test_encode_params(self):
+        """
+        Query parameters are rendered the same way requests renders them.
+        """
+        self.assertIsNone(client._encode_params(None))
+        self.assertEqual(client._encode_params({'ports': True, 'fabric': None, 'a': [1, 2]}),
+                         [('ports', 'True'), ('a', '1'), ('a', '2')])
+
+    def test_connect_sets_token(self):
+        """
+        connect() logs in and uses the returned bearer token on later calls.
+        """
+        self.fake_process(make_response('token1'), make_response([{'uuid': 'sw1'}]))
+
+        async def scenario():
+            await self.cfm.connect()
+            try:
+                return await fabric.get_switches(self.cfm, params={'ports': True})
+            finally:
+                await self.cfm.disconnect()
+
+        switches = run(scenario())
+        self.assertEqual(switches, [{'uuid': 'sw1'}])
+        login, request = self.calls
+        self.assertEqual(login[1], 'v1/auth/token')
+        self.assertEqual(login[3]['X-Auth-Username'], 'admin')
+        self.assertEqual(request[3]['Authorization'], 'Bearer token1')
+
+    def test_reconnect_on_401(self):
+        """
+        A 401 triggers a new login and the request is retried with the new token.
+        """
+        self.fake_process(make_response('token1'), make_error(401), make_response('token2'),
+                          make_response({'current': '5.1'}))
+
+        async def scenario():
+            await self.cfm.connect()
+            try:
+                return await system.get_versions(self.cfm)
+            finally:
+                await self.cfm.disconnect()
+
+        self.assertEqual(run(scenario()), {'current': '5.1'})
+        self.assertEqual(self.calls[-1][3]['Authorization'], 'Bearer token2')
+
+    def test_retry_on_503(self):
+        """
+        A 503 is retried after a pause and re-raised once retries are exhausted.
+        """
+        self.fake_process(make_response('token1'), make_error(503), make_error(503),
+                          make_error(503))
+
+        async def scenario():
+            await self.cfm.connect()
+            try:
+                with mock.patch('asyncio.sleep', no_sleep):
+                    return await system.get_audit_logs(self.cfm)
+            finally:
+                await self.cfm.disconnect()
+
+        with self.assertRaises(aiohttp.ClientResponseError):
+            run(scenario())
+        self.assertEqual(len(self.calls), 4)
+
+    def test_request_hooks(self):
+        """
+        Every attempt is reported to the request hooks, including 401 re-authentications.
+        """
+        events = []
+        self.cfm.add_hook(events.append)
+        self.fake_process(make_response('token1'), make_error(401), make_response('token2'),
+                          make_response({'current': '5.1'}))
+
+        async def scenario():
+            await self.cfm.connect()
+            try:
+                return await system.get_versions(self.cfm)
+            finally:
+                await self.cfm.disconnect()
+
+        run(scenario())
+        self.assertEqual([(event.path, event.status, event.retry_reason) for event in events],
+                         [('v1/auth/token', 200, None), ('versions', 401, hooks.RETRY_REAUTH),
+                          ('v1/auth/token', 200, None), ('versions', 200, None)])
+        self.assertEqual(events[-1].bytes_received, len(make_response({'current': '5.1'}).content))
+
+    def test_concurrent_calls(self):
+        """
+        Helper coroutines can be gathered on a single client.
+        """
+        self.fake_process(make_response('token1'), make_response([{'uuid': 'f1'}]),
+                          make_response([{'uuid': 'vg1'}]))
+
+        async def scenario():
+            await self.cfm.connect()
+            try:
+                return await asyncio.gather(fabric.get_fabrics(self.cfm),
+                                            fabric.get_vlan_groups(self.cfm))
+            finally:
+                await self.cfm.disconnect()
+
+        fabrics, vlan_groups = run(scenario())
+        self.assertEqual(fabrics, [{'uuid': 'f1'}])
+        self.assertEqual(vlan_groups, [{'uuid': 'vg1'}])
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.archive.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest import mock
+
+from pyhpecfm import archive
+
+
+class TestArchive(TestCase):
+    """
+    Test case for pyhpecfm.archive
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cfm.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        """
+        Collections are written from iterables and read back by position, slice and iteration.
+        """
+        ports = ({'uuid': 'p{}'.format(index), 'native_vlan': index % 4, 'name': 'é'}
+                 for index in range(500))
+        archive.write_archive(self.path, [('ports', ports), ('lags', []), ('users', None)],
+                              metadata={'host': 'cfm.local'})
+        with archive.open_archive(self.path) as snapshot:
+            self.assertEqual(snapshot.collections, ['ports', 'lags', 'users'])
+            self.assertEqual(snapshot.counts(), {'ports': 500, 'lags': 0, 'users': 0})
+            self.assertEqual(snapshot.metadata, {'host': 'cfm.local'})
+            records = snapshot['ports']
+            self.assertEqual(records[0], {'uuid': 'p0', 'native_vlan': 0, 'name': 'é'})
+            self.assertEqual(records[-1]['uuid'], 'p499')
+            self.assertEqual([record['uuid'] for record in records[10:13]],
+                             ['p10', 'p11', 'p12'])
+            self.assertEqual(sum(1 for _ in records), 500)
+            self.assertEqual(list(snapshot['lags']), [])
+            self.assertNotIn('switches', snapshot)
+            with self.assertRaises(IndexError):
+                records[500]
+
+    def test_lazy_decoding(self):
+        """
+        Opening an archive decodes no record, and each access decodes only its record.
+        """
+        archive.write_archive(self.path, {'ports': [{'uuid': 'p{}'.format(index)}
+                                                    for index in range(100)]})
+        with mock.patch('json.loads', wraps=archive.json.loads) as loads:
+            with archive.open_archive(self.path) as snapshot:
+                self.assertEqual(loads.call_count, 1)
+                self.assertEqual(snapshot['ports'][42], {'uuid': 'p42'})
+                self.assertEqual(loads.call_count, 2)
+
+    def test_save_snapshot(self):
+        """
+        save_snapshot reads every collection through the fabric and system helpers.
+        """
+        patches = {
+            'pyhpecfm.fabric.get_fabrics': [{'uuid': 'fab1'}],
+            'pyhpecfm.fabric.iter_switches': iter([{'uuid': 'sw1'}]),
+            'pyhpecfm.fabric.iter_ports': iter([{'uuid': 'p1'}, {'uuid': 'p2'}]),
+            'pyhpecfm.fabric.get_lags': [],
+            'pyhpecfm.fabric.get_vlan_groups': [{'uuid': 'vg1'}],
+            'pyhpecfm.system.get_users': [{'uuid': 'u1'}],
+            'pyhpecfm.system.get_backups': [],
+        }
+        with mock.patch.multiple('pyhpecfm.fabric', **{
+                name.rsplit('.', 1)[1]: mock.Mock(return_value=value)
+                for name, value in patches.items() if name.startswith('pyhpecfm.fabric')}), \
+                mock.patch.multiple('pyhpecfm.system', **{
+                    name.rsplit('.', 1)[1]: mock.Mock(return_value=value)
+                    for name, value in patches.items() if name.startswith('pyhpecfm.system')}):
+            archive.save_snapshot(mock.Mock(), self.path)
+        with archive.open_archive(self.path) as snapshot:
+            self.assertEqual(snapshot.counts(), {'fabrics': 1, 'switches': 1, 'ports': 2,
+                                                 'lags': 0, 'vlan_groups': 1, 'users': 1,
+                                                 'backups': 0})
+
+    def test_not_an_archive(self):
+        """
+        Other files are rejected and no temporary file is left behind by a failed write.
+        """
+        with open(self.path, 'wb') as output:
+            output.write(b'\0' * 64)
+        with self.assertRaises(archive.CFMApiError):
+            archive.open_archive(self.path)
+
+        def failing():
+            yield {'uuid': 'p1'}
+            raise ValueError('connection lost')
+
+        with self.assertRaises(ValueError):
+            archive.write_archive(self.path, {'ports': failing()})
+        self.assertEqual(os.listdir(self.directory), ['cfm.snapshot'])
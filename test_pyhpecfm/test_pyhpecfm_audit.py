@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.audit.
+"""
+
+import datetime
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from unittest import mock
+
+from pyhpecfm import audit
+
+
+class FakeAuditClient(object):
+    """
+    Stand-in for CFMClient serving v1/audits with the CFM paging scheme.
+
+    Records are kept newest first. 'before=<uuid>' returns the records older than uuid and
+    'after=<uuid>' the records newer than uuid, page_size at a time.
+    """
+
+    def __init__(self, count):
+        self.records = [self.record(index) for index in reversed(range(count))]
+        self.calls = []
+
+    @staticmethod
+    def record(index):
+        return {'uuid': 'a{:05d}'.format(index), 'log_date': 1000 * index,
+                'record_type': 'EVENT', 'description': 'event {}'.format(index)}
+
+    def add(self, count):
+        start = len(self.records)
+        self.records[:0] = [self.record(index) for index in reversed(range(start, start + count))]
+
+    def get(self, path, params=None):
+        self.calls.append(dict(params or {}))
+        uuids = [record['uuid'] for record in self.records]
+        size = int(params.get('page_size', 1000))
+        if 'before' in params:
+            start = uuids.index(params['before']) + 1
+            page = self.records[start:start + size]
+        elif 'after' in params:
+            end = uuids.index(params['after'])
+            page = self.records[max(end - size, 0):end]
+        else:
+            page = self.records[:size]
+        body = {'count': len(page), 'result': page, 'page': {}}
+        if page:
+            body['page'] = {
+                'next_page': '/api/v1/audits?page_size={}&before={}'.format(size,
+                                                                            page[-1]['uuid']),
+                'prev_page': '/api/v1/audits?page_size={}&after={}'.format(size,
+                                                                           page[0]['uuid']),
+            }
+        return mock.Mock(json=mock.Mock(return_value=body))
+
+
+class TestReadAuditLogs(TestCase):
+    """
+    Test case for pyhpecfm.audit.read_audit_logs
+    """
+
+    def test_walks_pages_lazily(self):
+        """
+        Pages are requested only as records are consumed.
+        """
+        cfm = FakeAuditClient(25)
+        records = audit.read_audit_logs(cfm, page_size=10)
+        first = [next(records) for _ in range(10)]
+        self.assertEqual(len(cfm.calls), 1)
+        rest = list(records)
+        self.assertEqual([record['log_date'] for record in first + rest],
+                         [1000 * index for index in reversed(range(25))])
+        self.assertEqual(len(cfm.calls), 4)
+
+    def test_window_and_limit(self):
+        """
+        Records outside [since, until) are skipped and the walk stops below since.
+        """
+        cfm = FakeAuditClient(100)
+        records = list(audit.read_audit_logs(cfm, since=40000, until=60000, page_size=10))
+        self.assertEqual([record['log_date'] for record in records],
+                         [1000 * index for index in reversed(range(40, 60))])
+        self.assertEqual(len(cfm.calls), 7)
+        self.assertEqual(len(list(audit.read_audit_logs(cfm, limit=15, page_size=10))), 15)
+
+    def test_datetime_window(self):
+        """
+        Datetimes are converted to log_date milliseconds.
+        """
+        since = datetime.datetime(1970, 1, 1, 0, 0, 5)
+        self.assertEqual(audit.to_log_date(since), 5000)
+        cfm = FakeAuditClient(10)
+        self.assertEqual(len(list(audit.read_audit_logs(cfm, since=since))), 5)
+
+    def test_resume_from_cursor(self):
+        """
+        A saved cursor resumes with only the records added since the previous run.
+        """
+        cfm = FakeAuditClient(30)
+        cursor = audit.AuditLogCursor()
+        self.assertEqual(len(list(audit.read_audit_logs(cfm, cursor=cursor, page_size=10))), 30)
+        self.assertEqual(cursor.to_dict(), {'after': 'a00029', 'log_date': 29000})
+
+        cfm.add(25)
+        cursor = audit.AuditLogCursor.from_dict(cursor.to_dict())
+        new_records = list(audit.read_audit_logs(cfm, cursor=cursor, page_size=10))
+        self.assertEqual(sorted(record['log_date'] for record in new_records),
+                         [1000 * index for index in range(30, 55)])
+        self.assertEqual(cursor.after, 'a00054')
+        self.assertEqual(list(audit.read_audit_logs(cfm, cursor=cursor, page_size=10)), [])
+
+    def test_resume_from_cursor_with_limit(self):
+        """
+        Stopping partway through a page leaves the records not yielded for the next run.
+        """
+        cfm = FakeAuditClient(30)
+        cursor = audit.AuditLogCursor()
+        list(audit.read_audit_logs(cfm, cursor=cursor, page_size=10))
+        cfm.add(25)
+
+        first = list(audit.read_audit_logs(cfm, limit=5, cursor=cursor, page_size=10))
+        self.assertEqual([record['uuid'] for record in first],
+                         ['a{:05d}'.format(index) for index in range(30, 35)])
+        self.assertEqual(cursor.after, 'a00034')
+        rest = list(audit.read_audit_logs(cfm, cursor=cursor, page_size=10))
+        self.assertEqual([record['log_date'] for record in first + rest],
+                         [1000 * index for index in range(30, 55)])
+
+
+class TestAuditLogTailer(TestCase):
+    """
+    Test case for pyhpecfm.audit.AuditLogTailer
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.directory, 'audit.state')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_start_at_end_then_emit_new(self):
+        """
+        The first poll only marks the end of the log, later polls emit new records in order.
+        """
+        cfm = FakeAuditClient(50)
+        events = queue.Queue()
+        tailer = audit.AuditLogTailer(cfm, self.state_file, queue=events, page_size=10)
+        self.assertEqual(tailer.poll(), [])
+        self.assertEqual(tailer.cursor.after, 'a00049')
+        cfm.add(3)
+        self.assertEqual([record['uuid'] for record in tailer.poll()],
+                         ['a00050', 'a00051', 'a00052'])
+        self.assertEqual(events.qsize(), 3)
+        self.assertEqual(tailer.poll(), [])
+        self.assertEqual(cfm.calls[-1], {'page_size': 10, 'after': 'a00052'})
+
+    def test_state_survives_restart(self):
+        """
+        A new tailer resumes from the state file without re-emitting records.
+        """
+        cfm = FakeAuditClient(5)
+        emitted = []
+        tailer = audit.AuditLogTailer(cfm, self.state_file, callback=emitted.append,
+                                      start_at_end=False)
+        self.assertEqual(len(tailer.poll()), 5)
+        cfm.add(2)
+        tailer = audit.AuditLogTailer(cfm, self.state_file, callback=emitted.append)
+        self.assertEqual(len(tailer.poll()), 2)
+        self.assertEqual(len(emitted), 7)
+        with open(self.state_file) as state_file:
+            state = json.load(state_file)
+        self.assertEqual(state['cursor'], {'after': 'a00006', 'log_date': 6000})
+
+    def test_duplicates_dropped(self):
+        """
+        Records delivered again by the CFM are emitted only once.
+        """
+        cfm = FakeAuditClient(3)
+        tailer = audit.AuditLogTailer(cfm, self.state_file, start_at_end=False)
+        self.assertEqual(len(tailer.poll()), 3)
+        tailer._cursor = audit.AuditLogCursor()
+        self.assertEqual(tailer.poll(), [])
+
+    def test_run_until_stopped(self):
+        """
+        run() polls until the stop event is set.
+        """
+        cfm = FakeAuditClient(1)
+        stop = threading.Event()
+        tailer = audit.AuditLogTailer(cfm, self.state_file, callback=lambda record: stop.set(),
+                                      start_at_end=False)
+        tailer.run(interval=0, stop_event=stop)
+        self.assertTrue(stop.is_set())
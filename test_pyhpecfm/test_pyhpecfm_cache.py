@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.cache and its use by pyhpecfm.client.CFMClient.
+"""
+
+import time
+from unittest import TestCase
+from unittest import mock
+
+import requests
+
+from pyhpecfm import cache
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import system
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+def make_response(content):
+    """Build a requests.Response with the given body."""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+
+class TestResponseCache(TestCase):
+    """
+    Test case for pyhpecfm.cache.ResponseCache
+    """
+
+    def test_key_normalizes_params(self):
+        """
+        Parameters in the path and in params produce the same key regardless of order.
+        """
+        key = cache.ResponseCache.key
+        self.assertEqual(key('v1/ports?switches=a&type=access'),
+                         key('v1/ports', {'type': 'access', 'switches': 'a'}))
+        self.assertEqual(key('v1/switches', {'ports': True, 'fabric': None}),
+                         key('v1/switches?ports=True'))
+        self.assertNotEqual(key('v1/switches'), key('v1/switches', {'ports': True}))
+
+    def test_resource_family(self):
+        """
+        Paths are grouped by API version and collection.
+        """
+        self.assertEqual(cache.resource_family('v1/users/1234'), 'v1/users')
+        self.assertEqual(cache.resource_family('v1/ports?switches=a'), 'v1/ports')
+        self.assertEqual(cache.resource_family('versions'), 'versions')
+
+    def test_ttl_expiry(self):
+        """
+        Entries expire after the TTL of the longest matching prefix.
+        """
+        response_cache = cache.ResponseCache(ttl=30, ttls={'v1/switches': 5, 'v1/audits': 0})
+        self.assertEqual(response_cache.ttl_for('v1/switches'), 5)
+        self.assertEqual(response_cache.ttl_for('v1/fabrics/abc'), 30)
+        with mock.patch('time.monotonic', return_value=100.0):
+            response_cache.put(('v1/switches', ()), make_response(b'[]'))
+            response_cache.put(('v1/audits', ()), make_response(b'[]'))
+        self.assertEqual(len(response_cache), 1)
+        with mock.patch('time.monotonic', return_value=104.0):
+            self.assertIsNotNone(response_cache.get(('v1/switches', ())))
+        with mock.patch('time.monotonic', return_value=105.0):
+            self.assertIsNone(response_cache.get(('v1/switches', ())))
+        self.assertEqual(response_cache.stats()['hits'], 1)
+        self.assertEqual(response_cache.stats()['misses'], 1)
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        """
+        Least recently used entries are evicted first when either budget is exceeded.
+        """
+        response_cache = cache.ResponseCache(max_entries=2, max_bytes=10)
+        response_cache.put(('a', ()), make_response(b'1234'))
+        response_cache.put(('b', ()), make_response(b'1234'))
+        response_cache.get(('a', ()))
+        response_cache.put(('c', ()), make_response(b'12'))
+        self.assertIsNone(response_cache.get(('b', ())))
+        self.assertIsNotNone(response_cache.get(('a', ())))
+        response_cache.put(('d', ()), make_response(b'12345678'))
+        self.assertEqual(len(response_cache), 1)
+        self.assertEqual(response_cache.stats()['bytes'], 8)
+        self.assertEqual(response_cache.stats()['evictions'], 3)
+
+
+class TestClientCache(TestCase):
+    """
+    Test case for the response cache of pyhpecfm.client.CFMClient
+    """
+
+    def setUp(self):
+        self.server = LocalCFMServer({
+            ('GET', 'v1/switches'): [{'uuid': 'sw1'}],
+            ('GET', 'versions'): {'current': '5.1'},
+            ('GET', 'v1/users'): [{'uuid': 'u1', 'username': 'test_user'}],
+            ('DELETE', 'v1/users/u1'): 'ok',
+        })
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi',
+                                    cache=cache.ResponseCache(ttl=60))
+        self.cfm.connect()
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def count(self, method, path):
+        return len([request for request in self.server.requests
+                    if request.method == method and request.path == path])
+
+    def test_repeated_gets_hit_cache(self):
+        """
+        Identical GETs are answered from the cache, different params are not.
+        """
+        for _ in range(3):
+            self.assertEqual(fabric.get_switches(self.cfm), [{'uuid': 'sw1'}])
+            self.assertEqual(system.get_versions(self.cfm), {'current': '5.1'})
+        fabric.get_switches(self.cfm, params={'ports': True})
+        self.assertEqual(self.count('GET', 'v1/switches'), 2)
+        self.assertEqual(self.count('GET', 'versions'), 1)
+        self.assertEqual(self.cfm.cache.stats()['hits'], 4)
+
+    def test_modification_invalidates_family(self):
+        """
+        A DELETE to a user drops the cached user lookups but keeps other families.
+        """
+        system.get_users(self.cfm, params={'username': 'test_user'})
+        fabric.get_switches(self.cfm)
+        system.delete_local_user(self.cfm, 'test_user')
+        system.get_users(self.cfm, params={'username': 'test_user'})
+        fabric.get_switches(self.cfm)
+        self.assertEqual(self.count('GET', 'v1/users'), 2)
+        self.assertEqual(self.count('GET', 'v1/switches'), 1)
+
+
+class TestConditionalGet(TestCase):
+    """
+    Test case for ETag and Last-Modified revalidation in pyhpecfm.client.CFMClient
+    """
+
+    def setUp(self):
+        self.version = {'etag': '"v1"'}
+
+        def switches(request):
+            etag = self.version['etag']
+            headers = {'ETag': etag, 'Last-Modified': 'Tue, 25 Feb 2020 20:36:25 GMT'}
+            if request.headers.get('If-None-Match') == etag:
+                return 304, headers, b''
+            return 200, headers, cfm_body([{'uuid': 'sw1', 'etag': etag}])
+
+        self.server = LocalCFMServer({('GET', 'v1/switches'): switches})
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi',
+                                    cache=cache.ResponseCache(ttl=0.01))
+        self.cfm.connect()
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_not_modified_returns_cached_body(self):
+        """
+        An expired entry is revalidated and a 304 returns the cached, already decoded body.
+        """
+        first = fabric.get_switches(self.cfm, params={'ports': True})
+        time.sleep(0.02)
+        second = fabric.get_switches(self.cfm, params={'ports': True})
+        self.assertIs(first, second)
+        request = self.server.requests[-1]
+        self.assertEqual(request.headers['If-None-Match'], '"v1"')
+        self.assertEqual(request.headers['If-Modified-Since'], 'Tue, 25 Feb 2020 20:36:25 GMT')
+        self.assertEqual(self.cfm.cache.stats()['revalidations'], 1)
+
+    def test_modified_replaces_entry(self):
+        """
+        A changed resource is downloaded again and replaces the cached copy.
+        """
+        fabric.get_switches(self.cfm)
+        self.version['etag'] = '"v2"'
+        time.sleep(0.02)
+        self.assertEqual(fabric.get_switches(self.cfm), [{'uuid': 'sw1', 'etag': '"v2"'}])
+        key = cache.ResponseCache.key('v1/switches')
+        self.assertEqual(self.cfm.cache.conditional_headers(key),
+                         {'If-None-Match': '"v2"',
+                          'If-Modified-Since': 'Tue, 25 Feb 2020 20:36:25 GMT'})
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.client.CFMClient against a local HTTPS server.
+"""
+
+import itertools
+import threading
+import time
+from unittest import TestCase
+from unittest import mock
+
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import hooks
+from pyhpecfm import retry
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+class TestConnectionPooling(TestCase):
+    """
+    Test case for the pooled session of pyhpecfm.client.CFMClient
+    """
+
+    def setUp(self):
+        self.server = LocalCFMServer({('GET', 'v1/switches'): [{'uuid': 'sw1'}]})
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi', pool_maxsize=4)
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_session_reused_across_calls(self):
+        """
+        Login and subsequent calls share one keep-alive connection.
+        """
+        self.cfm.connect()
+        for _ in range(5):
+            self.assertEqual(fabric.get_switches(self.cfm), [{'uuid': 'sw1'}])
+        stats = self.cfm.connection_stats()
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_session_kept_on_reconnect(self):
+        """
+        Reconnecting renews the token without replacing the session.
+        """
+        self.cfm.connect()
+        session = self.cfm._session
+        self.cfm.connect()
+        self.assertIs(self.cfm._session, session)
+        self.assertEqual(self.server.connections, 1)
+        login = self.server.requests[-1]
+        self.assertEqual(login.headers['X-Auth-Username'], 'admin')
+        fabric.get_switches(self.cfm)
+        self.assertNotIn('X-Auth-Password', self.server.requests[-1].headers)
+
+    def test_stats_survive_disconnect(self):
+        """
+        Counters keep the totals of sessions closed by disconnect().
+        """
+        self.cfm.connect()
+        fabric.get_switches(self.cfm)
+        self.cfm.disconnect()
+        self.cfm.connect()
+        stats = self.cfm.connection_stats()
+        self.assertEqual(stats['connections_opened'], 2)
+        self.assertEqual(stats['requests'], 3)
+
+
+class TestTokenRefresh(TestCase):
+    """
+    Test case for the token lifecycle of pyhpecfm.client.CFMClient
+    """
+
+    def setUp(self):
+        self.tokens = itertools.count(1)
+        self.valid = {'token': None}
+        self.logins = []
+
+        def login(request):
+            time.sleep(0.05)
+            token = 'token-{}'.format(next(self.tokens))
+            self.logins.append(token)
+            self.valid['token'] = token
+            return 200, None, cfm_body(token)
+
+        def switches(request):
+            if request.headers.get('Authorization') != 'Bearer {}'.format(self.valid['token']):
+                return 401, None, cfm_body('Unauthorized')
+            return 200, None, cfm_body([{'uuid': 'sw1'}])
+
+        self.server = LocalCFMServer({('POST', 'v1/auth/token'): login,
+                                      ('GET', 'v1/switches'): switches})
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi', pool_maxsize=16)
+        self.cfm.connect()
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_single_flight_after_expiry(self):
+        """
+        Threads hitting a 401 at once share a single new login.
+        """
+        self.valid['token'] = 'revoked'
+        results = []
+
+        def work():
+            results.append(fabric.get_switches(self.cfm))
+
+        threads = [threading.Thread(target=work) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [[{'uuid': 'sw1'}]] * 16)
+        self.assertEqual(self.logins, ['token-1', 'token-2'])
+        self.assertEqual(self.server.connections, self.cfm.connection_stats()['connections_opened'])
+
+    def test_proactive_refresh(self):
+        """
+        A token close to its expiry is replaced before the call instead of after a 401.
+        """
+        self.assertEqual(fabric.get_switches(self.cfm), [{'uuid': 'sw1'}])
+        expires = time.monotonic() + 1800
+        with mock.patch('time.monotonic', return_value=expires - 30):
+            self.assertEqual(fabric.get_switches(self.cfm), [{'uuid': 'sw1'}])
+        self.assertEqual(self.logins, ['token-1', 'token-2'])
+        paths = [request.path for request in self.server.requests]
+        self.assertEqual(paths, ['v1/auth/token', 'v1/switches', 'v1/auth/token',
+                                 'v1/switches'])
+
+
+class TestRequestHooks(TestCase):
+    """
+    Test case for the request hooks and logging of pyhpecfm.client.CFMClient
+    """
+
+    def setUp(self):
+        self.answers = [503, 200]
+
+        def switches(request):
+            status = self.answers.pop(0)
+            return status, {'Retry-After': '0'}, cfm_body([{'uuid': 'sw1'}] if status == 200
+                                                          else 'Busy')
+
+        self.server = LocalCFMServer({('GET', 'v1/switches'): switches,
+                                      ('PATCH', 'v1/ports'): []})
+        self.server.start()
+        self.events = []
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi',
+                                    retry_policy=retry.RetryPolicy(backoff_base=0.01),
+                                    hooks=[self.events.append])
+        self.cfm.connect()
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_events_per_attempt(self):
+        """
+        Every attempt is reported with its status, sizes, timings and retry reason.
+        """
+        with self.assertLogs('pyhpecfm.client', 'DEBUG') as logs:
+            self.assertEqual(fabric.get_switches(self.cfm), [{'uuid': 'sw1'}])
+
+        login, busy, done = self.events
+        self.assertEqual((login.method, login.path, login.status), ('POST', 'v1/auth/token', 200))
+        self.assertEqual((busy.path, busy.attempt, busy.status), ('v1/switches', 1, 503))
+        self.assertEqual(busy.failure, hooks.FAILURE_STATUS)
+        self.assertEqual(busy.retry_reason, hooks.FAILURE_STATUS)
+        self.assertIsNotNone(busy.retry_delay)
+        self.assertEqual((done.attempt, done.status, done.failure, done.retry_reason),
+                         (2, 200, None, None))
+        self.assertEqual(done.bytes_sent, 0)
+        self.assertEqual(done.bytes_received, len(cfm_body([{'uuid': 'sw1'}])))
+        self.assertLessEqual(done.ttfb, done.latency)
+        self.assertTrue(any('WARNING' in line and 'retrying' in line for line in logs.output))
+
+    def test_hook_errors_and_removal(self):
+        """
+        A failing hook is logged without failing the call, and removed hooks are not called.
+        """
+        def broken(event):
+            raise ValueError('broken')
+
+        self.cfm.add_hook(broken)
+        with self.assertLogs('pyhpecfm.hooks', 'ERROR'):
+            fabric.update_ports(self.cfm, ['p1'], 'native_vlan', 5)
+        self.assertEqual(self.events[-1].bytes_sent, len(self.server.requests[-1].body))
+
+        self.cfm.remove_hook(broken)
+        self.cfm.remove_hook(self.events.append)
+        fabric.get_switches(self.cfm)
+        self.assertEqual(self.events[-1].path, 'v1/ports')
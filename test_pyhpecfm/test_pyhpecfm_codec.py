@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.codec and its use by pyhpecfm.client.CFMClient.
+"""
+
+from unittest import TestCase
+
+from pyhpecfm import client
+from pyhpecfm import codec
+from pyhpecfm import fabric
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+class CountingCodec(codec.StdlibCodec):
+    """Stdlib codec recording what it encodes and decodes."""
+
+    name = 'counting'
+
+    def __init__(self):
+        self.encoded = []
+        self.decoded = []
+
+    def dumps(self, obj):
+        self.encoded.append(obj)
+        return super(CountingCodec, self).dumps(obj)
+
+    def loads(self, data):
+        self.decoded.append(data)
+        return super(CountingCodec, self).loads(data)
+
+
+class TestGetCodec(TestCase):
+    """
+    Test case for pyhpecfm.codec.get_codec
+    """
+
+    def test_resolution(self):
+        """
+        Names resolve to codecs, 'auto' to the fastest installed and objects pass through.
+        """
+        self.assertEqual(codec.get_codec('stdlib').name, 'stdlib')
+        self.assertEqual(codec.get_codec().name, codec.available_codecs()[0])
+        self.assertIn('stdlib', codec.available_codecs())
+        custom = CountingCodec()
+        self.assertIs(codec.get_codec(custom), custom)
+        with self.assertRaises(client.CFMApiError):
+            codec.get_codec('yaml')
+
+    def test_codecs_round_trip(self):
+        """
+        Every installed codec encodes to bytes and decodes bytes to the same document.
+        """
+        document = {'result': [{'uuid': 'é', 'vlans': '1-3', 'speed': {'current': 25000},
+                                'ratio': 0.5, 'is_uplink': False, 'description': None}]}
+        for name in codec.available_codecs():
+            json_codec = codec.get_codec(name)
+            encoded = json_codec.dumps(document)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json_codec.loads(encoded), document)
+            self.assertEqual(codec.StdlibCodec.loads(encoded), document)
+
+
+class TestClientCodec(TestCase):
+    """
+    Test case for the codec of pyhpecfm.client.CFMClient
+    """
+
+    def test_bodies_use_codec(self):
+        """
+        Request bodies are encoded and response bodies decoded by the codec of the client.
+        """
+        def patch(request):
+            return 200, None, cfm_body(request.json())
+
+        routes = {('GET', 'v1/switches'): [{'uuid': 'sw1', 'name': 'é'}],
+                  ('PATCH', 'v1/ports'): patch}
+        json_codec = CountingCodec()
+        with LocalCFMServer(routes) as server:
+            cfm = client.CFMClient(server.host, 'admin', 'plexxi', codec=json_codec)
+            cfm.connect()
+            self.assertEqual(fabric.get_switches(cfm), [{'uuid': 'sw1', 'name': 'é'}])
+            response = fabric.update_ports(cfm, ['p1'], 'native_vlan', 10)
+            cfm.disconnect()
+
+        self.assertEqual(response.json()['result'][0]['uuids'], ['p1'])
+        self.assertEqual(len(json_codec.encoded), 1)
+        self.assertTrue(all(isinstance(data, bytes) for data in json_codec.decoded))
+        self.assertEqual(len(json_codec.decoded), 3)
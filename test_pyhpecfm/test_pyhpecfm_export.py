@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.export.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest import mock
+from unittest import skipIf
+
+from pyhpecfm import export
+
+from test_pyhpecfm_inventory import cassette_results
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestBuildTable(TestCase):
+    """
+    Test case for pyhpecfm.export.build_table
+    """
+
+    def setUp(self):
+        switches = cassette_results('test_get_switches_single_param', 'v1/switches')
+        self.ports = [port for switch in switches for port in switch['ports']]
+
+    def test_round_trip(self):
+        """
+        Every port decodes back to its original dict, with strings dictionary encoded.
+        """
+        table = export.build_table(self.ports)
+        self.assertEqual(len(table), len(self.ports))
+        self.assertEqual(list(table.rows()),
+                         [{name: port.get(name) for name in table.columns} for port in self.ports])
+        self.assertEqual(table['switch_uuid'].kind, 'str')
+        self.assertEqual(len(table['switch_uuid'].dictionary),
+                         len({port['switch_uuid'] for port in self.ports}))
+        self.assertEqual(table['native_vlan'].kind, 'int')
+        self.assertEqual(table['admin_state'].kind, 'str')
+        self.assertEqual(table['speed'].kind, 'json')
+
+    def test_columns_and_widening(self):
+        """
+        Selected columns are kept, missing values are null and mixed kinds are widened.
+        """
+        records = [{'a': 1, 'b': 'x'}, {'a': 2.5, 'c': True}, {'a': None, 'b': 3},
+                   {'b': None, 'd': [1]}]
+        table = export.build_table(records)
+        self.assertEqual(list(table.columns), ['a', 'b', 'c', 'd'])
+        self.assertEqual(table['a'].kind, 'float')
+        self.assertEqual(table['a'].to_list(), [1.0, 2.5, None, None])
+        self.assertEqual(table['b'].kind, 'json')
+        self.assertEqual(table['b'].to_list(), ['x', None, 3, None])
+        self.assertEqual(table['c'].to_list(), [None, True, None, None])
+        self.assertEqual(table['d'].to_list(), [None, None, None, [1]])
+        table = export.build_table(records, columns=['b', 'e'])
+        self.assertEqual(list(table.columns), ['b', 'e'])
+        self.assertEqual(table['e'].to_list(), [None] * 4)
+
+        # Columns already widened to json take values of any other kind.
+        for records in ([{'a': 1}, {'a': 'x'}, {'a': 2}], [{'a': True}, {'a': 2}, {'a': False}],
+                        [{'a': [1]}, {'a': 'x'}]):
+            column = export.build_table(records)['a']
+            self.assertEqual(column.kind, 'json')
+            self.assertEqual(column.to_list(), [record['a'] for record in records])
+
+    def test_export_ports(self):
+        """
+        export_ports builds the table from the streamed ports.
+        """
+        with mock.patch('pyhpecfm.fabric.iter_ports', return_value=iter(self.ports)) as ports:
+            table = export.export_ports(mock.Mock(), 'sw1', columns=['uuid', 'native_vlan'])
+        ports.assert_called_once_with(mock.ANY, 'sw1')
+        self.assertEqual(table['uuid'].to_list(), [port['uuid'] for port in self.ports])
+
+    @skipIf(numpy is None, 'numpy is not installed')
+    def test_to_numpy(self):
+        """
+        Tables convert to structured arrays holding the codes of string columns.
+        """
+        table = export.build_table(self.ports)
+        result = table.to_numpy()
+        self.assertEqual(result['native_vlan'].tolist(), table['native_vlan'].to_list())
+        self.assertEqual(table['uuid'].dictionary[result['uuid'][0]], self.ports[0]['uuid'])
+
+
+class TestColumnFile(TestCase):
+    """
+    Test case for pyhpecfm.export.write_table and read_table
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'ports.cfmcol')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_and_map(self):
+        """
+        A written table maps back with identical rows and column views into the file.
+        """
+        records = [{'uuid': 'p{}'.format(index), 'native_vlan': index % 4,
+                    'is_uplink': index % 3 == 0, 'speed': {'current': 25000},
+                    'ratio': index / 7.0, 'description': None if index % 2 else 'x'}
+                   for index in range(1000)]
+        export.write_table(export.build_table(records), self.path)
+        with export.read_table(self.path) as table:
+            self.assertIsInstance(table['native_vlan'].values, memoryview)
+            self.assertEqual(table['native_vlan'][5], 1)
+            self.assertEqual(list(table.rows()), records)
+        self.assertLess(os.path.getsize(self.path), len(json.dumps(records)) / 2)
+
+    def test_not_a_column_file(self):
+        """
+        Other files are rejected.
+        """
+        with open(self.path, 'wb') as output:
+            output.write(b'{"count": 0}')
+        with self.assertRaises(export.CFMApiError):
+            export.read_table(self.path)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.fanout, CFMClient.batch and the fan-out and bulk helpers in
+pyhpecfm.fabric and pyhpecfm.system.
+"""
+
+import json
+import threading
+import time
+from unittest import TestCase
+
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import fanout
+from pyhpecfm import system
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+class TestFanOut(TestCase):
+    """
+    Test case for pyhpecfm.fanout.fan_out
+    """
+
+    def test_results_and_errors_keyed(self):
+        """
+        Failures are reported per key without failing the batch.
+        """
+        def func(cfmclient, key):
+            if key == 'bad':
+                raise ValueError(key)
+            return key.upper()
+
+        outcome = fanout.fan_out(None, func, ['a', 'bad', 'b', 'a'], max_workers=2)
+        self.assertEqual(outcome.results, {'a': 'A', 'b': 'B'})
+        self.assertEqual(list(outcome.errors), ['bad'])
+        self.assertIsInstance(outcome.errors['bad'], ValueError)
+        self.assertFalse(outcome.ok)
+
+    def test_workers_bounded_by_pool(self):
+        """
+        No more calls run at once than the client's connection pool can serve.
+        """
+        class Client(object):
+            pool_maxsize = 3
+
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def func(cfmclient, key):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+
+        fanout.fan_out(Client(), func, range(20), max_workers=10)
+        self.assertLessEqual(state['peak'], 3)
+
+
+class TestBatch(TestCase):
+    """
+    Test case for CFMClient.batch and pyhpecfm.fanout.gather
+    """
+
+    def setUp(self):
+        def slow(result):
+            def route(request):
+                time.sleep(0.2)
+                return 200, None, cfm_body(result)
+            return route
+
+        self.server = LocalCFMServer({
+            ('GET', 'versions'): slow([{'name': 'cfm'}]),
+            ('GET', 'v1/backups'): slow([{'uuid': 'b1'}]),
+            ('GET', 'v1/fabrics'): slow([{'uuid': 'f1'}]),
+            ('GET', 'v1/switches'): slow([{'uuid': 's1'}]),
+            ('GET', 'v1/vlan_groups'): slow([{'uuid': 'g1'}])})
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi', pool_maxsize=5)
+        self.cfm.connect()
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_batch_runs_concurrently(self):
+        """
+        Independent calls overlap and their results are returned in the order they were added.
+        """
+        start = time.monotonic()
+        with self.cfm.batch() as batch:
+            versions = batch.add(system.get_versions)
+            batch.add(system.get_backups)
+            batch.add(fabric.get_fabrics)
+            batch.add(fabric.get_switches, params={'ports': True})
+            batch.add(fabric.get_vlan_groups)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(versions.result(), [{'name': 'cfm'}])
+        self.assertEqual([result[0].get('uuid') for result in batch.results()],
+                         [None, 'b1', 'f1', 's1', 'g1'])
+
+    def test_gather(self):
+        """
+        Failed calls raise, or are returned in place with return_exceptions.
+        """
+        def fail(cfmclient):
+            raise ValueError('failed')
+
+        calls = [fabric.get_fabrics, fail, (fabric.get_vlan_groups, None)]
+        with self.assertRaises(ValueError):
+            fanout.gather(self.cfm, calls)
+        fabrics, error, vlan_groups = fanout.gather(self.cfm, calls, return_exceptions=True)
+        self.assertEqual(fabrics, [{'uuid': 'f1'}])
+        self.assertIsInstance(error, ValueError)
+        self.assertEqual(vlan_groups, [{'uuid': 'g1'}])
+
+
+class TestGetPortsForSwitches(TestCase):
+    """
+    Test case for pyhpecfm.fabric.get_ports_for_switches
+    """
+
+    def test_get_ports_for_switches(self):
+        """
+        Ports of every switch are fetched over the shared pool and keyed by switch UUID.
+        """
+        def ports(request):
+            switch_uuid = request.query['switches']
+            if switch_uuid == 'sw3':
+                return 500, None, cfm_body('Internal error')
+            return 200, None, cfm_body([{'uuid': switch_uuid + '-p1',
+                                         'switch_uuid': switch_uuid}])
+
+        with LocalCFMServer({('GET', 'v1/ports'): ports}) as server:
+            cfm = client.CFMClient(server.host, 'admin', 'plexxi', pool_maxsize=2)
+            cfm.connect()
+            outcome = fabric.get_ports_for_switches(cfm, ['sw1', 'sw2', 'sw3'])
+            stats = cfm.connection_stats()
+            cfm.disconnect()
+
+        self.assertEqual(outcome.results['sw1'], [{'uuid': 'sw1-p1', 'switch_uuid': 'sw1'}])
+        self.assertEqual(sorted(outcome.results), ['sw1', 'sw2'])
+        self.assertEqual(list(outcome.errors), ['sw3'])
+        self.assertLessEqual(stats['connections_opened'], 2)
+
+
+class TestBulkUpdatePorts(TestCase):
+    """
+    Test case for pyhpecfm.fabric.bulk_update_ports
+    """
+
+    def test_merged_and_chunked(self):
+        """
+        Updates are merged per port, grouped by identical changes and split by payload size.
+        """
+        port_uuids = ['port-{:04d}'.format(index) for index in range(200)]
+        updates = [
+            (port_uuids, 'native_vlan', 10),
+            (port_uuids[:100], 'description', 'server'),
+            (port_uuids[:1], 'native_vlan', 20),
+        ]
+        chunks, fields = fabric._port_patch_chunks(updates, max_payload_bytes=1024)
+
+        self.assertEqual(fields['port-0000'], {'native_vlan': 20, 'description': 'server'})
+        self.assertEqual(fields['port-0150'], {'native_vlan': 10})
+        for chunk in chunks:
+            self.assertLessEqual(len(json.dumps(chunk)), 1024)
+        entries = [entry for chunk in chunks for entry in chunk]
+        self.assertEqual(sorted(uuid for entry in entries for uuid in entry['uuids']),
+                         port_uuids)
+        self.assertEqual(len({json.dumps(entry['patch']) for entry in entries}), 3)
+
+    def test_report_per_port(self):
+        """
+        Chunks are sent concurrently and the outcome of each chunk is reported per port.
+        """
+        def patch(request):
+            if any('port-bad' in entry['uuids'] for entry in request.json()):
+                return 500, None, cfm_body('Internal error')
+            return 200, None, cfm_body([])
+
+        with LocalCFMServer({('PATCH', 'v1/ports'): patch}) as server:
+            cfm = client.CFMClient(server.host, 'admin', 'plexxi', pool_maxsize=4)
+            cfm.connect()
+            report = fabric.bulk_update_ports(
+                cfm, [(['port-{}'.format(index) for index in range(40)], 'native_vlan', 5),
+                      (['port-bad'], 'description', 'down')],
+                max_payload_bytes=256)
+            cfm.disconnect()
+            patches = [request for request in server.requests if request.method == 'PATCH']
+
+        self.assertGreater(len(patches), 2)
+        self.assertEqual(report.results['port-0'], {'native_vlan': 5})
+        self.assertIn('port-bad', report.errors)
+        self.assertEqual(len(report.results) + len(report.errors), 41)
+
+
+class TestBatchLocalUsers(TestCase):
+    """
+    Test case for pyhpecfm.system.add_local_users and delete_local_users
+    """
+
+    def setUp(self):
+        self.users = {'existing': 'u0'}
+
+        def create(request):
+            user = request.json()
+            if user['auth_source_uuid'] != 'local-source':
+                return 400, None, cfm_body('Bad auth source')
+            if user['username'] in self.users:
+                return 409, None, cfm_body('Conflict')
+            self.users[user['username']] = 'u{}'.format(len(self.users))
+            return 200, None, cfm_body(self.users[user['username']])
+
+        def users(request):
+            return 200, None, cfm_body([{'username': name, 'uuid': uuid}
+                                        for name, uuid in self.users.items()])
+
+        routes = {('GET', 'v1/auth/sources'): [{'uuid': 'local-source', 'type': 'local'}],
+                  ('GET', 'v1/users'): users,
+                  ('POST', 'v1/users'): create}
+        for uuid in ['u0', 'u1', 'u2']:
+            routes[('DELETE', 'v1/users/' + uuid)] = []
+        self.server = LocalCFMServer(routes)
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi', pool_maxsize=4)
+        self.cfm.connect()
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_add_local_users(self):
+        """
+        The auth source is looked up once and failures are reported per user.
+        """
+        outcome = system.add_local_users(self.cfm, [('alice', 'Operator', 'a'),
+                                                    ('bob', 'Viewer', 'b'),
+                                                    ('existing', 'Viewer', 'c')])
+        self.assertEqual(sorted(outcome.results), ['alice', 'bob'])
+        self.assertEqual(list(outcome.errors), ['existing'])
+        lookups = [request for request in self.server.requests
+                   if request.path == 'v1/auth/sources']
+        self.assertEqual(len(lookups), 1)
+
+    def test_delete_local_users(self):
+        """
+        Users are looked up once and unknown usernames are reported as errors.
+        """
+        self.users.update({'alice': 'u1', 'bob': 'u2'})
+        outcome = system.delete_local_users(self.cfm, ['alice', 'bob', 'nobody'])
+        self.assertEqual(sorted(outcome.results), ['alice', 'bob'])
+        self.assertIsInstance(outcome.errors['nobody'], client.CFMApiError)
+        self.assertEqual(len([request for request in self.server.requests
+                              if request.path == 'v1/users']), 1)
+        self.assertEqual(sorted(request.path for request in self.server.requests
+                                if request.method == 'DELETE'), ['v1/users/u1', 'v1/users/u2'])
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.inventory.
+"""
+
+import json
+import os
+from unittest import TestCase
+from unittest import mock
+
+import yaml
+
+from pyhpecfm import inventory
+
+CASSETTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'cassettes')
+
+
+def cassette_results(name, path):
+    """Return the result of the first recorded call to path in a cassette."""
+    with open(os.path.join(CASSETTES, name)) as cassette:
+        interactions = yaml.safe_load(cassette)['interactions']
+    for interaction in interactions:
+        if path in interaction['request']['uri']:
+            return json.loads(interaction['response']['body']['string'])['result']
+    raise LookupError(path)
+
+
+def port(uuid, switch_uuid, label, native_vlan=1, vlans='', vlan_group_uuids=()):
+    return {'uuid': uuid, 'switch_uuid': switch_uuid, 'name': '', 'port_label': label,
+            'native_vlan': native_vlan, 'vlans': vlans, 'ungrouped_vlans': '',
+            'vlan_group_uuids': list(vlan_group_uuids), 'type': 'access'}
+
+
+class TestParseVlans(TestCase):
+    """
+    Test case for pyhpecfm.inventory.parse_vlans
+    """
+
+    def test_parse_vlans(self):
+        """
+        VLAN strings with ranges, ints and empty values are parsed to sets of ints.
+        """
+        self.assertEqual(inventory.parse_vlans('1-3, 7,10-11'), {1, 2, 3, 7, 10, 11})
+        self.assertEqual(inventory.parse_vlans('2'), {2})
+        self.assertEqual(inventory.parse_vlans(''), frozenset())
+        self.assertEqual(inventory.parse_vlans(None), frozenset())
+        self.assertEqual(inventory.parse_vlans(5), {5})
+
+
+class TestInventory(TestCase):
+    """
+    Test case for pyhpecfm.inventory.Inventory
+    """
+
+    def setUp(self):
+        self.snapshot = inventory.Inventory(
+            fabrics=[{'uuid': 'fab1', 'name': 'fabric'}],
+            switches=[
+                {'uuid': 'sw1', 'name': 'leaf1', 'fabric_uuid': 'fab1',
+                 'mac_address': 'E0:39:D7:90:10:00', 'configuration_number': 3,
+                 'ports': [port('p1', 'sw1', '1.1', vlans='10-12'),
+                           port('p2', 'sw1', '1.2', vlan_group_uuids=['vg1'])]},
+                {'uuid': 'sw2', 'name': 'leaf2', 'fabric_uuid': 'fab1',
+                 'mac_address': 'e0-39-d7-90-20-00', 'configuration_number': 1},
+            ],
+            ports=[port('p3', 'sw2', '1.1', native_vlan=10)],
+            lags=[{'uuid': 'lag1', 'name': 'uplink',
+                   'port_properties': [{'port_uuids': ['p1', 'p3']}]}],
+            vlan_groups=[{'uuid': 'vg1', 'name': 'servers', 'vlans': '20-21',
+                          'lag_uuids': ['lag1']}])
+
+    def test_lookups(self):
+        """
+        Records are found by UUID, MAC address and fabric.
+        """
+        self.assertEqual(self.snapshot.get('p2').port_label, '1.2')
+        self.assertEqual(self.snapshot.get('vg1').vlans, {20, 21})
+        self.assertIsNone(self.snapshot.get('missing'))
+        self.assertEqual(self.snapshot.switch_by_mac('e0:39:d7:90:20:00').name, 'leaf2')
+        self.assertEqual([switch.uuid for switch in self.snapshot.switches_in_fabric('fab1')],
+                         ['sw1', 'sw2'])
+        self.assertEqual([lag.uuid for lag in self.snapshot.lags_of_port('p3')], ['lag1'])
+        self.assertEqual([group.uuid for group in self.snapshot.vlan_groups_of_lag('lag1')],
+                         ['vg1'])
+
+    def test_find_ports(self):
+        """
+        Criteria are combined, and VLAN membership includes native and VLAN group VLANs.
+        """
+        def uuids(ports):
+            return sorted(record.uuid for record in ports)
+
+        self.assertEqual(uuids(self.snapshot.find_ports(vlan=10)), ['p1', 'p3'])
+        self.assertEqual(uuids(self.snapshot.find_ports(switch_uuid='sw1', vlan=10)), ['p1'])
+        self.assertEqual(uuids(self.snapshot.find_ports(vlan=21)), ['p2'])
+        self.assertEqual(uuids(self.snapshot.find_ports(name='1.1')), ['p1', 'p3'])
+        self.assertEqual(uuids(self.snapshot.find_ports(name='1.1', fabric_uuid='fab1')),
+                         ['p1', 'p3'])
+        self.assertEqual(self.snapshot.find_ports(switch_uuid='sw2', vlan=20), [])
+        self.assertEqual(len(self.snapshot.find_ports()), 3)
+
+    def test_compact_records(self):
+        """
+        Records have no __dict__, share their strings and identical VLAN sets.
+        """
+        record = self.snapshot.get('p1')
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertIs(record.switch_uuid, self.snapshot.get('p2').switch_uuid)
+        snapshot = inventory.Inventory(ports=[port('p1', 'sw1', '1.1', vlans='10-11'),
+                                              port('p2', 'sw1', '1.2', vlans='10,11')])
+        self.assertIs(snapshot.get('p1').vlans, snapshot.get('p2').vlans)
+        self.assertEqual(self.snapshot.get('sw2').mac_address, 'E0:39:D7:90:20:00')
+
+    def test_load_from_cassette_data(self):
+        """
+        A snapshot loads from the recorded CFM answers.
+        """
+        switches = cassette_results('test_get_switches_single_param', 'v1/switches')
+        client = mock.Mock()
+        with mock.patch('pyhpecfm.fabric.get_fabrics', return_value=[]), \
+                mock.patch('pyhpecfm.fabric.iter_switches', return_value=iter(switches)), \
+                mock.patch('pyhpecfm.fabric.get_lags', return_value=[]), \
+                mock.patch('pyhpecfm.fabric.get_vlan_groups',
+                           return_value=cassette_results('test_get_vlan_groups',
+                                                         'v1/vlan_groups')):
+            snapshot = inventory.Inventory.load(client)
+        self.assertEqual(len(snapshot.switches), len(switches))
+        self.assertEqual(len(snapshot.ports), sum(len(switch['ports']) for switch in switches))
+        switch = switches[0]
+        self.assertEqual(snapshot.switch_by_mac(switch['mac_address']).uuid, switch['uuid'])
+        self.assertEqual(len(snapshot.find_ports(switch_uuid=switch['uuid'], vlan=1)),
+                         len([port for port in switch['ports'] if port['native_vlan'] == 1]))
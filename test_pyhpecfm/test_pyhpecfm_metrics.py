@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.metrics
+"""
+
+import urllib.request
+from unittest import TestCase
+
+from pyhpecfm import cache
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import hooks
+from pyhpecfm import metrics
+from pyhpecfm import retry
+from pyhpecfm import system
+
+from localcfm import LocalCFMServer, cfm_body
+
+USER_UUID = '3f2c5a1e-8b7d-4c6e-9f0a-1b2c3d4e5f60'
+
+
+def samples(text):
+    """Parse the samples of an OpenMetrics exposition into a dict of values by series."""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            values[series] = float(value)
+    return values
+
+
+class TestClientMetrics(TestCase):
+    """
+    Test case for pyhpecfm.metrics.ClientMetrics
+    """
+
+    def test_endpoint(self):
+        """
+        UUIDs, numeric ids and query strings are removed from endpoints.
+        """
+        self.assertEqual(metrics.endpoint('v1/users/{}?x=1'.format(USER_UUID)),
+                         'v1/users/{uuid}')
+        self.assertEqual(metrics.endpoint('/v1/audits/42/'), 'v1/audits/{id}')
+        self.assertEqual(metrics.endpoint('versions'), 'versions')
+
+    def test_render(self):
+        """
+        Events are aggregated into histograms and counters in OpenMetrics text format.
+        """
+        cfm_metrics = metrics.ClientMetrics(buckets=(0.1, 1.0))
+        cfm_metrics(hooks.RequestEvent('GET', 'v1/switches', 1, 503, latency=0.05, ttfb=0.04,
+                                       failure=hooks.FAILURE_STATUS,
+                                       retry_reason=hooks.FAILURE_STATUS))
+        cfm_metrics(hooks.RequestEvent('GET', 'v1/switches', 2, 200, latency=0.5, ttfb=0.2,
+                                       bytes_received=100))
+        cfm_metrics(hooks.RequestEvent('GET', 'v1/switches', 1, 304, latency=0.02, cached=True))
+        cfm_metrics(hooks.RequestEvent('DELETE', 'v1/users/' + USER_UUID, 1, 401, latency=0.01,
+                                       failure=hooks.FAILURE_STATUS,
+                                       retry_reason=hooks.RETRY_REAUTH))
+        cfm_metrics(hooks.RequestEvent('GET', 'v1/audits', 1, latency=30.0,
+                                       failure=hooks.FAILURE_TIMEOUT))
+
+        text = cfm_metrics.render()
+        self.assertTrue(text.endswith('# EOF\n'))
+        values = samples(text)
+        bucket = 'cfm_client_request_duration_seconds_bucket{{method="GET",' \
+                 'endpoint="v1/switches",le="{}"}}'
+        self.assertEqual(values[bucket.format('0.1')], 2)
+        self.assertEqual(values[bucket.format('1.0')], 3)
+        self.assertEqual(values[bucket.format('+Inf')], 3)
+        self.assertEqual(values['cfm_client_request_duration_seconds_count{method="GET",'
+                                'endpoint="v1/switches"}'], 3)
+        self.assertEqual(values['cfm_client_service_unavailable_total'
+                                '{endpoint="v1/switches"}'], 1)
+        self.assertEqual(values['cfm_client_reauthentications_total'
+                                '{endpoint="v1/users/{uuid}"}'], 1)
+        self.assertEqual(values['cfm_client_timeouts_total{endpoint="v1/audits"}'], 1)
+        self.assertEqual(values['cfm_client_requests_total{method="GET",endpoint="v1/audits",'
+                                'code="timeout"}'], 1)
+        self.assertEqual(values['cfm_client_response_bytes_total{method="GET",'
+                                'endpoint="v1/switches"}'], 100)
+        self.assertEqual(values['cfm_client_cache_revalidations_total'
+                                '{endpoint="v1/switches"}'], 1)
+        self.assertIsNone(cfm_metrics.cache_hit_ratio())
+
+    def test_cache_hit_ratio(self):
+        """
+        The cache hit ratio counts the fresh cache hits, which send no request.
+        """
+        cfm_metrics = metrics.ClientMetrics()
+        with LocalCFMServer({('GET', 'v1/fabrics'): []}) as server:
+            cfm = cfm_metrics.instrument(client.CFMClient(server.host, 'admin', 'plexxi',
+                                                          cache=cache.ResponseCache(ttl=60)))
+            cfm.connect()
+            for _ in range(4):
+                fabric.get_fabrics(cfm)
+            cfm.disconnect()
+
+        values = samples(cfm_metrics.render())
+        host = '{{host="{}"}}'.format(server.host)
+        self.assertEqual(values['cfm_client_cache_hits_total' + host], 3)
+        self.assertEqual(values['cfm_client_cache_misses_total' + host], 1)
+        self.assertEqual(values['cfm_client_cache_hit_ratio' + host], 0.75)
+        self.assertEqual(cfm_metrics.cache_hit_ratio(server.host), 0.75)
+        self.assertEqual(values['cfm_client_requests_total{method="GET",endpoint="v1/fabrics",'
+                                'code="200"}'], 1)
+
+    def test_instrumented_client_scraped(self):
+        """
+        An instrumented client reports its calls and host, and the HTTP handler serves them.
+        """
+        answers = [503, 200]
+
+        def versions(request):
+            status = answers.pop(0)
+            return status, {'Retry-After': '0'}, cfm_body([{'name': 'cfm'}])
+
+        cfm_metrics = metrics.ClientMetrics()
+        with LocalCFMServer({('GET', 'versions'): versions,
+                             ('GET', 'v1/fabrics'): []}) as server:
+            cfm = cfm_metrics.instrument(client.CFMClient(
+                server.host, 'admin', 'plexxi', retry_policy=retry.RetryPolicy(backoff_base=0)))
+            cfm.connect()
+            system.get_versions(cfm)
+            fabric.get_fabrics(cfm)
+            cfm.disconnect()
+
+        http = metrics.start_http_server(cfm_metrics, 0)
+        try:
+            response = urllib.request.urlopen('http://127.0.0.1:{}/metrics'.format(
+                http.server_address[1]))
+            self.assertEqual(response.headers['Content-Type'], metrics.CONTENT_TYPE)
+            values = samples(response.read().decode('utf-8'))
+        finally:
+            http.shutdown()
+            http.server_close()
+
+        self.assertEqual(values['cfm_client_retries_total{endpoint="versions",'
+                                'reason="status"}'], 1)
+        self.assertEqual(values['cfm_client_requests_total{method="GET",endpoint="v1/fabrics",'
+                                'code="200"}'], 1)
+        self.assertEqual(values['cfm_client_in_flight_requests{{host="{}"}}'.format(
+            server.host)], 0)
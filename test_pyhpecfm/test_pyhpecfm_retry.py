@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.retry and the retry behaviour of pyhpecfm.client.CFMClient.
+"""
+
+from unittest import TestCase
+from unittest import mock
+
+import requests
+
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import retry
+from pyhpecfm import system
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+class TestRetryPolicy(TestCase):
+    """
+    Test case for pyhpecfm.retry.RetryPolicy
+    """
+
+    def test_full_jitter_backoff(self):
+        """
+        Delays are drawn between zero and an exponentially growing, capped ceiling.
+        """
+        policy = retry.RetryPolicy(backoff_base=1.0, backoff_max=5.0)
+        with mock.patch('random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([policy.backoff(attempt) for attempt in range(1, 6)],
+                             [1.0, 2.0, 4.0, 5.0, 5.0])
+        for _ in range(100):
+            self.assertTrue(0 <= policy.backoff(2) <= 2.0)
+
+    def test_retry_after(self):
+        """
+        Retry-After in seconds or as an HTTP date overrides the backoff, within backoff_max.
+        """
+        policy = retry.RetryPolicy(backoff_max=10)
+        self.assertEqual(policy.next_delay('GET', 1, '3'), 3.0)
+        self.assertEqual(policy.next_delay('GET', 1, '120'), 10)
+        self.assertEqual(retry.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+        self.assertIsNone(retry.parse_retry_after('soon'))
+
+    def test_idempotent_methods_only(self):
+        """
+        POST and PATCH are not retried by default, and attempts are capped.
+        """
+        policy = retry.RetryPolicy(max_attempts=3, budget=False)
+        self.assertIsNotNone(policy.next_delay('get', 1))
+        self.assertIsNotNone(policy.next_delay('DELETE', 2))
+        self.assertIsNone(policy.next_delay('GET', 3))
+        self.assertIsNone(policy.next_delay('POST', 1))
+        self.assertIsNone(policy.next_delay('PATCH', 1))
+        policy = retry.RetryPolicy(retry_methods=['GET', 'POST'])
+        self.assertIsNotNone(policy.next_delay('POST', 1))
+
+    def test_budget(self):
+        """
+        Retries stop once the budget is spent and resume as requests deposit tokens.
+        """
+        budget = retry.RetryBudget(ratio=0.5, min_retries_per_second=0, capacity=2)
+        policy = retry.RetryPolicy(max_attempts=10, budget=budget)
+        self.assertIsNotNone(policy.next_delay('GET', 1))
+        self.assertIsNotNone(policy.next_delay('GET', 1))
+        self.assertIsNone(policy.next_delay('GET', 1))
+        policy.record_request()
+        policy.record_request()
+        self.assertIsNotNone(policy.next_delay('GET', 1))
+
+
+class TestClientRetries(TestCase):
+    """
+    Test case for retries in pyhpecfm.client.CFMClient._call_api
+    """
+
+    def setUp(self):
+        self.failures = {'count': 2}
+
+        def unavailable(request):
+            if self.failures['count']:
+                self.failures['count'] -= 1
+                return 503, {'Retry-After': '0'}, cfm_body('Service Unavailable')
+            return 200, None, cfm_body([{'uuid': 'sw1'}])
+
+        self.server = LocalCFMServer({('GET', 'v1/switches'): unavailable,
+                                      ('POST', 'v1/backups'): unavailable})
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi')
+        self.cfm.connect()
+
+    def tearDown(self):
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_get_retried_after_retry_after(self):
+        """
+        A GET answered with 503 and Retry-After is retried until it succeeds.
+        """
+        with mock.patch('time.sleep') as sleep:
+            self.assertEqual(fabric.get_switches(self.cfm), [{'uuid': 'sw1'}])
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [0.0, 0.0])
+
+    def test_post_not_retried(self):
+        """
+        A POST answered with 503 is not retried by default.
+        """
+        with mock.patch('time.sleep') as sleep:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                system.create_backup(self.cfm)
+        sleep.assert_not_called()
+        self.assertEqual(len([request for request in self.server.requests
+                              if request.path == 'v1/backups']), 1)
+
+    def test_exhausted_attempts(self):
+        """
+        The last 503 is raised once max_attempts is reached.
+        """
+        self.failures['count'] = 5
+        with mock.patch('time.sleep'):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                fabric.get_switches(self.cfm)
+        self.assertEqual(len([request for request in self.server.requests
+                              if request.path == 'v1/switches']), 3)
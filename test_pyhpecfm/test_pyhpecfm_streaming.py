@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.streaming and the iterator helpers built on it.
+"""
+
+import json
+from unittest import TestCase
+
+import yaml
+
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import streaming
+from pyhpecfm import system
+
+from localcfm import LocalCFMServer
+
+CASSETTES = './test_pyhpecfm/fixtures/cassettes/'
+
+
+def recorded_body(cassette, index):
+    """Return the body of a recorded response as bytes."""
+    with open(CASSETTES + cassette) as cassette_file:
+        interactions = yaml.safe_load(cassette_file)['interactions']
+    return interactions[index]['response']['body']['string'].encode('utf-8')
+
+
+def split(data, size):
+    """Cut data into chunks of size bytes."""
+    return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+
+class TestIterJsonArray(TestCase):
+    """
+    Test case for pyhpecfm.streaming.iter_json_array
+    """
+
+    def test_recorded_bodies(self):
+        """
+        Streaming recorded CFM bodies yields exactly the decoded result arrays.
+        """
+        for cassette, index in [('test_get_audit_logs', 1), ('test_get_ports', 2),
+                                ('test_get_switches_single_param', 1)]:
+            body = recorded_body(cassette, index)
+            expected = json.loads(body.decode('utf-8'))['result']
+            for size in (7, 4096):
+                records = list(streaming.iter_json_array(split(body, size)))
+                self.assertEqual(records, expected)
+
+    def test_chunk_boundaries(self):
+        """
+        Numbers, literals and multi-byte characters split across chunks are decoded whole.
+        """
+        body = json.dumps({'count': 12345, 'result': [12345, True, None, 'café', {'a': []}],
+                           'time': '1mS'}, ensure_ascii=False).encode('utf-8')
+        self.assertEqual(list(streaming.iter_json_array(split(body, 1))),
+                         [12345, True, None, 'café', {'a': []}])
+
+    def test_non_array_and_missing_result(self):
+        """
+        A single object result is yielded once and a missing result yields nothing.
+        """
+        self.assertEqual(list(streaming.iter_json_array([b'{"result": {"uuid": "a"}}'])),
+                         [{'uuid': 'a'}])
+        self.assertEqual(list(streaming.iter_json_array([b'{"count": 0}'])), [])
+        self.assertEqual(list(streaming.iter_json_array([b'{"result": []}'])), [])
+
+    def test_truncated_body(self):
+        """
+        A truncated body raises instead of silently yielding partial data.
+        """
+        with self.assertRaises(ValueError):
+            list(streaming.iter_json_array([b'{"result": [{"uuid": "a"}, {"uu']))
+
+
+class TestIterHelpers(TestCase):
+    """
+    Test case for pyhpecfm.fabric.iter_ports and pyhpecfm.system.iter_audit_logs
+    """
+
+    def test_iter_helpers(self):
+        """
+        Iterator helpers return the same records as their list counterparts.
+        """
+        ports = [{'uuid': 'p{}'.format(index), 'name': str(index)} for index in range(500)]
+        audits = [{'uuid': 'a{}'.format(index), 'log_date': index} for index in range(50)]
+        routes = {('GET', 'v1/ports'): ports, ('GET', 'v1/audits'): audits}
+        with LocalCFMServer(routes) as server:
+            cfm = client.CFMClient(server.host, 'admin', 'plexxi')
+            cfm.connect()
+            self.assertEqual(list(fabric.iter_ports(cfm, 'sw1')), ports)
+            self.assertEqual(list(system.iter_audit_logs(cfm)), audits)
+            self.assertEqual(fabric.get_ports(cfm), ports)
+            stats = cfm.connection_stats()
+            cfm.disconnect()
+        self.assertEqual(stats['connections_opened'], 1)
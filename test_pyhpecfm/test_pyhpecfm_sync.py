@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.sync.
+"""
+
+import copy
+import queue
+import threading
+from unittest import TestCase
+from unittest import mock
+
+from pyhpecfm import sync
+
+
+class FakeFabric(object):
+    """
+    Stand-in for the pyhpecfm.fabric functions used by InventorySync, serving a mutable set of
+    switches with their ports and counting the full switch reads.
+    """
+
+    def __init__(self):
+        self.switches = [self.switch('sw1', 2), self.switch('sw2', 4)]
+        self.vlan_groups = [{'uuid': 'vg1', 'name': 'servers', 'vlans': '20', 'lag_uuids': []}]
+        self.full_reads = []
+
+    @staticmethod
+    def switch(uuid, ports):
+        return {'uuid': uuid, 'name': uuid, 'fabric_uuid': 'fab1', 'configuration_number': 1,
+                'ports': [{'uuid': '{}-p{}'.format(uuid, index), 'switch_uuid': uuid,
+                           'port_label': '1.{}'.format(index), 'native_vlan': 1, 'vlans': '',
+                           'vlan_group_uuids': []} for index in range(ports)]}
+
+    def get_switches(self, cfmclient, params=None):
+        return [{key: value for key, value in switch.items() if key != 'ports'}
+                for switch in self.switches]
+
+    def iter_switches(self, cfmclient, params=None):
+        self.full_reads.append(params)
+        return iter(copy.deepcopy(self.switches))
+
+    def patches(self):
+        return [mock.patch('pyhpecfm.fabric.get_switches', self.get_switches),
+                mock.patch('pyhpecfm.fabric.iter_switches', self.iter_switches),
+                mock.patch('pyhpecfm.fabric.get_vlan_groups',
+                           lambda cfmclient: copy.deepcopy(self.vlan_groups)),
+                mock.patch('pyhpecfm.fabric.get_lags', lambda cfmclient: []),
+                mock.patch('pyhpecfm.fabric.get_fabrics',
+                           lambda cfmclient: [{'uuid': 'fab1', 'name': 'fabric'}])]
+
+
+class TestInventorySync(TestCase):
+    """
+    Test case for pyhpecfm.sync.InventorySync
+    """
+
+    def setUp(self):
+        self.fake = FakeFabric()
+        for patch in self.fake.patches():
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.events = queue.Queue()
+        self.syncer = sync.InventorySync(mock.Mock(), queue=self.events)
+
+    def summary(self, events):
+        return sorted((event.kind, event.collection, event.uuid) for event in events)
+
+    def test_first_refresh_adds_everything(self):
+        """
+        The first refresh reads the switches with their ports and reports every record.
+        """
+        events = self.syncer.refresh()
+        self.assertEqual(len(events), 1 + 2 + 6 + 1)
+        self.assertEqual({event.kind for event in events}, {sync.ADDED})
+        self.assertEqual(self.events.qsize(), len(events))
+        self.assertEqual(self.fake.full_reads,
+                         [{'ports': True, 'software': True, 'fabric': True}])
+
+    def test_unchanged_skips_full_read(self):
+        """
+        No full read and no event when no configuration_number changed.
+        """
+        self.syncer.refresh()
+        self.assertEqual(self.syncer.refresh(), [])
+        self.assertEqual(len(self.fake.full_reads), 1)
+        self.assertEqual(self.syncer.stats(), {'refreshes': 2, 'full_reads': 1, 'events': 10})
+        self.assertEqual(len(self.syncer.snapshot.ports), 6)
+
+    def test_switch_status_without_configuration_change(self):
+        """
+        Switch status changes are reported without a full read when no configuration changed.
+        """
+        self.syncer.refresh()
+        self.fake.switches[0]['status'] = 'UNSYNCED'
+        self.assertEqual(self.summary(self.syncer.refresh()), [('changed', 'switches', 'sw1')])
+        self.assertEqual(self.syncer.snapshot.switches['sw1'].status, 'UNSYNCED')
+        self.assertEqual(len(self.syncer.snapshot.ports), 6)
+        self.assertEqual(len(self.fake.full_reads), 1)
+
+    def test_deltas(self):
+        """
+        Changed switches trigger a full read and only the differences are reported.
+        """
+        self.syncer.refresh()
+        sw1, sw2 = self.fake.switches
+        sw1['configuration_number'] = 2
+        sw1['ports'][0]['native_vlan'] = 30
+        del sw2['ports'][3]
+        self.fake.switches.append(self.fake.switch('sw3', 1))
+        self.assertEqual(self.summary(self.syncer.refresh()), [
+            ('added', 'ports', 'sw3-p0'),
+            ('added', 'switches', 'sw3'),
+            ('changed', 'ports', 'sw1-p0'),
+            ('changed', 'switches', 'sw1'),
+            ('removed', 'ports', 'sw2-p3'),
+        ])
+        self.assertEqual(self.syncer.snapshot.find_ports(vlan=30)[0].uuid, 'sw1-p0')
+
+    def test_vlan_group_change_forces_full_read(self):
+        """
+        A VLAN group change is reported and refreshes the VLANs of the ports.
+        """
+        self.fake.switches[0]['ports'][0]['vlan_group_uuids'] = ['vg1']
+        self.syncer.refresh()
+        self.fake.vlan_groups[0]['vlans'] = '20-21'
+        events = self.syncer.refresh()
+        self.assertEqual(self.summary(events), [('changed', 'ports', 'sw1-p0'),
+                                                ('changed', 'vlan_groups', 'vg1')])
+        self.assertEqual(len(self.fake.full_reads), 2)
+
+    def test_run_until_stopped(self):
+        """
+        run() refreshes until the stop event is set.
+        """
+        stop = threading.Event()
+        syncer = sync.InventorySync(mock.Mock(), callback=lambda event: stop.set())
+        syncer.run(interval=0, stop_event=stop)
+        self.assertTrue(stop.is_set())
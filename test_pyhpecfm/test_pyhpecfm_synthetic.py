@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing the synthetic fixture generator of the test suite
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm.inventory import Inventory
+
+from localcfm import LocalCFMServer
+from synthetic import (AUDIT_ATTRIBUTES, FABRIC_ATTRIBUTES, LAG_ATTRIBUTES, PORT_ATTRIBUTES,
+                       SWITCH_ATTRIBUTES, VLAN_GROUP_ATTRIBUTES, SyntheticFabric, iter_body,
+                       write_fixtures)
+
+
+class TestSyntheticFabric(TestCase):
+    """
+    Test case for synthetic.SyntheticFabric
+    """
+
+    def setUp(self):
+        self.synthetic = SyntheticFabric(fabrics=2, switches=6, ports_per_switch=8,
+                                         lags_per_switch=2, vlan_groups=3, audit_entries=20,
+                                         seed=7)
+
+    def test_attributes(self):
+        """
+        Records have the attributes asserted on the recorded CFM answers.
+        """
+        expected = {'fabrics': FABRIC_ATTRIBUTES, 'switches': SWITCH_ATTRIBUTES,
+                    'ports': PORT_ATTRIBUTES, 'lags': LAG_ATTRIBUTES,
+                    'vlan_groups': VLAN_GROUP_ATTRIBUTES, 'audits': AUDIT_ATTRIBUTES}
+        for name, attributes in expected.items():
+            records = list(self.synthetic.collection(name))
+            self.assertEqual(len(records), self.synthetic.counts()[name])
+            for record in records:
+                self.assertEqual(sorted(record), sorted(attributes))
+        switch = next(self.synthetic.switches(ports=True))
+        self.assertEqual(len(switch['ports']), 8)
+
+    def test_deterministic(self):
+        """
+        The same seed gives the same records, another seed other UUIDs.
+        """
+        again = SyntheticFabric(fabrics=2, switches=6, ports_per_switch=8, lags_per_switch=2,
+                                vlan_groups=3, audit_entries=20, seed=7)
+        other = SyntheticFabric(fabrics=2, switches=6, ports_per_switch=8, lags_per_switch=2,
+                                vlan_groups=3, audit_entries=20, seed=8)
+        self.assertEqual(list(self.synthetic.ports()), list(again.ports()))
+        self.assertEqual(list(self.synthetic.audits()), list(again.audits()))
+        self.assertNotEqual(next(self.synthetic.switches())['uuid'],
+                            next(other.switches())['uuid'])
+
+    def test_audits_newest_first(self):
+        """
+        Audit entries are generated newest first, as v1/audits returns them.
+        """
+        audits = list(self.synthetic.audits())
+        log_dates = [record['log_date'] for record in audits]
+        self.assertEqual(log_dates, sorted(log_dates, reverse=True))
+        self.assertEqual(self.synthetic.audit_index(audits[0]['uuid']), 19)
+        self.assertEqual(self.synthetic.audit(0), audits[-1])
+        self.assertIsNone(self.synthetic.audit_index('unknown'))
+
+    def test_relations(self):
+        """
+        Records only refer to records of the same synthetic fabric.
+        """
+        fabrics = {record['uuid'] for record in self.synthetic.fabrics()}
+        switches = {record['uuid']: record for record in self.synthetic.switches()}
+        ports = {record['uuid']: record for record in self.synthetic.ports()}
+        lags = {record['uuid']: record for record in self.synthetic.lags()}
+        groups = {record['uuid']: record for record in self.synthetic.vlan_groups()}
+        self.assertEqual({switch['fabric_uuid'] for switch in switches.values()}, fabrics)
+        for port in ports.values():
+            self.assertIn(port['switch_uuid'], switches)
+            self.assertTrue(set(port['speed_group']) <= set(ports))
+            self.assertTrue(set(port['vlan_group_uuids']) <= set(groups))
+        for lag in lags.values():
+            members = [ports[uuid] for uuid in lag['port_properties'][0]['port_uuids']]
+            self.assertEqual(len({port['switch_uuid'] for port in members}), 1)
+            self.assertEqual([port['vlan_group_uuids'] for port in members],
+                             [lag['vlan_group_uuids']] * 2)
+        for group in groups.values():
+            for lag_uuid in group['lag_uuids']:
+                self.assertEqual(lags[lag_uuid]['vlan_group_uuids'], [group['uuid']])
+        for audit in self.synthetic.audits():
+            self.assertIn(audit['data']['event_object']['uuid'], switches)
+
+        switch = list(switches)[3]
+        self.assertEqual(self.synthetic.switch_position(switch), 3)
+        self.assertEqual([port['switch_uuid'] for port in self.synthetic.ports(switch)],
+                         [switch] * 8)
+        self.assertEqual(list(self.synthetic.ports('unknown')), [])
+
+    def test_write_fixtures(self):
+        """
+        Every collection is written as a CFM response body.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        written = write_fixtures(self.synthetic, os.path.join(directory, 'fixtures'))
+        self.assertEqual(written['ports.json'], 48)
+        self.assertEqual(written['switches_ports.json'], 6)
+        for name, count in written.items():
+            with open(os.path.join(directory, 'fixtures', name)) as source:
+                body = json.load(source)
+            self.assertEqual(body['count'], count)
+            self.assertEqual(len(body['result']), count)
+        with open(os.path.join(directory, 'fixtures', 'lags.json')) as source:
+            self.assertEqual(json.load(source)['result'], list(self.synthetic.lags()))
+
+    def test_served(self):
+        """
+        The helpers read synthetic records served by a local CFM.
+        """
+        counts = self.synthetic.counts()
+
+        def route(records, count):
+            body = b''.join(iter_body(records, count))
+            return lambda request: (200, None, body)
+
+        server = LocalCFMServer({
+            ('GET', 'v1/fabrics'): route(self.synthetic.fabrics(), counts['fabrics']),
+            ('GET', 'v1/switches'): route(self.synthetic.switches(ports=True),
+                                          counts['switches']),
+            ('GET', 'v1/ports'): route(self.synthetic.ports(), counts['ports']),
+            ('GET', 'v1/lags'): route(self.synthetic.lags(), counts['lags']),
+            ('GET', 'v1/vlan_groups'): route(self.synthetic.vlan_groups(),
+                                             counts['vlan_groups'])})
+        server.start()
+        self.addCleanup(server.stop)
+        cfm = client.CFMClient(server.host, 'admin', 'plexxi')
+        cfm.connect()
+        self.addCleanup(cfm.disconnect)
+
+        self.assertEqual(len(list(fabric.iter_ports(cfm))), 48)
+        inventory = Inventory.load(cfm)
+        self.assertEqual(len(inventory.ports), 48)
+        switch = next(self.synthetic.switches())
+        ports = inventory.find_ports(switch_uuid=switch['uuid'])
+        self.assertEqual(len(ports), 8)
+        lags = inventory.lags_of_port(ports[0].uuid)
+        self.assertEqual(len(lags), 1)
+        self.assertEqual([group.uuid for group in inventory.vlan_groups_of_lag(lags[0].uuid)],
+                         list(ports[0].vlan_group_uuids))
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.throttle and the request governor of pyhpecfm.client.CFMClient.
+"""
+
+import threading
+import time
+from unittest import TestCase
+from unittest import mock
+
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import throttle
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+class TestTokenBucket(TestCase):
+    """
+    Test case for pyhpecfm.throttle.TokenBucket
+    """
+
+    def test_burst_then_rate(self):
+        """
+        The burst is served at once, later tokens are spaced by 1 / rate.
+        """
+        bucket = throttle.TokenBucket(rate=10, burst=3)
+        with mock.patch('time.sleep') as sleep:
+            waits = [bucket.acquire() for _ in range(5)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 0.1, places=2)
+        self.assertAlmostEqual(waits[4], 0.2, places=2)
+        self.assertEqual(sleep.call_count, 2)
+
+
+class TestHostGovernor(TestCase):
+    """
+    Test case for pyhpecfm.throttle.HostGovernor
+    """
+
+    def test_max_in_flight(self):
+        """
+        No more than max_in_flight slots are held at once, other callers wait.
+        """
+        governor = throttle.HostGovernor(max_in_flight=2)
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+
+        def work():
+            with governor.slot():
+                with lock:
+                    state['current'] += 1
+                    state['peak'] = max(state['peak'], state['current'])
+                time.sleep(0.02)
+                with lock:
+                    state['current'] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = governor.stats()
+        self.assertEqual(state['peak'], 2)
+        self.assertEqual(stats['requests'], 6)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreater(stats['waited'], 0)
+        self.assertGreater(stats['concurrency_wait_seconds'], 0)
+
+    def test_configure_in_place(self):
+        """
+        Raising the cap lets waiting callers in, and the counters are kept.
+        """
+        governor = throttle.HostGovernor(max_in_flight=1)
+        entered = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def work():
+            with governor.slot():
+                entered.set()
+                release.wait()
+
+        with governor.slot():
+            waiter = threading.Thread(target=work)
+            waiter.start()
+            self.assertFalse(entered.wait(0.05))
+            governor.configure(max_in_flight=2)
+            self.assertTrue(entered.wait(1))
+            self.assertEqual(governor.stats()['in_flight'], 2)
+            release.set()
+            waiter.join()
+        self.assertEqual(governor.stats()['requests'], 2)
+
+    def test_registry_per_host(self):
+        """
+        Clients of one host share its governor, other hosts are not limited.
+        """
+        governor = throttle.configure_host('limited.local', rate=5, max_in_flight=1)
+        self.assertIs(throttle.get_governor('limited.local'), governor)
+        self.assertIsNot(throttle.get_governor('other.local'), governor)
+        cfm = client.CFMClient('limited.local', 'admin', 'plexxi')
+        self.assertIs(cfm.governor, governor)
+
+
+class TestClientGovernor(TestCase):
+    """
+    Test case for the governor in pyhpecfm.client.CFMClient._call_api
+    """
+
+    def setUp(self):
+        self.server = LocalCFMServer({('GET', 'v1/switches'): [{'uuid': 'sw1'}]})
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_requests_counted_and_limited(self):
+        """
+        Every request, including the login, goes through the governor of the host.
+        """
+        cfm = client.CFMClient(self.server.host, 'admin', 'plexxi', rate_limit=10, burst=1,
+                               max_in_flight=1)
+        cfm.connect()
+        for _ in range(3):
+            self.assertEqual(fabric.get_switches(cfm), [{'uuid': 'sw1'}])
+        cfm.disconnect()
+        stats = cfm.governor.stats()
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreater(stats['rate_wait_seconds'], 0)
+
+    def test_clients_share_the_cap(self):
+        """
+        A client constructed while another one has a request in flight keeps the shared cap.
+        """
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+
+        def slow(request):
+            with lock:
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+            time.sleep(0.2)
+            with lock:
+                state['current'] -= 1
+            return 200, None, cfm_body([{'uuid': 'sw1'}])
+
+        self.server.routes[('GET', 'v1/switches')] = slow
+        first = client.CFMClient(self.server.host, 'admin', 'plexxi', max_in_flight=1)
+        first.connect()
+        thread = threading.Thread(target=fabric.get_switches, args=(first,))
+        thread.start()
+        time.sleep(0.05)
+        second = client.CFMClient(self.server.host, 'admin', 'plexxi', max_in_flight=1)
+        self.assertIs(second.governor, first.governor)
+        self.assertEqual(second.governor.stats()['in_flight'], 1)
+        second.connect()
+        fabric.get_switches(second)
+        thread.join()
+        first.disconnect()
+        second.disconnect()
+        self.assertEqual(state['peak'], 1)
+        self.assertEqual(second.governor.stats()['requests'], 4)
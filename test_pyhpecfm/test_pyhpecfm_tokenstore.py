@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.tokenstore and its use by pyhpecfm.client.CFMClient.
+"""
+
+import itertools
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from pyhpecfm import client
+from pyhpecfm import fabric
+from pyhpecfm import tokenstore
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+class TestFileTokenStore(TestCase):
+    """
+    Test case for pyhpecfm.tokenstore.FileTokenStore
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = tokenstore.FileTokenStore(os.path.join(self.directory, 'tokens'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load(self):
+        """
+        Tokens are keyed by host and user and saved readable by their owner only.
+        """
+        self.assertIsNone(self.store.load('cfm.local', 'admin'))
+        self.store.save('cfm.local', 'admin', 'token-1', time.time() + 60)
+        self.assertEqual(self.store.load('cfm.local', 'admin')[0], 'token-1')
+        self.assertIsNone(self.store.load('cfm.local', 'operator'))
+        self.assertIsNone(self.store.load('other.local', 'admin'))
+        path = self.store._path('cfm.local', 'admin')
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+
+    def test_expired_and_invalidated(self):
+        """
+        Expired tokens are not returned, and invalidation can be limited to a given token.
+        """
+        self.store.save('cfm.local', 'admin', 'token-1', time.time() - 1)
+        self.assertIsNone(self.store.load('cfm.local', 'admin'))
+        self.store.save('cfm.local', 'admin', 'token-2')
+        self.store.invalidate('cfm.local', 'admin', 'token-1')
+        self.assertEqual(self.store.load('cfm.local', 'admin'), ('token-2', None))
+        self.store.invalidate('cfm.local', 'admin', 'token-2')
+        self.assertIsNone(self.store.load('cfm.local', 'admin'))
+
+
+class TestClientTokenStore(TestCase):
+    """
+    Test case for pyhpecfm.client.CFMClient with a token store
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.tokens = itertools.count(1)
+        self.valid = set()
+        self.logins = []
+
+        def login(request):
+            time.sleep(0.05)
+            token = 'token-{}'.format(next(self.tokens))
+            self.logins.append(token)
+            self.valid.add(token)
+            return 200, None, cfm_body(token)
+
+        def switches(request):
+            if request.headers.get('Authorization', '')[len('Bearer '):] not in self.valid:
+                return 401, None, cfm_body('Unauthorized')
+            return 200, None, cfm_body([{'uuid': 'sw1'}])
+
+        self.server = LocalCFMServer({('POST', 'v1/auth/token'): login,
+                                      ('GET', 'v1/switches'): switches})
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def client(self):
+        store = tokenstore.FileTokenStore(self.directory)
+        return client.CFMClient(self.server.host, 'admin', 'plexxi', token_store=store)
+
+    def test_token_reused_by_new_clients(self):
+        """
+        Clients started at the same time log in once and share the saved token.
+        """
+        clients = [self.client() for _ in range(4)]
+        threads = [threading.Thread(target=cfm.connect) for cfm in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.logins, ['token-1'])
+        for cfm in clients:
+            self.assertEqual(fabric.get_switches(cfm), [{'uuid': 'sw1'}])
+            cfm.disconnect()
+
+        cfm = self.client()
+        cfm.connect()
+        self.assertEqual(self.logins, ['token-1'])
+        cfm.disconnect()
+
+    def test_rejected_token_replaced(self):
+        """
+        A saved token rejected with a 401 is replaced in the store by a new login.
+        """
+        cfm = self.client()
+        cfm.connect()
+        self.valid.clear()
+        self.assertEqual(fabric.get_switches(cfm), [{'uuid': 'sw1'}])
+        cfm.disconnect()
+        self.assertEqual(self.logins, ['token-1', 'token-2'])
+        store = tokenstore.FileTokenStore(self.directory)
+        self.assertEqual(store.load(self.server.host, 'admin')[0], 'token-2')
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Module for testing pyhpecfm.tracing
+"""
+
+import contextlib
+from unittest import TestCase
+
+from pyhpecfm import client
+from pyhpecfm import retry
+from pyhpecfm import system
+from pyhpecfm import tracing
+
+from localcfm import LocalCFMServer, cfm_body
+
+
+class RecordingSpan(object):
+    """Span recording its attributes and parent."""
+
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+
+class RecordingTracer(object):
+    """Tracer keeping every span it started, nested like OpenTelemetry current spans."""
+
+    def __init__(self):
+        self.spans = []
+        self._stack = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        span = RecordingSpan(name, attributes, self._stack[-1] if self._stack else None)
+        self.spans.append(span)
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            self._stack.pop()
+
+    def tree(self):
+        """List of (span name, parent span name) pairs in start order."""
+        return [(span.name, span.parent.name if span.parent else None) for span in self.spans]
+
+
+class TestTracing(TestCase):
+    """
+    Test case for the spans opened around helpers and API calls
+    """
+
+    def setUp(self):
+        self.tokens = ['token-1', 'token-2']
+        self.valid = []
+        self.answers = []
+
+        def login(request):
+            self.valid.append(self.tokens.pop(0))
+            return 200, None, cfm_body(self.valid[-1])
+
+        def users(request):
+            if request.headers.get('Authorization') != 'Bearer ' + self.valid[-1]:
+                return 401, None, cfm_body('Unauthorized')
+            if self.answers:
+                return self.answers.pop(0), {'Retry-After': '0'}, cfm_body('Busy')
+            return 200, None, cfm_body([{'username': 'alice', 'uuid': 'u1'}])
+
+        self.server = LocalCFMServer({('POST', 'v1/auth/token'): login,
+                                      ('GET', 'v1/users'): users,
+                                      ('DELETE', 'v1/users/u1'): []})
+        self.server.start()
+        self.cfm = client.CFMClient(self.server.host, 'admin', 'plexxi',
+                                    retry_policy=retry.RetryPolicy(backoff_base=0))
+        self.cfm.connect()
+        self.tracer = RecordingTracer()
+        tracing.set_tracer(self.tracer)
+
+    def tearDown(self):
+        tracing.set_tracer(None)
+        self.cfm.disconnect()
+        self.server.stop()
+
+    def test_helper_spans(self):
+        """
+        A multi-call helper shows each of its calls and their attempts as child spans.
+        """
+        system.delete_local_user(self.cfm, 'alice')
+        self.assertEqual(self.tracer.tree(), [
+            ('system.delete_local_user', None),
+            ('system.get_users', 'system.delete_local_user'),
+            ('cfm.request', 'system.get_users'),
+            ('cfm.request', 'system.delete_local_user')])
+        get, delete = self.tracer.spans[2:]
+        self.assertEqual(get.attributes, {'http.method': 'GET', 'cfm.path': 'v1/users',
+                                          'cfm.attempt': 1, 'http.status_code': 200})
+        self.assertEqual(delete.attributes['http.method'], 'DELETE')
+
+    def test_refresh_and_retry_spans(self):
+        """
+        Logging in again after a 401 and pausing before a retry have their own spans.
+        """
+        self.valid.append('revoked')
+        self.answers.append(503)
+        system.get_users(self.cfm)
+        self.assertEqual(self.tracer.tree(), [
+            ('system.get_users', None),
+            ('cfm.request', 'system.get_users'),
+            ('cfm.refresh_token', 'system.get_users'),
+            ('cfm.request', 'cfm.refresh_token'),
+            ('cfm.request', 'system.get_users'),
+            ('cfm.retry_sleep', 'system.get_users'),
+            ('cfm.request', 'system.get_users')])
+        self.assertEqual([span.attributes.get('cfm.attempt') for span in self.tracer.spans
+                          if span.name == 'cfm.request' and span.attributes['cfm.path'] ==
+                          'v1/users'], [1, 2, 3])
+
+    def test_disabled(self):
+        """
+        Without a tracer, helpers run unchanged and no span is opened.
+        """
+        tracing.set_tracer(None)
+        self.assertEqual(system.get_users(self.cfm), [{'username': 'alice', 'uuid': 'u1'}])
+        self.assertEqual(self.tracer.spans, [])
+        self.assertIsNone(tracing.get_tracer())
+        self.assertEqual(system.get_users.__name__, 'get_users')